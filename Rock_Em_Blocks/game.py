@@ -1,8 +1,13 @@
 import pygame
 import random
 import sys
+import os
 import math
 
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, get_font, render_text
+
 # 初始化Pygame
 pygame.init()
 
@@ -35,7 +40,7 @@ try:
     font = None
     for path in font_paths:
         try:
-            font = pygame.font.Font(path, 24)
+            font = get_font(path, 24)
             break
         except:
             continue
@@ -43,7 +48,7 @@ try:
         raise Exception("No font found")
 except:
     print("警告：无法加载中文字体，使用系统默认字体")
-    font = pygame.font.SysFont(None, 24)
+    font = get_sysfont(None, 24)
 
 class Block:
     def __init__(self, color, row, col):
@@ -462,16 +467,16 @@ class Game:
         # 绘制分数
         score_text = f'得分：{self.score}'
         # 先绘制阴影
-        shadow_surface = font.render(score_text, True, (0, 0, 0))
+        shadow_surface = render_text(font, score_text, (0, 0, 0))
         screen.blit(shadow_surface, (12, 12))
         # 再绘制文本
-        text_surface = font.render(score_text, True, (255, 255, 255))
+        text_surface = render_text(font, score_text, (255, 255, 255))
         screen.blit(text_surface, (10, 10))
         
         # 绘制打乱按钮
         pygame.draw.rect(screen, (100, 100, 100), (200, 10, 100, 30))
         pygame.draw.rect(screen, (128, 128, 128), (198, 8, 100, 30))
-        shuffle_text = font.render('打乱', True, (255, 255, 255))
+        shuffle_text = render_text(font, '打乱', (255, 255, 255))
         screen.blit(shuffle_text, (220, 12))
 
 def main():
@@ -1,6 +1,11 @@
 import pygame
 import random
 import sys
+import os
+
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, get_font, render_text
 
 # 初始化 Pygame
 pygame.init()
@@ -139,18 +144,18 @@ def main():
     # 修改字体设置，使用系统默认中文字体
     try:
         # Windows系统
-        font = pygame.font.SysFont('SimHei', 36)
+        font = get_sysfont('SimHei', 36)
     except:
         try:
             # macOS系统
-            font = pygame.font.SysFont('STHeiti', 36)
+            font = get_sysfont('STHeiti', 36)
         except:
             try:
                 # Linux系统
-                font = pygame.font.SysFont('WenQuanYi Micro Hei', 36)
+                font = get_sysfont('WenQuanYi Micro Hei', 36)
             except:
                 # 如果以上都失败，使用系统默认字体
-                font = pygame.font.Font(None, 36)
+                font = get_font(None, 36)
 
     while True:
         for event in pygame.event.get():
@@ -199,9 +204,9 @@ def main():
             pygame.draw.rect(screen, GREEN, (pos[0], pos[1], BLOCK_SIZE, BLOCK_SIZE))
 
         # 显示分数、长度和重置信息
-        score_text = font.render(f'得分：{snake.score}', True, WHITE)
-        length_text = font.render(f'长度：{len(snake.body)}', True, WHITE)
-        reset_text = font.render(f'重置次数：{snake.reset_count}/6', True, WHITE)
+        score_text = render_text(font, f'得分：{snake.score}', WHITE)
+        length_text = render_text(font, f'长度：{len(snake.body)}', WHITE)
+        reset_text = render_text(font, f'重置次数：{snake.reset_count}/6', WHITE)
         
         screen.blit(score_text, (10, 10))
         screen.blit(length_text, (10, 50))
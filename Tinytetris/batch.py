@@ -0,0 +1,90 @@
+"""无窗口批量自动游玩：用进程池跑大量由机器人操作的俄罗斯方块对局，统计分数和模拟速度
+
+规则引擎（TetrisCore）用手动时钟按帧推进，不需要 pygame、窗口和声音，也不用真的等待下落和消除特效。
+
+用法：python batch.py --games 100 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from tetris_core import TetrisCore, ManualClock
+from bot import Bot
+
+# 模拟的帧率：每帧时钟前进 1/FPS 秒，与窗口版的帧率一致
+FPS = 60
+
+
+def run_game(args):
+    """跑一局自动游玩，返回 (种子, 分数, 消除行数, 方块数, 是否游戏结束, 帧数, 耗时秒数)"""
+    seed, max_pieces, bot_speed = args
+    clock = ManualClock()
+    game = TetrisCore(seed=seed, clock=clock)
+    bot = Bot(actions_per_second=bot_speed)
+    frames = 0
+    start = time.perf_counter()
+    while not game.game_over and game.pieces <= max_pieces:
+        clock.advance(1.0 / FPS)
+        bot.update(game, clock())
+        game.update()
+        frames += 1
+    elapsed = time.perf_counter() - start
+    return seed, game.score, game.lines, game.pieces, game.game_over, frames, elapsed
+
+
+def run_batch(games, workers=None, max_pieces=1000, bot_speed=20, first_seed=0):
+    """在进程池中跑一批对局，返回统计结果"""
+    jobs = [(first_seed + i, max_pieces, bot_speed) for i in range(games)]
+    scores = []
+    total_lines = 0
+    total_pieces = 0
+    total_frames = 0
+    game_overs = 0
+    busy_time = 0.0
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        chunksize = max(1, games // ((workers or os.cpu_count() or 1) * 8))
+        for _, score, lines, pieces, game_over, frames, elapsed in pool.imap_unordered(run_game, jobs, chunksize):
+            scores.append(score)
+            total_lines += lines
+            total_pieces += pieces
+            total_frames += frames
+            game_overs += game_over
+            busy_time += elapsed
+    wall_time = time.perf_counter() - start
+
+    return {
+        "games": games,
+        "game_overs": game_overs,
+        "mean_score": sum(scores) / games if games else 0.0,
+        "max_score": max(scores, default=0),
+        "total_lines": total_lines,
+        "total_pieces": total_pieces,
+        "total_frames": total_frames,
+        "wall_time": wall_time,
+        "speedup": total_frames / FPS / busy_time if busy_time else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量运行俄罗斯方块自动游玩")
+    parser.add_argument("--games", type=int, default=100, help="对局数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--max-pieces", type=int, default=1000, help="每局最多方块数，超出后结束这一局")
+    parser.add_argument("--bot-speed", type=float, default=20, help="机器人每秒的操作次数（0为不限）")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的随机种子，之后依次加一")
+    args = parser.parse_args()
+
+    stats = run_batch(args.games, args.workers, args.max_pieces, args.bot_speed, args.seed)
+
+    print(f"对局数: {stats['games']}  (其中 {stats['game_overs']} 局在方块数上限前结束)")
+    print(f"平均分数: {stats['mean_score']:.0f}  最高分数: {stats['max_score']}")
+    print(f"消除行数: {stats['total_lines']}  方块数: {stats['total_pieces']}")
+    print(f"耗时: {stats['wall_time']:.2f}s")
+    print(f"模拟速度: 单进程约为实时的 {stats['speedup']:.0f} 倍")
+
+
+if __name__ == "__main__":
+    main()
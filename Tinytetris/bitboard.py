@@ -0,0 +1,114 @@
+"""位棋盘：每一行用一个整数的二进制位表示哪些格子有方块，另有一份同样大小的颜色平面
+
+第 c 列对应第 c + PAD 位，两侧各留 PAD 位永远为1的"墙"，所以越界和重叠都只需要
+一次按位与：方块每一行也预先算成位掩码，左移到方块所在的列后和棋盘的行相与，
+不为0就是碰到了墙或已有的方块。游戏本身、机器人和模拟器都可以直接使用。
+"""
+
+# 左右两侧墙壁的位数，不小于方块的最大宽度
+PAD = 4
+
+
+def shape_masks(shape):
+    """把形状矩阵（行的列表）转换为每行的位掩码元组，第 i 列对应第 i 位"""
+    return tuple(sum(1 << i for i, cell in enumerate(row) if cell) for row in shape)
+
+
+class Board:
+    """宽 width、高 height 的位棋盘，rows[y] 为第 y 行（带两侧墙壁位）的整数，colors[y][x] 为颜色编号（0为空）"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        field = ((1 << width) - 1) << PAD
+        self.wall_row = ((1 << (width + PAD * 2)) - 1) & ~field  # 只有墙壁的空行
+        self.full_row = self.wall_row | field
+        self.rows = [self.wall_row] * height
+        self.colors = [bytearray(width) for _ in range(height)]
+
+    def copy(self, colors=True):
+        """复制棋盘；colors 为 False 时不复制颜色平面（搜索落点时只需要位掩码）"""
+        board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.wall_row = self.wall_row
+        board.full_row = self.full_row
+        board.rows = self.rows[:]
+        board.colors = [bytearray(row) for row in self.colors] if colors and self.colors is not None else None
+        return board
+
+    def fits(self, masks, x, y):
+        """形状（每行位掩码）放在左上角 (x, y) 时是否既不越界也不与已有方块重叠；
+        棋盘上方（y < 0）只检查左右边界"""
+        shift = x + PAD
+        if shift < 0 or shift > self.width + PAD:
+            return False
+        rows = self.rows
+        height = self.height
+        for offset, mask in enumerate(masks):
+            row = y + offset
+            if row >= height:
+                return False
+            if (rows[row] if row >= 0 else self.wall_row) & (mask << shift):
+                return False
+        return True
+
+    def drop_row(self, masks, x, y):
+        """形状从 (x, y) 竖直落下能到达的最低行（调用方保证 (x, y) 本身放得下）"""
+        while self.fits(masks, x, y + 1):
+            y += 1
+        return y
+
+    def top_row(self):
+        """最高的有方块的行号，空棋盘返回 height"""
+        wall_row = self.wall_row
+        for y, row in enumerate(self.rows):
+            if row != wall_row:
+                return y
+        return self.height
+
+    def place(self, masks, x, y, color):
+        """把形状写进棋盘（颜色编号从1开始）；有格子在棋盘上方时不写入并返回 False"""
+        if y < 0:
+            return False
+        rows = self.rows
+        colors = self.colors
+        for offset, mask in enumerate(masks):
+            row = y + offset
+            rows[row] |= mask << (x + PAD)
+            if colors is None:
+                continue
+            line = colors[row]
+            col = x
+            while mask:
+                if mask & 1:
+                    line[col] = color
+                mask >>= 1
+                col += 1
+        return True
+
+    def full_rows(self):
+        """所有已填满的行号（从下往上）"""
+        full = self.full_row
+        rows = self.rows
+        return [y for y in range(self.height - 1, -1, -1) if rows[y] == full]
+
+    def clear_rows(self, lines=None):
+        """一次压缩去掉指定的行（默认所有满行），上面的行整体下移，返回去掉的行数"""
+        if lines is None:
+            full = self.full_row
+            keep = [y for y, row in enumerate(self.rows) if row != full]
+        else:
+            lines = set(lines)
+            keep = [y for y in range(self.height) if y not in lines]
+        cleared = self.height - len(keep)
+        if cleared:
+            wall_row = self.wall_row
+            self.rows = [wall_row] * cleared + [self.rows[y] for y in keep]
+            if self.colors is not None:
+                self.colors = [bytearray(self.width) for _ in range(cleared)] + [self.colors[y] for y in keep]
+        return cleared
+
+    def cell(self, x, y):
+        """格子 (x, y) 的颜色编号，0为空"""
+        return self.colors[y][x]
@@ -0,0 +1,290 @@
+"""俄罗斯方块自动游玩：枚举当前方块和预览方块所有能到达的落点，用局面评分选出最好的一步，
+再通过 Tetris.move_left / move_right / rotate / drop 执行。用于展示机的演示模式和长时间的稳定性测试。
+
+能到达的落点按玩家的操作方式枚举：在出生位置按若干次旋转（包括踢墙），左右平移，然后直接落下。
+搜索只用位棋盘的整数行，不复制颜色平面。两层搜索先对当前方块的落点去重（结果棋盘相同的只算一次），
+按一层评分只保留最好的 SEARCH_WIDTH 个，再对每个枚举预览方块的落点；局面评分按行元组缓存，
+上一个方块搜索时算过的局面不会再算一次。可选的更深一层搜索交给工作池：对两层搜索中最好的几个候选，
+再对下一个方块的7种可能取平均。
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from bitboard import Board, PAD
+from pieces import CATALOG, DISTINCT_ROTATIONS, ROTATIONS
+
+# 局面评分的默认权重：消除行数、各列高度之和、空洞数、相邻列高度差之和
+DEFAULT_WEIGHTS = {"lines": 0.76, "height": -0.51, "holes": -0.36, "bumpiness": -0.18}
+
+# 两层搜索时，按一层评分保留的当前方块落点数
+SEARCH_WIDTH = 8
+
+# 更深一层搜索时，每个第一步保留的第二步数量
+DEEP_BRANCHES = 4
+
+# 局面评分缓存的最大条目数，超过后整个清空
+EVALUATION_CACHE_SIZE = 100000
+
+
+def spawn_column(board, shape):
+    """方块的出生列，与 Tetris.new_piece 相同"""
+    return board.width // 2 - CATALOG[shape][0].width // 2
+
+
+def placements(board, shape):
+    """返回方块从出生位置能到达的所有落点 [(旋转次数, 旋转状态, 列, 行)]，
+    每个不同的旋转状态只保留第一次到达时的落点"""
+    states = CATALOG[shape]
+    x, y = spawn_column(board, shape), 0
+    if not board.fits(states[0].masks, x, y):
+        return []
+    distinct = DISTINCT_ROTATIONS[shape]
+    top = board.top_row()
+    results = []
+    rotation = 0
+    for presses in range(ROTATIONS):
+        if presses:
+            # 与 Tetris.rotate 相同：依次尝试踢墙偏移，都放不下时旋转失败
+            state = states[(rotation + 1) % ROTATIONS]
+            for x_offset, y_offset in state.kicks:
+                if board.fits(state.masks, x + x_offset, y + y_offset):
+                    x += x_offset
+                    y += y_offset
+                    rotation = state.rotation
+                    break
+            else:
+                break
+        if rotation not in distinct or any(result[1] == rotation for result in results):
+            continue
+        masks = states[rotation].masks
+        # 最高的方块上面都是空行，可以直接从那里开始往下找落点
+        start = max(y, top - len(masks))
+        # 向左、向右平移到挡住为止，每一列直接落下
+        left = x
+        while board.fits(masks, left - 1, y):
+            left -= 1
+        right = x
+        while board.fits(masks, right + 1, y):
+            right += 1
+        for column in range(left, right + 1):
+            results.append((presses, rotation, column, board.drop_row(masks, column, start)))
+    return results
+
+
+def apply_placement(board, shape, placement):
+    """返回放下方块并消除满行后的新棋盘（不带颜色平面）和消除的行数"""
+    _, rotation, x, y = placement
+    masks = CATALOG[shape][rotation].masks
+    board = board.copy(colors=False)
+    board.place(masks, x, y, 0)
+    # 只有方块所在的行可能被填满
+    full_row = board.full_row
+    lines = [row for row in range(y, y + len(masks)) if board.rows[row] == full_row]
+    return board, board.clear_rows(lines) if lines else 0
+
+
+def evaluate(board, lines, weights):
+    """局面评分：从上往下扫描每一行，记录每列第一次出现方块的高度，以及已有方块下面的空格（空洞）"""
+    return weights["lines"] * lines + shape_score(board, weights)
+
+
+def shape_score(board, weights):
+    """评分中只由棋盘各行决定的部分（高度、空洞、凹凸）"""
+    wall_row = board.wall_row
+    rows = board.rows
+    height = board.height
+    heights = [0] * board.width
+    covered = 0  # 上面已经有方块的列
+    holes = 0
+    # 方块总是落在地面或别的方块上，空行都在最上面，直接跳过
+    for y in range(rows.count(wall_row), height):
+        field = (rows[y] ^ wall_row) >> PAD
+        new = field & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = height - y
+            new ^= low
+        holes += bin(covered & ~field).count("1")
+        covered |= field
+    bumpiness = 0
+    previous = heights[0]
+    for column_height in heights:
+        bumpiness += abs(column_height - previous)
+        previous = column_height
+    return weights["height"] * sum(heights) + weights["holes"] * holes + weights["bumpiness"] * bumpiness
+
+
+class Evaluator:
+    """带缓存的 evaluate：只由行决定的部分按行元组缓存，可以在多次搜索之间共用"""
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, max_entries=EVALUATION_CACHE_SIZE):
+        self.weights = weights
+        self.lines_weight = weights["lines"]
+        self.max_entries = max_entries
+        self.cache = {}
+
+    def __call__(self, board, lines):
+        key = tuple(board.rows)
+        score = self.cache.get(key)
+        if score is None:
+            if len(self.cache) >= self.max_entries:
+                self.cache.clear()
+            score = self.cache[key] = shape_score(board, self.weights)
+        return self.lines_weight * lines + score
+
+
+def best_followup(board, lines, shape, weights, evaluator=None):
+    """放下 shape 后能得到的最高评分；放不下时按当前局面评分（游戏即将结束）"""
+    if evaluator is None:
+        evaluator = Evaluator(weights)
+    best = None
+    for placement in placements(board, shape):
+        after, cleared = apply_placement(board, shape, placement)
+        score = evaluator(after, lines + cleared)
+        if best is None or score > best:
+            best = score
+    return evaluator(board, lines) - 1000 if best is None else best
+
+
+def search(board, current, preview, weights=DEFAULT_WEIGHTS, evaluator=None, width=SEARCH_WIDTH):
+    """两层搜索：当前方块的落点去重后按一层评分保留最好的 width 个（0为不剪枝），
+    对每个取预览方块放下后的最高评分。返回 [(评分, 落点)]，按评分从高到低排列"""
+    if evaluator is None:
+        evaluator = Evaluator(weights)
+    seen = set()
+    first = []
+    for placement in placements(board, current):
+        after, lines = apply_placement(board, current, placement)
+        key = tuple(after.rows)
+        if key in seen:
+            continue
+        seen.add(key)
+        first.append((evaluator(after, lines), placement, after, lines))
+    first.sort(key=lambda item: item[0], reverse=True)
+    if preview is None:
+        return [(score, placement) for score, placement, _, _ in first]
+    if width:
+        first = first[:width]
+    scored = [(best_followup(after, lines, preview, weights, evaluator), placement)
+              for _, placement, after, lines in first]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored
+
+
+def deep_scores(width, height, rows, current, preview, weights, first_moves):
+    """在工作池里运行：对给定的第一步，取评分最高的几个第二步，
+    再对第三个方块的所有种类取最好落点评分的平均，返回 [(评分, 第一步)]"""
+    board = Board(width, height)
+    board.rows = list(rows)
+    board.colors = None
+    evaluator = Evaluator(weights)
+    results = []
+    for placement in first_moves:
+        after, lines = apply_placement(board, current, placement)
+        seconds = []
+        for second in placements(after, preview):
+            after2, cleared = apply_placement(after, preview, second)
+            seconds.append((evaluator(after2, lines + cleared), after2, lines + cleared))
+        seconds.sort(key=lambda item: item[0], reverse=True)
+        best = None
+        for _, after2, total in seconds[:DEEP_BRANCHES]:
+            expected = sum(best_followup(after2, total, shape, weights, evaluator)
+                           for shape in range(len(CATALOG))) / len(CATALOG)
+            if best is None or expected > best:
+                best = expected
+        if best is None:
+            best = evaluator(after, lines) - 1000
+        results.append((best, placement))
+    return results
+
+
+class Bot:
+    """自动操作一局 Tetris：每个新方块出现时搜索一次，然后按节奏逐个执行操作"""
+
+    def __init__(self, weights=None, actions_per_second=20, workers=0, processes=True, deep_timeout=1.0):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.evaluator = Evaluator(self.weights)  # 评分缓存在各个方块的搜索之间共用
+        self.action_interval = 1.0 / actions_per_second if actions_per_second else 0.0
+        self.deep_timeout = deep_timeout  # 等待更深一层搜索的最长秒数，超时就按两层搜索的结果执行
+        self.executor = None
+        if workers:
+            executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+            self.executor = executor_class(workers)
+        self.workers = workers
+        self.piece = None  # 正在为之执行计划的方块
+        self.plan = None  # (旋转状态, 列)
+        self.futures = []
+        self.plan_time = 0.0
+        self.last_action = 0.0
+        self.stalls = 0
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def start_piece(self, game, now):
+        piece = game.current_piece
+        preview = game.next_piece.shape if game.next_piece is not None else None
+        scored = search(game.board, piece.shape, preview, self.weights, self.evaluator)
+        self.piece = piece
+        self.plan = scored[0][1][1:3] if scored else None
+        self.plan_time = now
+        self.stalls = 0
+        self.futures = []
+        if self.executor is not None and preview is not None and len(scored) > 1:
+            # 两层搜索中排在前面的候选平均分给各个工作进程
+            candidates = [placement for _, placement in scored[:max(self.workers * 2, 8)]]
+            board = game.board
+            for i in range(self.workers):
+                moves = candidates[i::self.workers]
+                if moves:
+                    self.futures.append(self.executor.submit(
+                        deep_scores, board.width, board.height, tuple(board.rows), piece.shape, preview,
+                        self.weights, moves))
+
+    def collect(self, now):
+        """更深一层的结果全部回来时替换计划；返回是否还要继续等待"""
+        if not self.futures:
+            return False
+        if all(future.done() for future in self.futures):
+            results = [item for future in self.futures for item in future.result()]
+            self.futures = []
+            if results:
+                self.plan = max(results, key=lambda item: item[0])[1][1:3]
+            return False
+        if now - self.plan_time > self.deep_timeout:
+            for future in self.futures:
+                future.cancel()
+            self.futures = []
+            return False
+        return True
+
+    def update(self, game, now):
+        """每帧调用一次：新方块出现时重新搜索，否则按节奏执行一个操作"""
+        if game.game_over or game.paused or game.is_clearing:
+            return
+        if game.current_piece is not self.piece:
+            self.start_piece(game, now)
+        if self.collect(now) or now - self.last_action < self.action_interval:
+            return
+        self.last_action = now
+
+        piece = game.current_piece
+        if self.plan is None:
+            game.drop()
+            return
+        rotation, column = self.plan
+        before = (piece.rotation, piece.x, piece.y)
+        if piece.rotation != rotation:
+            game.rotate()
+        elif piece.x < column:
+            game.move_right()
+        elif piece.x > column:
+            game.move_left()
+        else:
+            game.drop()
+            return
+        # 被挡住（例如方块已经落得太低）时不再坚持原计划，直接落下
+        if (piece.rotation, piece.x, piece.y) == before:
+            self.stalls += 1
+            if self.stalls >= ROTATIONS:
+                game.drop()
@@ -0,0 +1,109 @@
+"""消除特效的粒子系统：结构数组（每个属性一行连续的 NumPy 缓冲区），容量一次分配好
+
+发射、移动、缩小和按寿命剔除都是整个数组一起算，剔除时把存活的粒子压缩到缓冲区前部，
+不创建也不删除任何 Python 对象。绘制时每种 (颜色, 半径) 的圆只预先画一次成小图，
+所有粒子用一次 Surface.blits 贴上去，而不是每个粒子调用一次 pygame.draw.circle。
+"""
+import numpy as np
+import pygame
+
+# 缓冲区的行：位置、速度、大小（半径）、寿命（相对于特效持续时间的比例）、颜色编号
+X, Y, VX, VY, SIZE, LIFE, COLOR = range(7)
+FIELDS = 7
+
+# 最多同时存在的粒子数，超出的新粒子直接丢弃
+MAX_PARTICLES = 4096
+
+# 粒子的最大半径（像素），预渲染的圆从半径1到这里
+MAX_RADIUS = 6
+
+
+class ParticleEmitter:
+    """在 (x, y) 位置喷出粒子，随特效进度移动、缩小并在寿命结束时消失"""
+
+    def __init__(self, colors, capacity=MAX_PARTICLES, max_radius=MAX_RADIUS, seed=None):
+        self.colors = list(colors)
+        self.capacity = capacity
+        self.max_radius = max_radius
+        self.data = np.zeros((FIELDS, capacity), dtype=np.float32)
+        self.count = 0
+        # 粒子只是画面效果，用自己的随机数生成器，不影响游戏的方块序列
+        self.rng = np.random.default_rng(seed)
+        self.sprites = None  # 第一次绘制时再渲染，这样不需要在导入或创建时就初始化显示
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, xs, ys, per_point, speed=3.0, sizes=(2, 6), life=(0.5, 1.0)):
+        """在每个 (xs[i], ys[i]) 处各喷出 per_point 个粒子：速度在 [-speed, speed] 内均匀分布，
+        半径取 sizes 闭区间内的整数，颜色随机"""
+        xs = np.repeat(np.asarray(xs, dtype=np.float32), per_point)
+        ys = np.repeat(np.asarray(ys, dtype=np.float32), per_point)
+        n = min(len(xs), self.capacity - self.count)
+        if n <= 0:
+            return
+        rng = self.rng
+        block = self.data[:, self.count:self.count + n]
+        block[X] = xs[:n]
+        block[Y] = ys[:n]
+        block[VX] = rng.uniform(-speed, speed, n)
+        block[VY] = rng.uniform(-speed, speed, n)
+        block[SIZE] = rng.integers(sizes[0], min(sizes[1], self.max_radius) + 1, n)
+        block[LIFE] = rng.uniform(life[0], life[1], n)
+        block[COLOR] = rng.integers(0, len(self.colors), n)
+        self.count += n
+
+    def update(self, progress, bounds=None):
+        """按特效进度推进一帧：去掉寿命已过（以及 bounds=(宽, 高) 以外）的粒子，其余的移动并缩小"""
+        n = self.count
+        if not n:
+            return
+        live = self.data[:, :n]
+        keep = live[LIFE] >= progress
+        if bounds is not None:
+            width, height = bounds
+            keep &= (live[X] > -self.max_radius) & (live[X] < width + self.max_radius)
+            keep &= (live[Y] > -self.max_radius) & (live[Y] < height + self.max_radius)
+        alive = int(np.count_nonzero(keep))
+        if alive < n:
+            # 存活的粒子压缩到缓冲区前部
+            self.data[:, :alive] = live[:, keep]
+            self.count = n = alive
+            live = self.data[:, :n]
+
+        # 更新位置
+        live[X] += live[VX]
+        live[Y] += live[VY]
+
+        # 粒子逐渐变小
+        np.maximum(live[SIZE] * (1 - progress / live[LIFE]), 1, out=live[SIZE])
+
+    def render_sprites(self):
+        """每种颜色、每个半径预先画一个圆，用颜色键（黑色）做透明"""
+        convert = pygame.display.get_surface() is not None
+        sprites = []
+        for color in self.colors:
+            for radius in range(self.max_radius + 1):
+                sprite = pygame.Surface((max(1, radius * 2), max(1, radius * 2)))
+                if radius:
+                    pygame.draw.circle(sprite, color, (radius, radius), radius)
+                if convert:
+                    sprite = sprite.convert()
+                sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+                sprites.append(sprite)
+        self.sprites = sprites
+
+    def draw(self, surface):
+        n = self.count
+        if not n:
+            return
+        if self.sprites is None:
+            self.render_sprites()
+        live = self.data[:, :n]
+        radius = np.clip(live[SIZE].astype(np.int32), 0, self.max_radius)
+        keys = live[COLOR].astype(np.int32) * (self.max_radius + 1) + radius
+        left = (live[X] - radius).astype(np.int32)
+        top = (live[Y] - radius).astype(np.int32)
+        sprites = self.sprites
+        surface.blits(list(zip(map(sprites.__getitem__, keys.tolist()), zip(left.tolist(), top.tolist()))),
+                      doreturn=False)
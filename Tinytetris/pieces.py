@@ -0,0 +1,78 @@
+"""方块目录：导入时一次算好每种方块每个旋转状态的格子偏移、每行位掩码、踢墙偏移和颜色编号
+
+目录里全是元组，游戏运行时只读不改；正在下落的方块（Piece）只记录方块种类、旋转状态编号和位置，
+移动和旋转只改这几个整数，不会创建新的对象。
+"""
+from collections import namedtuple
+from bitboard import shape_masks
+
+# 方块形状定义
+SHAPES = [
+    [[1, 1, 1, 1]],  # I
+    [[1, 1, 1], [1, 0, 0]],  # J
+    [[1, 1, 1], [0, 0, 1]],  # L
+    [[1, 1], [1, 1]],  # O
+    [[0, 1, 1], [1, 1, 0]],  # S
+    [[1, 1, 1], [0, 1, 0]],  # T
+    [[1, 1, 0], [0, 1, 1]]   # Z
+]
+
+# 每个方块的旋转状态数（顺时针转四次回到原样）
+ROTATIONS = 4
+
+# 旋转后放不下时依次尝试的 (列偏移, 行偏移)：先原地，再左右各挪一格、两格
+KICKS = ((0, 0), (-1, 0), (1, 0), (-2, 0), (2, 0))
+
+# 一个旋转状态：cells 为 (列偏移, 行偏移) 元组，masks 为每行的位掩码，
+# kicks 为转到这个状态时尝试的偏移，color 为颜色编号（从1开始，与棋盘的颜色平面一致）
+PieceState = namedtuple("PieceState", "shape rotation cells masks width height kicks color")
+
+
+def rotate_matrix(shape):
+    """顺时针旋转90度：转置后把行翻转"""
+    rows = len(shape)
+    cols = len(shape[0])
+    return [[shape[rows - 1 - j][i] for j in range(rows)] for i in range(cols)]
+
+
+def build_catalog():
+    catalog = []
+    for index, shape in enumerate(SHAPES):
+        states = []
+        for rotation in range(ROTATIONS):
+            cells = tuple((col, row) for row, line in enumerate(shape) for col, cell in enumerate(line) if cell)
+            states.append(PieceState(index, rotation, cells, shape_masks(shape), len(shape[0]), len(shape),
+                                     KICKS, index + 1))
+            shape = rotate_matrix(shape)
+        catalog.append(tuple(states))
+    return tuple(catalog)
+
+
+# CATALOG[方块种类][旋转状态]
+CATALOG = build_catalog()
+
+# 每种方块互不相同的旋转状态（例如 O 只有一个、I/S/Z 有两个），机器人枚举落点时用
+DISTINCT_ROTATIONS = tuple(
+    tuple(rotation for rotation in range(ROTATIONS)
+          if all(states[rotation].masks != states[other].masks for other in range(rotation)))
+    for states in CATALOG
+)
+
+
+class Piece:
+    """正在下落的方块：按 (种类, 旋转状态) 引用目录里的条目"""
+
+    __slots__ = ("shape", "rotation", "x", "y")
+
+    def __init__(self, shape, rotation=0, x=0, y=0):
+        self.shape = shape
+        self.rotation = rotation
+        self.x = x
+        self.y = y
+
+    @property
+    def state(self):
+        return CATALOG[self.shape][self.rotation]
+
+    def next_rotation(self):
+        return (self.rotation + 1) % ROTATIONS
@@ -0,0 +1,203 @@
+"""俄罗斯方块的规则引擎：不依赖 pygame，没有窗口、声音和导入时的副作用
+
+时间来自注入的时钟（返回秒数的函数，默认 time.time），方块序列来自可指定种子的随机数生成器，
+所以同一个种子、同样的操作总是得到同一局游戏。测试和批量模拟用 ManualClock 手动推进时间，
+不用真的等待下落间隔和消除特效，可以比实时快几千倍：
+
+    clock = ManualClock()
+    game = TetrisCore(seed=1, clock=clock)
+    while not game.game_over:
+        game.drop()
+        clock.advance(1.0)
+        game.update()
+
+pygame_tetris.py 里的 Tetris 只是在它上面加上绘制、音效和粒子特效。
+"""
+import random
+import time
+from bitboard import Board
+from pieces import SHAPES, CATALOG, Piece
+
+# 游戏区域大小（以方块数计）
+GRID_WIDTH = 15
+GRID_HEIGHT = 25
+
+# 一次消除的行数对应的基础分（乘以等级）
+LINE_SCORES = {1: 100, 2: 300, 3: 500, 4: 800}
+
+
+class ManualClock:
+    """手动推进的时钟，用于测试和批量模拟"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class TetrisCore:
+    """一局俄罗斯方块的全部规则：下落、移动、旋转、消除、计分和等级"""
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None, clock=time.time):
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.width = width
+        self.height = height
+        # 位棋盘：每行一个整数位掩码，另有颜色平面
+        self.board = Board(width, height)
+        self.current_piece = self.new_piece()
+        self.next_piece = self.new_piece()  # 预览的下一个方块
+        self.game_over = False
+        self.score = 0
+        self.level = 1
+        self.lines = 0  # 累计消除的行数
+        self.pieces = 1  # 累计出现的方块数
+        self.fall_speed = 0.5  # 方块下落速度（秒）
+        self.last_fall_time = clock()
+        self.paused = False
+        # 消除特效期间方块不动，特效结束后才真正去掉这些行
+        self.lines_to_clear = []  # 存储要消除的行
+        self.clear_effect_start = 0  # 特效开始时间
+        self.clear_effect_duration = 0.8  # 特效持续时间(秒)
+        self.is_clearing = False  # 是否正在显示消除特效
+
+    def new_piece(self):
+        # 随机选择一个方块形状
+        shape_idx = self.rng.randint(0, len(SHAPES) - 1)
+
+        # 方块起始位置（居中，顶部）
+        x = self.width // 2 - CATALOG[shape_idx][0].width // 2
+        return Piece(shape_idx, 0, x, 0)
+
+    def spawn_piece(self):
+        # 预览的方块成为当前方块，再生成新的预览；出生位置已经被挡住时游戏结束
+        self.current_piece = self.next_piece
+        self.next_piece = self.new_piece()
+        self.pieces += 1
+        if not self.is_valid_position(self.current_piece):
+            self.game_over = True
+
+    def is_valid_position(self, piece, x=None, y=None, rotation=None):
+        if x is None:
+            x = piece.x
+        if y is None:
+            y = piece.y
+        if rotation is None:
+            rotation = piece.rotation
+
+        # 越界和重叠都由位棋盘按行做一次按位与检查
+        return self.board.fits(CATALOG[piece.shape][rotation].masks, x, y)
+
+    def merge_piece(self):
+        # 将当前方块合并到游戏网格中
+        piece = self.current_piece
+        state = piece.state
+
+        # 如果方块顶部超出屏幕，游戏结束
+        if not self.board.place(state.masks, piece.x, piece.y, state.color):
+            self.game_over = True
+
+    def clear_lines(self):
+        # 检查已填满的行（整行位掩码与满行比较）
+        lines_to_clear = self.board.full_rows()
+        if not lines_to_clear:
+            return False
+
+        # 开始消除特效
+        self.lines_to_clear = lines_to_clear
+        self.clear_effect_start = self.clock()
+        self.is_clearing = True
+
+        # 更新分数
+        lines_cleared = len(lines_to_clear)
+        self.lines += lines_cleared
+        self.score += LINE_SCORES.get(lines_cleared, 0) * self.level
+
+        # 每10000分提高一级
+        self.level = max(1, self.score // 10000 + 1)
+        # 调整下落速度
+        self.fall_speed = max(0.05, 0.5 - (self.level - 1) * 0.05)
+
+        self.on_lines_cleared(lines_to_clear)
+        return True
+
+    def on_lines_cleared(self, lines):
+        """开始消除特效时调用，前端在这里播放音效"""
+
+    def apply_line_clear(self):
+        # 实际执行行消除（在特效结束后调用），一次压缩去掉所有消除的行
+        self.board.clear_rows(self.lines_to_clear)
+
+        # 重置特效状态
+        self.lines_to_clear = []
+        self.is_clearing = False
+
+    def clear_progress(self):
+        """消除特效进行到的比例（0~1）"""
+        return min(1.0, (self.clock() - self.clear_effect_start) / self.clear_effect_duration)
+
+    def move_left(self):
+        if not self.game_over and not self.paused:
+            if self.is_valid_position(self.current_piece, x=self.current_piece.x - 1):
+                self.current_piece.x -= 1
+
+    def move_right(self):
+        if not self.game_over and not self.paused:
+            if self.is_valid_position(self.current_piece, x=self.current_piece.x + 1):
+                self.current_piece.x += 1
+
+    def move_down(self):
+        if not self.game_over and not self.paused and not self.is_clearing:
+            if self.is_valid_position(self.current_piece, y=self.current_piece.y + 1):
+                self.current_piece.y += 1
+                return True
+            else:
+                # 如果不能再下落，合并方块并生成新方块
+                self.merge_piece()
+                lines_cleared = self.clear_lines()
+                if not self.game_over and not lines_cleared:
+                    self.spawn_piece()
+                return False
+
+    def rotate(self):
+        if not self.game_over and not self.paused:
+            piece = self.current_piece
+            state = CATALOG[piece.shape][piece.next_rotation()]
+            # 依次尝试踢墙偏移（先原地，再左右移动）以适应旋转后的形状
+            for x_offset, y_offset in state.kicks:
+                if self.board.fits(state.masks, piece.x + x_offset, piece.y + y_offset):
+                    piece.rotation = state.rotation
+                    piece.x += x_offset
+                    piece.y += y_offset
+                    return
+
+    def drop(self):
+        if not self.game_over and not self.paused:
+            while self.move_down():
+                pass
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+    def update(self):
+        """按时钟推进：消除特效结束后去掉满行并放出新方块，到了下落间隔就下落一格"""
+        if self.game_over or self.paused:
+            return
+
+        # 如果正在显示消除特效
+        current_time = self.clock()
+        if self.is_clearing:
+            if current_time - self.clear_effect_start > self.clear_effect_duration:
+                self.apply_line_clear()
+                if not self.game_over:
+                    self.spawn_piece()
+            return
+
+        # 控制方块下落
+        if current_time - self.last_fall_time > self.fall_speed:
+            self.move_down()
+            self.last_fall_time = current_time
@@ -0,0 +1 @@
+"""几个小游戏共用的工具模块"""
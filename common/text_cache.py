@@ -0,0 +1,61 @@
+"""HUD文字缓存：字体对象按 (名称, 字号) 缓存，渲染好的文字图像按
+(字体, 文字, 颜色, 抗锯齿) 放进有上限的LRU缓存，避免每帧重新构造字体和光栅化字形。
+
+各个游戏在自己的目录下运行，需要先把仓库根目录加入 sys.path：
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.text_cache import get_sysfont, render_text
+"""
+from collections import OrderedDict
+import pygame
+
+# 最多缓存的文字图像数量
+MAX_CACHED_TEXTS = 256
+
+_fonts = {}
+_texts = OrderedDict()
+
+
+def get_sysfont(name, size):
+    """获取系统字体（name 为 None 时使用默认字体），同名同字号只创建一次"""
+    key = ("sys", name, size)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+
+def get_font(path, size):
+    """获取字体文件对应的字体（path 为 None 时使用默认字体），加载失败会抛出异常"""
+    key = ("file", path, size)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(path, size)
+        _fonts[key] = font
+    return font
+
+
+def render_text(font, text, color, antialias=True):
+    """渲染文字，相同参数直接返回缓存的图像（调用方不要修改返回的图像）"""
+    key = (font, text, tuple(color), antialias)
+    surface = _texts.get(key)
+    if surface is not None:
+        _texts.move_to_end(key)
+        return surface
+
+    surface = font.render(text, antialias, color)
+    _texts[key] = surface
+    if len(_texts) > MAX_CACHED_TEXTS:
+        _texts.popitem(last=False)
+    return surface
+
+
+def clear():
+    """清空所有缓存"""
+    _fonts.clear()
+    _texts.clear()
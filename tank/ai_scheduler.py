@@ -0,0 +1,246 @@
+"""敌人AI调度器：把AI决策交给线程池或进程池计算，结果在下一个tick应用
+
+每个tick把只读的状态（坦克位置、目标、压缩后的导航网格和瓦片网格）提交给工作池，
+工作池里做寻路、预测目标位置和视线检测，返回每辆坦克的转向角度和是否射击。
+上一个tick提交的结果在这个tick应用；结果没有按时回来时，最多沿用几个tick前的决策，
+再不行就用 World.control_ai 的简单AI兜底，所以主循环不会因为AI计算而卡顿。
+
+每帧最多等待结果的时间由 frame_budget 控制（主循环每帧调用 start_frame 重置）；
+frame_budget 为 None 时总是等到结果为止，这样结果与时机无关、可以复现。
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+import numpy as np
+from bullet import BULLET_SPEED
+from navigation import FlowField
+from wall import BRICK, STEEL
+
+# 工作线程/进程里最多缓存的流场数量
+MAX_WORKER_FIELDS = 8
+
+# 瞄准时允许的最远距离（子弹默认寿命内能飞的距离）
+FIRE_RANGE = BULLET_SPEED * 180
+
+# 视线检测时沿线段采样的最大点数
+MAX_SIGHT_SAMPLES = 256
+
+# 每个工作线程/进程自己的网格和流场缓存
+_worker_cache = threading.local()
+
+
+def pack_grid(grid):
+    """把布尔网格压缩成位数组，减少发给工作进程的数据量"""
+    return grid.shape, np.packbits(grid, axis=None).tobytes()
+
+
+def unpack_grid(packed):
+    shape, data = packed
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=shape[0] * shape[1])
+    return bits.reshape(shape).astype(bool)
+
+
+def worker_grids(request):
+    """取出（必要时解压）请求对应的导航网格和瓦片网格，版本不变时复用缓存和流场"""
+    cache = _worker_cache
+    key = (request["generation"], request["nav_version"], request["walls_version"])
+    if getattr(cache, "key", None) != key:
+        cache.key = key
+        cache.blocked = unpack_grid(request["blocked"])
+        cache.opaque = unpack_grid(request["opaque"])
+        cache.fields = OrderedDict()
+    return cache
+
+
+def worker_field(cache, goal, radius):
+    field = cache.fields.get(goal)
+    if field is None:
+        field = FlowField(cache.blocked, goal, radius)
+        cache.fields[goal] = field
+        if len(cache.fields) > MAX_WORKER_FIELDS:
+            cache.fields.popitem(last=False)
+    else:
+        cache.fields.move_to_end(goal)
+    return field
+
+
+def line_of_sight(opaque, tile_size, xs, ys, target_xs, target_ys):
+    """批量检测从每个起点到终点的线段是否没有被砖墙或钢墙挡住（水不挡子弹）"""
+    rows, cols = opaque.shape
+    length = np.hypot(target_xs - xs, target_ys - ys)
+    samples = int(min(MAX_SIGHT_SAMPLES, max(2, np.ceil(length.max(initial=0) / (tile_size / 2)))))
+    t = np.linspace(0.0, 1.0, samples)
+    sample_cols = ((xs[:, None] + (target_xs - xs)[:, None] * t) // tile_size).astype(np.intp)
+    sample_rows = ((ys[:, None] + (target_ys - ys)[:, None] * t) // tile_size).astype(np.intp)
+    np.clip(sample_cols, 0, cols - 1, out=sample_cols)
+    np.clip(sample_rows, 0, rows - 1, out=sample_rows)
+    return ~opaque[sample_rows, sample_cols].any(axis=1)
+
+
+def plan(request):
+    """在工作池里运行：返回 (请求的tick, 坦克编号数组, 角度数组, 是否射击数组)；
+    角度为 NaN 表示这辆坦克没有决策（例如没有路径），由调度器兜底"""
+    ids = request["ids"]
+    xs, ys = request["xs"], request["ys"]
+    angles = np.full(len(ids), np.nan)
+    fire = np.zeros(len(ids), dtype=bool)
+    target = request["target"]
+    if target is None or len(ids) == 0:
+        return request["tick"], ids, angles, fire
+
+    cache = worker_grids(request)
+    cell_size = request["cell_size"]
+    rows, cols = cache.blocked.shape
+    target_x, target_y, target_vx, target_vy = target
+
+    # 沿流场朝目标前进
+    field = worker_field(cache, (int(target_x // cell_size), int(target_y // cell_size)), request["field_radius"])
+    if field.next_col is not None:
+        tank_cols = np.clip((xs // cell_size).astype(np.intp), 0, cols - 1)
+        tank_rows = np.clip((ys // cell_size).astype(np.intp), 0, rows - 1)
+        dist, next_col, next_row = field.sample(tank_cols, tank_rows)
+        has_path = (dist >= 0) & ((next_col != tank_cols) | (next_row != tank_rows))
+        waypoint_x = (next_col + 0.5) * cell_size
+        waypoint_y = (next_row + 0.5) * cell_size
+        angles[has_path] = np.degrees(np.arctan2(ys - waypoint_y, waypoint_x - xs))[has_path]
+
+    # 预测目标在子弹飞到时的位置，有视线且在射程内就转向瞄准点射击
+    dist = np.hypot(target_x - xs, target_y - ys)
+    lead = dist / BULLET_SPEED
+    aim_x = target_x + target_vx * lead
+    aim_y = target_y + target_vy * lead
+    in_range = dist < FIRE_RANGE
+    visible = np.zeros(len(ids), dtype=bool)
+    if in_range.any():
+        visible[in_range] = line_of_sight(cache.opaque, request["tile_size"], xs[in_range], ys[in_range],
+                                          aim_x[in_range], aim_y[in_range])
+    angles[visible] = np.degrees(np.arctan2(ys - aim_y, aim_x - xs))[visible]
+    fire[visible] = True
+    return request["tick"], ids, angles, fire
+
+
+class AIScheduler:
+    """把敌人AI交给工作池计算，结果在下一个tick应用"""
+
+    def __init__(self, workers=2, processes=True, frame_budget=0.002, max_stale_ticks=6, max_pending=None):
+        executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor_class(workers)
+        self.frame_budget = frame_budget  # 每帧最多等待结果的秒数，None 为一直等待
+        self.remaining = frame_budget
+        self.max_stale_ticks = max_stale_ticks  # 决策最多沿用的tick数
+        self.max_pending = max_pending or workers  # 同时在计算的请求数上限
+        self.pending = deque()  # (提交时的tick, future)
+        self.decisions = {}  # 坦克编号 -> [决策对应的tick, 角度, 是否射击]
+        self.packed = {}  # 网格 -> (版本, 压缩后的数据)
+        # 世界的代数：换了世界或调用 reset 时加一，和网格版本一起作为工作进程缓存的键。
+        # 不能用 id(world)：旧世界释放后新世界可能得到同一个 id，没见过新世界的工作进程会误用旧网格
+        self.generation = 0
+        self.world = None
+        self.stats = Counter()
+
+    def start_frame(self):
+        """每帧开始时重置等待预算"""
+        self.remaining = self.frame_budget
+
+    def reset(self):
+        """换了新的世界或恢复了快照：丢弃所有还没应用的决策"""
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.decisions.clear()
+        self.packed.clear()
+        self.generation += 1
+
+    def close(self):
+        self.reset()
+        self.executor.shutdown(cancel_futures=True)
+
+    def control(self, world, tanks, target):
+        """在 World.step 中代替 control_ai：应用已有的决策，没有决策的坦克用简单AI兜底，
+        然后提交这个tick的状态"""
+        self.collect()
+
+        fallback = []
+        bullets = world.bullets
+        for tank in tanks:
+            decision = self.decisions.get(tank.tank_id)
+            if decision is None or world.tick - decision[0] > self.max_stale_ticks:
+                fallback.append(tank)
+                continue
+            tank.angle = decision[1]
+            radians = math.radians(tank.angle)
+            tank.move(math.cos(radians), -math.sin(radians))
+            if decision[2]:
+                tank.shoot(bullets)
+                decision[2] = False  # 同一个决策只射击一次
+        self.stats["applied"] += len(tanks) - len(fallback)
+        self.stats["fallback"] += len(fallback)
+        world.control_ai(fallback, target)
+
+        self.submit(world, tanks, target)
+
+    def collect(self):
+        """取回已经算好的结果；按预算等待还没算完的最早请求"""
+        while self.pending:
+            request_tick, future = self.pending[0]
+            if not future.done():
+                if self.remaining is None:
+                    future.result()
+                elif self.remaining > 0:
+                    start = time.perf_counter()
+                    try:
+                        future.result(timeout=self.remaining)
+                    except TimeoutError:
+                        pass
+                    self.remaining -= time.perf_counter() - start
+                if not future.done():
+                    self.stats["late"] += 1
+                    break
+            self.pending.popleft()
+            tick, ids, angles, fire = future.result()
+            for tank_id, angle, shoot in zip(ids.tolist(), angles.tolist(), fire.tolist()):
+                if not math.isnan(angle):
+                    self.decisions[tank_id] = [tick, angle, shoot]
+
+    def packed_grid(self, name, version, grid_factory):
+        """压缩后的网格按版本缓存，网格没变时不重复压缩"""
+        cached = self.packed.get(name)
+        if cached is None or cached[0] != version:
+            cached = self.packed[name] = (version, pack_grid(grid_factory()))
+        return cached[1]
+
+    def submit(self, world, tanks, target):
+        if len(self.pending) >= self.max_pending:
+            # 工作池忙不过来时跳过这个tick，已有决策继续沿用
+            self.stats["skipped"] += 1
+            return
+        count = len(tanks)
+        if world is not self.world:
+            # 保留对当前世界的引用，换成另一个世界对象时一定能发现
+            self.world = world
+            self.generation += 1
+        nav, walls = world.nav, world.walls
+        generation = self.generation
+        target_state = None
+        if target.alive():
+            target_state = (target.x, target.y, target.last_dx * target.speed, target.last_dy * target.speed)
+        request = {
+            "tick": world.tick,
+            "ids": np.fromiter((tank.tank_id for tank in tanks), dtype=np.int32, count=count),
+            "xs": np.fromiter((tank.x for tank in tanks), dtype=np.float64, count=count),
+            "ys": np.fromiter((tank.y for tank in tanks), dtype=np.float64, count=count),
+            "target": target_state,
+            "generation": generation,
+            "nav_version": nav.version,
+            "walls_version": walls.version,
+            "blocked": self.packed_grid("blocked", (generation, nav.version), lambda: nav.blocked),
+            "opaque": self.packed_grid("opaque", (generation, walls.version),
+                                       lambda: (walls.types == BRICK) | (walls.types == STEEL)),
+            "cell_size": nav.cell_size,
+            "field_radius": nav.field_radius,
+            "tile_size": walls.tile_size,
+        }
+        self.pending.append((world.tick, self.executor.submit(plan, request)))
+        self.stats["submitted"] += 1
@@ -0,0 +1,83 @@
+"""无窗口批量对战：用进程池跑大量AI对AI比赛，统计胜率和模拟速度
+
+用法：python batch.py --matches 1000 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+# 子进程不需要窗口和声音
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from world import World
+from level import load_level
+
+
+def run_match(args):
+    """跑一局AI对AI比赛，返回 (种子, 胜利方, tick数, 耗时秒数)"""
+    seed, width, height, max_ticks, level_path = args
+    level = load_level(level_path) if level_path else None
+    world = World(width, height, seed=seed, level=level)
+    start = time.perf_counter()
+    while not world.game_over and world.tick < max_ticks:
+        world.step()
+    elapsed = time.perf_counter() - start
+    return seed, world.winner or "draw", world.tick, elapsed
+
+
+def run_batch(matches, workers=None, width=800, height=600, max_ticks=10800, first_seed=0, level_path=None):
+    """在进程池中跑一批比赛，返回统计结果"""
+    jobs = [(first_seed + i, width, height, max_ticks, level_path) for i in range(matches)]
+    results = Counter()
+    total_ticks = 0
+    busy_time = 0.0
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        chunksize = max(1, matches // ((workers or os.cpu_count() or 1) * 8))
+        for _, winner, ticks, elapsed in pool.imap_unordered(run_match, jobs, chunksize):
+            results[winner] += 1
+            total_ticks += ticks
+            busy_time += elapsed
+    wall_time = time.perf_counter() - start
+
+    return {
+        "matches": matches,
+        "results": dict(results),
+        "total_ticks": total_ticks,
+        "wall_time": wall_time,
+        "ticks_per_second": total_ticks / wall_time if wall_time else 0.0,
+        "ticks_per_second_per_worker": total_ticks / busy_time if busy_time else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量运行AI对AI的坦克大战比赛")
+    parser.add_argument("--matches", type=int, default=1000, help="比赛场数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--width", type=int, default=800, help="场地宽度")
+    parser.add_argument("--height", type=int, default=600, help="场地高度")
+    parser.add_argument("--max-ticks", type=int, default=10800, help="每局最多tick数，超出算平局")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的随机种子，之后依次加一")
+    parser.add_argument("--level", help="使用关卡文件（默认每局随机生成墙壁）")
+    args = parser.parse_args()
+
+    stats = run_batch(args.matches, args.workers, args.width, args.height, args.max_ticks, args.seed,
+                      args.level)
+
+    print(f"比赛场数: {stats['matches']}")
+    for winner in ("player", "enemy", "draw"):
+        count = stats["results"].get(winner, 0)
+        print(f"  {winner:>6}: {count:6d}  ({count / stats['matches']:.1%})")
+    print(f"总tick数: {stats['total_ticks']}")
+    print(f"耗时: {stats['wall_time']:.2f}s")
+    print(f"吞吐量: {stats['ticks_per_second']:.0f} ticks/s "
+          f"(单进程 {stats['ticks_per_second_per_worker']:.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,208 @@
 import pygame
 import math
+import numpy as np
+from rotation_cache import get_rotation_cache
+
+# 子弹碰撞半径（把子弹近似为一个点，目标矩形向外扩展该距离）
+BULLET_RADIUS = 2
+
+# 子弹默认速度（像素/tick）
+BULLET_SPEED = 7
+
+# 两颗子弹中心距离不超过这个值就算相撞（子弹图像宽4像素）
+BULLET_CONTACT = 4
+
+# 保存子弹状态的所有数组
+STATE_ARRAYS = ("x", "y", "prev_x", "prev_y", "dx", "dy", "lifetime", "owner", "team", "damage", "frame",
+                "serial", "alive")
+
+
+def create_bullet_image():
+    """绘制未旋转的子弹原始图像"""
+    image = pygame.Surface((8, 4), pygame.SRCALPHA)
+    pygame.draw.rect(image, (255, 255, 0), (0, 0, 8, 4))
+    return image
+
+
+class BulletField:
+    """用NumPy数组保存所有子弹的状态，整批更新、剔除和绘制"""
+
+    def __init__(self, bounds, capacity=256):
+        self.width, self.height = bounds
+        self.rotations = get_rotation_cache(("bullet",), create_bullet_image)
+
+        self.capacity = 0
+        self.x = np.zeros(0, dtype=np.float64)
+        self.y = np.zeros(0, dtype=np.float64)
+        self.prev_x = np.zeros(0, dtype=np.float64)  # 上一个tick的位置，渲染时插值用
+        self.prev_y = np.zeros(0, dtype=np.float64)
+        self.dx = np.zeros(0, dtype=np.float64)
+        self.dy = np.zeros(0, dtype=np.float64)
+        self.lifetime = np.zeros(0, dtype=np.int32)
+        self.owner = np.zeros(0, dtype=np.int32)  # 发射子弹的坦克编号
+        self.team = np.zeros(0, dtype=np.int32)  # 发射者所在阵营，不会打中队友
+        self.damage = np.zeros(0, dtype=np.int32)
+        self.frame = np.zeros(0, dtype=np.int16)  # 旋转缓存中的帧序号
+        self.serial = np.zeros(0, dtype=np.uint32)  # 发射序号，槽位被复用时用来区分不同的子弹
+        self.alive = np.zeros(0, dtype=bool)
+        self.next_serial = 0
+
+        # 空闲槽位栈，子弹消失后槽位会被复用
+        self.free_slots = []
+        self.count = 0
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """扩容到指定槽位数，新槽位加入空闲栈"""
+        old = self.capacity
+        for name in STATE_ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self.free_slots.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, angle, owner, speed=BULLET_SPEED, damage=10, lifetime=180, team=0):
+        """发射一颗子弹，返回占用的槽位"""
+        if not self.free_slots:
+            self.grow(self.capacity * 2)
+        slot = self.free_slots.pop()
 
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, angle, owner, speed=7, damage=10):
-        super().__init__()
-        self.x = x
-        self.y = y
-        self.angle = angle
-        self.speed = speed
-        self.damage = damage
-        self.owner = owner  # 发射子弹的坦克
-        
-        # 子弹图像
-        self.image = pygame.Surface((8, 4), pygame.SRCALPHA)
-        pygame.draw.rect(self.image, (255, 255, 0), (0, 0, 8, 4))
-        self.image = pygame.transform.rotate(self.image, angle)
-        self.rect = self.image.get_rect(center=(x, y))
-        
         # 计算子弹速度的向量分量
         rad_angle = math.radians(angle)
-        self.dx = math.cos(rad_angle) * speed
-        self.dy = -math.sin(rad_angle) * speed
-        
-        # 子弹生命时间（防止无限飞行）
-        self.lifetime = 180  # 3秒（60帧/秒）
-    
+        self.x[slot] = self.prev_x[slot] = x
+        self.y[slot] = self.prev_y[slot] = y
+        self.dx[slot] = math.cos(rad_angle) * speed
+        self.dy[slot] = -math.sin(rad_angle) * speed
+        self.lifetime[slot] = lifetime  # 子弹生命时间（防止无限飞行），默认3秒
+        self.owner[slot] = owner
+        self.team[slot] = team
+        self.damage[slot] = damage
+        self.frame[slot] = self.rotations.index(angle)
+        self.serial[slot] = self.next_serial
+        self.next_serial += 1
+        self.alive[slot] = True
+        self.count += 1
+        return slot
+
+    def kill(self, slots):
+        """让一批子弹消失，并回收槽位"""
+        slots = np.asarray(slots, dtype=np.intp)
+        slots = slots[self.alive[slots]]
+        if len(slots) == 0:
+            return
+        slots = np.unique(slots)
+        self.alive[slots] = False
+        self.free_slots.extend(slots.tolist())
+        self.count -= len(slots)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def snapshot(self):
+        """复制全部子弹状态（数组、空闲槽位栈和计数）"""
+        arrays = {name: getattr(self, name).copy() for name in STATE_ARRAYS}
+        return arrays, list(self.free_slots), self.count, self.next_serial
+
+    def restore(self, state):
+        """恢复 snapshot() 保存的状态；容量相同时直接复制到现有数组"""
+        arrays, free_slots, count, next_serial = state
+        capacity = len(arrays["alive"])
+        for name in STATE_ARRAYS:
+            if capacity == self.capacity:
+                np.copyto(getattr(self, name), arrays[name])
+            else:
+                setattr(self, name, arrays[name].copy())
+        self.capacity = capacity
+        self.free_slots = list(free_slots)
+        self.count = count
+        self.next_serial = next_serial
+
+    def live_slots(self):
+        return np.flatnonzero(self.alive)
+
     def update(self):
-        # 更新子弹位置
-        self.x += self.dx
-        self.y += self.dy
-        self.rect.center = (self.x, self.y)
-        
-        # 减少生命时间，到期自动消失
-        self.lifetime -= 1
-        if self.lifetime <= 0:
-            self.kill()
-        
-        # 检查是否超出屏幕边界
-        screen_width, screen_height = pygame.display.get_surface().get_size()
-        if (self.x < 0 or self.x > screen_width or 
-            self.y < 0 or self.y > screen_height):
-            self.kill()
-    
-    def hit(self, target):
-        """当子弹击中目标时调用"""
-        # 自动消失
-        self.kill() 
\ No newline at end of file
+        """一次向量化步进所有子弹，并整批剔除过期和出界的子弹"""
+        if self.count == 0:
+            return
+        alive = self.alive
+        self.prev_x[alive] = self.x[alive]
+        self.prev_y[alive] = self.y[alive]
+        self.x[alive] += self.dx[alive]
+        self.y[alive] += self.dy[alive]
+        self.lifetime[alive] -= 1
+
+        expired = alive & ((self.lifetime <= 0) |
+                           (self.x < 0) | (self.x > self.width) |
+                           (self.y < 0) | (self.y > self.height))
+        self.kill(np.flatnonzero(expired))
+
+    def colliding_pairs(self, first, second, distance=BULLET_CONTACT):
+        """从候选子弹对（两个槽位数组）中找出这个tick内飞行路径互相接触的不同阵营子弹，
+        返回这些子弹的槽位。按上一个tick到这个tick的直线运动求最近距离，相向飞行时不会互相穿过"""
+        opposing = self.team[first] != self.team[second]
+        first, second = first[opposing], second[opposing]
+        if len(first) == 0:
+            return first
+        # 相对位置和这个tick内的相对位移，求 t∈[0, 1] 内的最近距离
+        px = self.prev_x[first] - self.prev_x[second]
+        py = self.prev_y[first] - self.prev_y[second]
+        vx = (self.x[first] - self.prev_x[first]) - (self.x[second] - self.prev_x[second])
+        vy = (self.y[first] - self.prev_y[first]) - (self.y[second] - self.prev_y[second])
+        speed = vx * vx + vy * vy
+        t = np.clip(-(px * vx + py * vy) / np.where(speed > 0, speed, 1.0), 0.0, 1.0)
+        closest_x = px + vx * t
+        closest_y = py + vy * t
+        touching = closest_x * closest_x + closest_y * closest_y <= distance * distance
+        return np.concatenate((first[touching], second[touching]))
+
+    def overlapping_mask(self, slots, mask, topleft):
+        """从候选槽位中筛出图像与遮罩真正重叠的子弹（像素级检测，
+        候选应先经过 Broadphase.rect_pairs 的矩形检测）；topleft 为遮罩左上角的坐标"""
+        slots = np.asarray(slots, dtype=np.intp)
+        if len(slots) == 0:
+            return slots
+        masks = self.rotations.masks
+        offsets = [offset for _, offset in self.rotations.frames]
+        left, top = topleft
+        hit = []
+        for frame, x, y in zip(self.frame[slots].tolist(), self.x[slots].astype(np.int32).tolist(),
+                               self.y[slots].astype(np.int32).tolist()):
+            offset_x, offset_y = offsets[frame]
+            hit.append(mask.overlap(masks[frame], (x + offset_x - left, y + offset_y - top)) is not None)
+        return slots[np.array(hit, dtype=bool)]
+
+    def draw(self, surface, return_rects=False, alpha=1.0, view=None, fog=None):
+        """一次 blits 调用绘制所有子弹；alpha 为两个tick之间的插值比例，
+        return_rects 为 True 时返回绘制区域。view 为镜头视野（世界坐标的矩形）时
+        只画视野内的子弹，并换算成屏幕坐标；fog 为战争迷雾时不画看不到的子弹"""
+        if self.count == 0:
+            return []
+        slots = self.live_slots()
+        if view is not None:
+            # 留出子弹图像的大小，边缘上的子弹也能画出一部分
+            inside = ((self.x[slots] >= view.left - 8) & (self.x[slots] < view.right + 8) &
+                      (self.y[slots] >= view.top - 8) & (self.y[slots] < view.bottom + 8))
+            slots = slots[inside]
+        if fog is not None:
+            slots = slots[fog.covers(self.x[slots], self.y[slots])]
+        frames = self.rotations.frames
+        prev_x = self.prev_x[slots]
+        prev_y = self.prev_y[slots]
+        xs = prev_x + (self.x[slots] - prev_x) * alpha
+        ys = prev_y + (self.y[slots] - prev_y) * alpha
+        if view is not None:
+            xs -= view.x
+            ys -= view.y
+        sequence = []
+        for frame, x, y in zip(self.frame[slots].tolist(), xs.astype(np.int32).tolist(),
+                               ys.astype(np.int32).tolist()):
+            image, (offset_x, offset_y) = frames[frame]
+            sequence.append((image, (x + offset_x, y + offset_y)))
+        return surface.blits(sequence, return_rects) or []
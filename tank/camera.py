@@ -0,0 +1,31 @@
+import pygame
+
+
+class Camera:
+    """跟随玩家的镜头：视野是世界坐标中与屏幕一样大的矩形，不会移出场地"""
+
+    def __init__(self, view_width, view_height, world_width, world_height):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.rect = pygame.Rect(0, 0, view_width, view_height)
+
+    def follow(self, tank, alpha=1.0):
+        """把视野中心移到坦克的插值位置（alpha 为两个tick之间的插值比例）"""
+        x = tank.prev_x + (tank.x - tank.prev_x) * alpha
+        y = tank.prev_y + (tank.y - tank.prev_y) * alpha
+        self.center_on(x, y)
+
+    def center_on(self, x, y):
+        rect = self.rect
+        # 场地比屏幕小的方向上居中，否则限制在场地内
+        if self.world_width <= rect.width:
+            rect.x = (self.world_width - rect.width) // 2
+        else:
+            rect.x = min(max(int(x) - rect.width // 2, 0), self.world_width - rect.width)
+        if self.world_height <= rect.height:
+            rect.y = (self.world_height - rect.height) // 2
+        else:
+            rect.y = min(max(int(y) - rect.height // 2, 0), self.world_height - rect.height)
+
+    def to_screen(self, x, y):
+        return x - self.rect.x, y - self.rect.y
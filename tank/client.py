@@ -0,0 +1,267 @@
+"""坦克大战联机客户端：把按键变化发给服务器，根据服务器的增量快照还原并绘制画面
+
+用法：python client.py --host 127.0.0.1 --port 8765
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import pygame
+import protocol
+from bullet import create_bullet_image
+from camera import Camera
+from rotation_cache import get_rotation_cache
+from tank import create_tank_image
+from wall import TileMap, EMPTY
+from world import GREEN, RED, INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE
+
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, render_text
+
+# 每个客户端最多记录的输入发送时间（用来测量输入到被服务器处理的延迟）
+MAX_PENDING_INPUTS = 64
+
+# 窗口的最大尺寸，场地更大时镜头跟随自己的坦克
+MAX_VIEW_SIZE = (800, 600)
+
+
+class RemoteWorld:
+    """客户端根据服务器消息还原出来的世界状态"""
+
+    def __init__(self):
+        self.round = None
+        self.tank_id = -1
+        self.team = 0
+        self.tick_rate = 60
+        self.width = self.height = 0
+        self.tick = 0
+        self.walls = None
+        self.tanks = {}  # 坦克编号 -> (编号, 阵营, 帧序号, x, y, 血量)
+        self.bullets = {}  # 发射序号 -> (阵营, 帧序号, x, y, dx, dy, 出现时的tick)
+
+    def welcome(self, message):
+        """新一局开始：载入完整地图，清空坦克和子弹"""
+        self.round = message["round"]
+        self.tank_id = message["tank_id"]
+        self.team = message["team"]
+        self.tick_rate = message["tick_rate"]
+        self.width = message["width"]
+        self.height = message["height"]
+        rows, cols = message["types"].shape
+        self.walls = TileMap(cols, rows, message["tile_size"])
+        self.walls.load_tiles(message["types"])
+        self.walls.health[:] = message["health"]
+        self.tanks.clear()
+        self.bullets.clear()
+
+    def apply(self, snapshot):
+        """应用一个增量快照；上一局遗留的快照直接丢弃"""
+        if snapshot["round"] != self.round:
+            return False
+        tick = self.tick = snapshot["tick"]
+        for record in snapshot["tanks"].tolist():
+            self.tanks[record[0]] = record
+        for tank_id in snapshot["removed_tanks"].tolist():
+            self.tanks.pop(tank_id, None)
+        for serial, team, frame, x, y, dx, dy in snapshot["bullets"].tolist():
+            self.bullets[serial] = (team, frame, x, y, dx, dy, tick)
+        for serial in snapshot["removed_bullets"].tolist():
+            self.bullets.pop(serial, None)
+
+        walls = self.walls
+        for index, tile_type, health in snapshot["tiles"].tolist():
+            row, col = divmod(index, walls.cols)
+            if tile_type == EMPTY and walls.types[row, col] != EMPTY:
+                walls.remove_tile(col, row)
+            else:
+                walls.types[row, col] = tile_type
+                walls.health[row, col] = health
+        return True
+
+    def my_tank(self):
+        return self.tanks.get(self.tank_id)
+
+    def bullet_positions(self, tick):
+        """推算所有子弹在某个tick（可以是小数）的位置，返回 [(帧序号, x, y), ...]"""
+        return [(frame, x + dx * (tick - start), y + dy * (tick - start))
+                for team, frame, x, y, dx, dy, start in self.bullets.values()]
+
+
+class NetClient:
+    """连接服务器的客户端：发送输入、接收消息并记录流量和延迟"""
+
+    def __init__(self):
+        self.world = RemoteWorld()
+        self.reader = self.writer = None
+        self.welcomed = asyncio.Event()
+        self.input_mask = None
+        self.input_seq = 0
+        self.pending_inputs = {}  # 输入序号 -> 发送时间
+        self.last_snapshot_time = None
+
+        # 统计
+        self.bytes_received = 0
+        self.snapshots = 0
+        self.snapshot_latencies = []  # 服务器发出快照到收到的时间（秒）
+        self.input_latencies = []  # 发出输入到服务器确认处理的时间（秒）
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    def send_input(self, input_mask):
+        """只在输入变化时发送"""
+        if input_mask == self.input_mask:
+            return
+        self.input_mask = input_mask
+        self.input_seq += 1
+        self.pending_inputs[self.input_seq] = time.perf_counter()
+        if len(self.pending_inputs) > MAX_PENDING_INPUTS:
+            del self.pending_inputs[min(self.pending_inputs)]
+        self.writer.write(protocol.encode_input(self.input_seq, input_mask))
+
+    async def receive(self):
+        """持续接收服务器消息，直到连接断开"""
+        try:
+            while True:
+                payload = await protocol.read_message(self.reader)
+                self.bytes_received += len(payload) + protocol.LENGTH.size
+                if payload[0] == protocol.MSG_WELCOME:
+                    self.world.welcome(protocol.decode_welcome(payload))
+                    self.welcomed.set()
+                elif payload[0] == protocol.MSG_SNAPSHOT:
+                    self.handle_snapshot(protocol.decode_snapshot(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def handle_snapshot(self, snapshot):
+        if not self.world.apply(snapshot):
+            return
+        self.snapshots += 1
+        self.last_snapshot_time = time.perf_counter()
+        self.snapshot_latencies.append(time.time() - snapshot["sent_at"])
+        # 服务器确认了某个输入：它和之前的输入都已经被处理
+        sent = self.pending_inputs.pop(snapshot["input_seq"], None)
+        if sent is not None:
+            self.input_latencies.append(self.last_snapshot_time - sent)
+            for seq in [seq for seq in self.pending_inputs if seq < snapshot["input_seq"]]:
+                del self.pending_inputs[seq]
+
+    def current_tick(self):
+        """按上次收到快照后经过的时间推算当前tick（用于子弹插值）"""
+        if self.last_snapshot_time is None:
+            return self.world.tick
+        return self.world.tick + (time.perf_counter() - self.last_snapshot_time) * self.world.tick_rate
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def read_player_input():
+    """读取键盘状态并转换为输入位掩码（按键与 main.py 相同）"""
+    keys = pygame.key.get_pressed()
+
+    input_mask = 0
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        input_mask |= INPUT_UP
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        input_mask |= INPUT_DOWN
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        input_mask |= INPUT_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        input_mask |= INPUT_RIGHT
+    if keys[pygame.K_SPACE]:
+        input_mask |= INPUT_FIRE
+    return input_mask
+
+
+def draw(screen, client, camera):
+    world = client.world
+    screen.fill((0, 0, 0))
+    tank = world.my_tank()
+    if tank is not None:
+        camera.center_on(tank[3], tank[4])
+    # 观战或被摧毁时镜头停在原处
+    view = camera.rect
+    world.walls.draw(screen, view)
+
+    # 坦克按阵营着色，与本地游戏共用旋转缓存
+    tank_caches = {
+        team: get_rotation_cache(("tank", color), lambda color=color: create_tank_image(color))
+        for team, color in ((0, GREEN), (1, RED))
+    }
+    # 坦克和子弹换算到镜头坐标，只画视野内的部分
+    sequence = []
+    for tank_id, team, frame, x, y, health in world.tanks.values():
+        x -= view.x
+        y -= view.y
+        if -40 < x < view.width + 40 and -40 < y < view.height + 40:
+            image, (offset_x, offset_y) = tank_caches[min(team, 1)].frames[frame]
+            sequence.append((image, (int(x) + offset_x, int(y) + offset_y)))
+
+    bullet_frames = get_rotation_cache(("bullet",), create_bullet_image).frames
+    for frame, x, y in world.bullet_positions(client.current_tick()):
+        x -= view.x
+        y -= view.y
+        if -8 < x < view.width + 8 and -8 < y < view.height + 8:
+            image, (offset_x, offset_y) = bullet_frames[frame]
+            sequence.append((image, (int(x) + offset_x, int(y) + offset_y)))
+    screen.blits(sequence, False)
+
+    font = get_sysfont(None, 24)
+    if tank is not None:
+        status = f"我的血量: {tank[5]}"
+    elif world.tank_id < 0:
+        status = "观战中"
+    else:
+        status = "已被摧毁，等待下一局"
+    screen.blit(render_text(font, status, (255, 255, 255)), (10, 10))
+    pygame.display.flip()
+
+
+async def run_window(host, port, fps=60):
+    pygame.init()
+    client = NetClient()
+    await client.connect(host, port)
+    receiver = asyncio.create_task(client.receive())
+    await client.welcomed.wait()
+
+    size = None
+    screen = None
+    camera = None
+    try:
+        while not receiver.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return
+
+            # 新一局的场地大小可能不同；窗口不超过 MAX_VIEW_SIZE，更大的场地由镜头跟随
+            if size != (client.world.width, client.world.height):
+                size = (client.world.width, client.world.height)
+                view_size = (min(size[0], MAX_VIEW_SIZE[0]), min(size[1], MAX_VIEW_SIZE[1]))
+                screen = pygame.display.set_mode(view_size)
+                pygame.display.set_caption("坦克大战 - 联机")
+                camera = Camera(view_size[0], view_size[1], size[0], size[1])
+
+            client.send_input(read_player_input())
+            draw(screen, client, camera)
+            await asyncio.sleep(1 / fps)
+    finally:
+        receiver.cancel()
+        client.close()
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战联机客户端")
+    parser.add_argument("--host", default="127.0.0.1", help="服务器地址")
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT, help="服务器端口")
+    parser.add_argument("--fps", type=int, default=60, help="渲染帧率上限")
+    args = parser.parse_args()
+    asyncio.run(run_window(args.host, args.port, args.fps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""坦克大战关卡文件：紧凑的二进制格式，载入时用内存映射直接得到NumPy数组
+
+文件布局（小端序）：
+    文件头   魔数 b"TLVL"、版本、瓦片大小、列数、行数、出生点数量、碰撞矩形数量
+    瓦片     行数 × 列数 个 uint8，值为 wall.py 中的瓦片类型
+    （按4字节对齐补零）
+    出生点   每个 3 个 int32：x、y、阵营（0 为玩家，1 为敌人）
+    碰撞矩形 每个 4 个 uint16：列、行、宽、高（预先合并好的碰撞数据）
+
+用法：
+    python level.py generate maps/arena.lvl --cols 200 --rows 150 --seed 1
+    python level.py info maps/arena.lvl
+"""
+import argparse
+import mmap
+import random
+import struct
+import numpy as np
+from wall import TileMap, TILE_SIZE, EMPTY, BRICK, STEEL, WATER
+
+MAGIC = b"TLVL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII")
+
+TEAM_PLAYER = 0
+TEAM_ENEMY = 1
+
+
+def align4(offset):
+    return (offset + 3) & ~3
+
+
+class Level:
+    """已载入的关卡：瓦片、出生点和碰撞矩形都是内存映射文件上的只读数组"""
+
+    def __init__(self, types, spawns, colliders, tile_size=TILE_SIZE, buffer=None):
+        self.types = types
+        self.spawns = spawns
+        self.colliders = colliders
+        self.tile_size = tile_size
+        self.rows, self.cols = types.shape
+        self.buffer = buffer  # 保持内存映射不被关闭
+
+    @property
+    def width(self):
+        return self.cols * self.tile_size
+
+    @property
+    def height(self):
+        return self.rows * self.tile_size
+
+    def spawn_points(self, team):
+        """返回某个阵营的出生点列表 [(x, y), ...]"""
+        spawns = self.spawns[self.spawns[:, 2] == team]
+        return [(int(x), int(y)) for x, y in spawns[:, :2].tolist()]
+
+    def build_tilemap(self):
+        """生成可以被破坏的瓦片地图（拷贝瓦片数组，直接使用预先算好的碰撞矩形）"""
+        tilemap = TileMap(self.cols, self.rows, self.tile_size)
+        tilemap.load_tiles(self.types, self.colliders)
+        return tilemap
+
+
+def save_level(path, tilemap, spawns):
+    """把瓦片地图和出生点 [(x, y, 阵营), ...] 写入关卡文件"""
+    types = np.ascontiguousarray(tilemap.types, dtype=np.uint8)
+    spawns = np.asarray(spawns, dtype=np.int32).reshape(-1, 3)
+    colliders = tilemap.collider_array()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tilemap.tile_size, tilemap.cols, tilemap.rows,
+                            len(spawns), len(colliders)))
+        f.write(types.tobytes())
+        offset = HEADER.size + types.nbytes
+        f.write(b"\0" * (align4(offset) - offset))
+        f.write(spawns.astype("<i4").tobytes())
+        f.write(colliders.astype("<u2").tobytes())
+
+
+def load_level(path):
+    """内存映射关卡文件，不逐个解析瓦片"""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, tile_size, cols, rows, spawn_count, collider_count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是坦克大战关卡文件")
+    if version != VERSION:
+        raise ValueError(f"不支持的关卡版本: {version}")
+
+    offset = HEADER.size
+    types = np.frombuffer(buffer, dtype=np.uint8, count=rows * cols, offset=offset).reshape(rows, cols)
+    offset = align4(offset + rows * cols)
+    spawns = np.frombuffer(buffer, dtype="<i4", count=spawn_count * 3, offset=offset).reshape(-1, 3)
+    offset += spawns.nbytes
+    colliders = np.frombuffer(buffer, dtype="<u2", count=collider_count * 4, offset=offset).reshape(-1, 4)
+    return Level(types, spawns, colliders, tile_size, buffer)
+
+
+def generate_level(cols, rows, seed=None, density=0.04, enemy_spawns=4):
+    """生成一张随机地图：钢墙边界、按面积比例放置的随机墙壁块，以及玩家和敌人的出生点"""
+    rng = random.Random(seed)
+    tilemap = TileMap(cols, rows)
+    tilemap.fill(0, 0, cols, 1, STEEL)
+    tilemap.fill(0, rows - 1, cols, 1, STEEL)
+    tilemap.fill(0, 0, 1, rows, STEEL)
+    tilemap.fill(cols - 1, 0, 1, rows, STEEL)
+
+    # 出生点附近保持空地
+    size = tilemap.tile_size
+    spawn_tiles = [(cols // 4, rows // 2, TEAM_PLAYER)]
+    for _ in range(enemy_spawns):
+        spawn_tiles.append((rng.randint(cols // 2, cols - 4), rng.randint(3, rows - 4), TEAM_ENEMY))
+
+    blocks = int(cols * rows * density / 4)
+    for _ in range(blocks):
+        col = rng.randint(2, cols - 5)
+        row = rng.randint(2, rows - 5)
+        width = rng.choice([1, 2, 3])
+        height = rng.choice([1, 2, 3])
+        if any(abs(col - c) < 5 and abs(row - r) < 5 for c, r, _ in spawn_tiles):
+            continue
+        tilemap.fill(col, row, width, height, rng.choice([BRICK, BRICK, STEEL, WATER]))
+
+    tilemap.build_colliders()
+    spawns = [((c + 0.5) * size, (r + 0.5) * size, team) for c, r, team in spawn_tiles]
+    return tilemap, spawns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战关卡工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="生成随机关卡")
+    generate.add_argument("path")
+    generate.add_argument("--cols", type=int, default=40, help="列数（瓦片）")
+    generate.add_argument("--rows", type=int, default=30, help="行数（瓦片）")
+    generate.add_argument("--seed", type=int, default=None, help="随机种子")
+    generate.add_argument("--density", type=float, default=0.04, help="墙壁块密度")
+    generate.add_argument("--enemy-spawns", type=int, default=4, help="敌人出生点数量")
+
+    info = commands.add_parser("info", help="显示关卡信息")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        tilemap, spawns = generate_level(args.cols, args.rows, args.seed, args.density, args.enemy_spawns)
+        save_level(args.path, tilemap, spawns)
+        print(f"已写入 {args.path}: {args.cols}x{args.rows} 瓦片, {len(tilemap.colliders)} 个碰撞矩形")
+    else:
+        level = load_level(args.path)
+        solid = int((level.types != EMPTY).sum())
+        print(f"{args.path}: {level.cols}x{level.rows} 瓦片 ({level.width}x{level.height} 像素)")
+        print(f"  实心瓦片: {solid}  碰撞矩形: {len(level.colliders)}  出生点: {len(level.spawns)}")
+
+
+if __name__ == "__main__":
+    main()
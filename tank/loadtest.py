@@ -0,0 +1,113 @@
+"""联机服务器压力测试：在一个进程里模拟大量无窗口客户端，报告每个客户端的流量和延迟
+
+默认先启动一个服务器子进程；加 --no-server 时连接已经在运行的服务器。
+每个客户端随机改变输入，并统计收到的字节数、快照数量、快照延迟（服务器发出到收到）
+和输入延迟（发出输入到服务器在快照中确认处理）。
+
+用法：python loadtest.py --clients 64 --seconds 20 --enemies 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import protocol
+from client import NetClient
+
+
+async def run_client(host, port, seconds, seed):
+    """运行一个无窗口客户端，返回 (客户端, 实际运行秒数)"""
+    client = NetClient()
+    await client.connect(host, port)
+    receiver = asyncio.create_task(client.receive())
+    await asyncio.wait_for(client.welcomed.wait(), 30)
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds and not receiver.done():
+        client.send_input(rng.randrange(32))
+        await asyncio.sleep(rng.uniform(0.05, 0.2))
+    elapsed = time.perf_counter() - start
+
+    receiver.cancel()
+    client.close()
+    return client, elapsed
+
+
+async def wait_for_server(host, port, timeout=30.0):
+    """等待服务器开始监听"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run_load_test(host, port, clients, seconds):
+    await wait_for_server(host, port)
+    results = await asyncio.gather(*(run_client(host, port, seconds, seed) for seed in range(clients)))
+    return results
+
+
+def percentile_ms(values, q):
+    return np.percentile(values, q) * 1000 if len(values) else float("nan")
+
+
+def report(results):
+    rates = np.array([client.bytes_received / elapsed / 1024 for client, elapsed in results])
+    snapshot_rates = np.array([client.snapshots / elapsed for client, elapsed in results])
+    latencies = np.concatenate([client.snapshot_latencies for client, _ in results] or [[]])
+    input_latencies = np.concatenate([client.input_latencies for client, _ in results] or [[]])
+
+    print(f"客户端数: {len(results)}")
+    print(f"每客户端流量: 平均 {rates.mean():.1f} KB/s  最大 {rates.max():.1f} KB/s  "
+          f"总计 {rates.sum():.1f} KB/s")
+    print(f"每客户端快照: 平均 {snapshot_rates.mean():.1f} 个/秒  最少 {snapshot_rates.min():.1f} 个/秒")
+    print(f"快照延迟: p50 {percentile_ms(latencies, 50):.2f}ms  p95 {percentile_ms(latencies, 95):.2f}ms  "
+          f"p99 {percentile_ms(latencies, 99):.2f}ms")
+    print(f"输入延迟: p50 {percentile_ms(input_latencies, 50):.2f}ms  "
+          f"p95 {percentile_ms(input_latencies, 95):.2f}ms  p99 {percentile_ms(input_latencies, 99):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战联机服务器压力测试")
+    parser.add_argument("--host", default="127.0.0.1", help="服务器地址")
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT, help="服务器端口")
+    parser.add_argument("--clients", type=int, default=32, help="模拟的客户端数量")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每个客户端运行的秒数")
+    parser.add_argument("--no-server", action="store_true", help="不启动服务器，连接已经在运行的服务器")
+    parser.add_argument("--enemies", type=int, default=4, help="启动的服务器每波敌人数量")
+    parser.add_argument("--send-every", type=int, default=1, help="启动的服务器每隔几个tick发送一次快照")
+    args = parser.parse_args()
+
+    server = None
+    if not args.no_server:
+        server = subprocess.Popen(
+            [sys.executable, "server.py", "--host", args.host, "--port", str(args.port),
+             "--enemies", str(args.enemies), "--waves", "1000", "--send-every", str(args.send_every),
+             "--report", str(max(1.0, args.seconds / 4))],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        results = asyncio.run(run_load_test(args.host, args.port, args.clients, args.seconds))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
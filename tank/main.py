@@ -1,9 +1,21 @@
 import pygame
 import sys
-import random
-from tank import Tank
-from bullet import Bullet
-from wall import Wall
+import os
+import time
+import argparse
+import subprocess
+from renderer import DirtyRenderer, FogOfWar, draw_world
+from level import load_level
+from ai_scheduler import AIScheduler
+from camera import Camera
+from replay import Replay
+from shared_world import DEFAULT_NAME as DEFAULT_MATCH_NAME, COMMAND_QUIT
+from spectate import attach_when_ready, run_viewer
+from world import World, INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE
+
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, render_text
 
 # 初始化Pygame
 pygame.init()
@@ -15,247 +27,319 @@ pygame.display.set_caption("坦克大战")
 
 # 初始化时钟
 clock = pygame.time.Clock()
-FPS = 60
+FPS = 60  # 渲染帧率上限（用 --fps 修改，不影响游戏速度）
+
+# 固定时间步长：模拟始终以 TICK_RATE 次/秒推进，与渲染帧率无关
+TICK_RATE = 60
+TICK_TIME = 1.0 / TICK_RATE
+MAX_CATCHUP_STEPS = 5  # 一帧内最多补跑的tick数，防止机器太慢时越落越远
 
 # 定义颜色
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
-GREEN = (0, 255, 0)
-BLUE = (0, 0, 255)
-RED = (255, 0, 0)
-
-# 创建精灵组
-all_sprites = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-tanks = pygame.sprite.Group()
-walls = pygame.sprite.Group()
-
-# 创建玩家坦克
-player = Tank(WIDTH // 4, HEIGHT // 2, GREEN)
-all_sprites.add(player)
-tanks.add(player)
-
-# 创建敌人坦克
-enemy = Tank(WIDTH * 3 // 4, HEIGHT // 2, RED, control_type="enemy")
-all_sprites.add(enemy)
-tanks.add(enemy)
-
-# 创建墙壁
-def create_walls():
-    # 创建边界墙
-    wall_thickness = 20
-    
-    # 上下边界
-    for x in range(0, WIDTH, wall_thickness):
-        walls.add(Wall(x, 0, wall_thickness, wall_thickness, "steel"))
-        walls.add(Wall(x, HEIGHT - wall_thickness, wall_thickness, wall_thickness, "steel"))
-    
-    # 左右边界
-    for y in range(wall_thickness, HEIGHT - wall_thickness, wall_thickness):
-        walls.add(Wall(0, y, wall_thickness, wall_thickness, "steel"))
-        walls.add(Wall(WIDTH - wall_thickness, y, wall_thickness, wall_thickness, "steel"))
-    
-    # 创建随机的内部墙壁
-    for _ in range(20):
-        x = random.randint(wall_thickness * 2, WIDTH - wall_thickness * 3)
-        y = random.randint(wall_thickness * 2, HEIGHT - wall_thickness * 3)
-        width = random.choice([20, 40, 60])
-        height = random.choice([20, 40, 60])
-        wall_type = random.choice(["brick", "brick", "steel", "water"])  # 砖墙较多
-        
-        # 确保墙壁不会直接挡住坦克
-        wall_rect = pygame.Rect(x, y, width, height)
-        player_rect = pygame.Rect(player.x - 60, player.y - 60, 120, 120)
-        enemy_rect = pygame.Rect(enemy.x - 60, enemy.y - 60, 120, 120)
-        
-        if not wall_rect.colliderect(player_rect) and not wall_rect.colliderect(enemy_rect):
-            new_wall = Wall(x, y, width, height, wall_type)
-            walls.add(new_wall)
-    
-    # 将所有墙壁添加到所有精灵组
-    all_sprites.add(walls)
-
-create_walls()
-
-# 游戏结束标志
-game_over = False
-winner = None
+
+# 胜利方的显示名称
+WINNER_NAMES = {"player": "玩家", "enemy": "敌人"}
+
+# 波次模式设置（用 --enemies / --waves 修改）
+ENEMY_COUNT = 1
+WAVES = 1
+
+# 子弹互相抵消模式（用 --bullet-cancel 启用）：不同阵营的子弹相撞时一起消失
+BULLET_CANCEL = False
+
+# 场地大小（用 --arena-width / --arena-height 修改），比窗口大时镜头跟随玩家滚动
+ARENA_WIDTH, ARENA_HEIGHT = WIDTH, HEIGHT
+
+# 关卡（用 --level 指定关卡文件，默认随机生成墙壁）
+level = None
+level_path = None
+
+# 创建游戏世界（坦克、子弹、墙壁都在里面）
+world = World(WIDTH, HEIGHT, enemy_count=ENEMY_COUNT, waves=WAVES)
+
+# 脏矩形渲染器（用 --dirty 启用，默认每帧整屏重绘）
+dirty_renderer = None
+
+# 镜头：场地比窗口大时才需要
+camera = None
+
+# 战争迷雾（用 --fog 启用）：只显示玩家一方坦克看得到的地方
+fog = None
+
+# 录像（用 --record 启用）：当前这局的录像、保存路径和已经录制的局数
+replay = None
+record_path = None
+recorded_games = 0
+
+# 敌人AI调度器（用 --ai-workers 启用）：AI决策交给工作进程计算，下一个tick应用
+ai_scheduler = None
+
+# 这一局开始时的快照（按R立即重来）和快速存档（F5保存，F9读取）
+initial_snapshot = world.snapshot()
+quick_save = None
 
 # 主游戏循环
 def game_loop():
-    global game_over, winner
-    
-    # 玩家控制变量
-    player_dx, player_dy = 0, 0
-    
+    global quick_save
+
+    accumulator = 0.0
+    previous_time = time.perf_counter()
+
     while True:
         # 事件处理
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            
+                quit_game()
+
             # 键盘按下事件
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
-                
-                # 游戏结束后按空格重新开始
-                if game_over and event.key == pygame.K_SPACE:
+                    quit_game()
+
+                # 游戏结束后按空格开始新的一局
+                if world.game_over and event.key == pygame.K_SPACE:
                     restart_game()
-        
-        # 如果游戏结束，显示结束界面
-        if game_over:
+
+                # R：立即重来这一局；F5：快速存档；F9：快速读档
+                if event.key == pygame.K_r:
+                    load_snapshot(initial_snapshot, b"")
+                elif event.key == pygame.K_F5:
+                    quick_save = (world.snapshot(), bytes(replay.inputs) if replay is not None else b"")
+                elif event.key == pygame.K_F9 and quick_save is not None:
+                    load_snapshot(*quick_save)
+
+        # 如果游戏结束，保存录像并显示结束界面
+        if world.game_over:
+            save_replay()
             display_game_over()
+            accumulator = 0.0
+            previous_time = time.perf_counter()
             continue
-            
-        # 获取按键状态
-        keys = pygame.key.get_pressed()
-        
-        # 玩家坦克移动
-        player_dx, player_dy = 0, 0
-        if keys[pygame.K_w] or keys[pygame.K_UP]:
-            player_dy = -1
-        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-            player_dy = 1
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            player_dx = -1
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            player_dx = 1
-        
-        # 射击
-        if keys[pygame.K_SPACE]:
-            bullet = player.shoot()
-            if bullet:
-                bullets.add(bullet)
-                all_sprites.add(bullet)
-        
-        # 移动玩家坦克
-        player.move(player_dx, player_dy)
-        
-        # 敌人AI控制
-        control_enemy()
-        
-        # 更新所有精灵
-        all_sprites.update()
-        
-        # 检测碰撞
-        handle_collisions()
-        
-        # 渲染
-        render()
-        
+
+        # 累积经过的真实时间，按固定步长推进模拟
+        now = time.perf_counter()
+        accumulator += now - previous_time
+        previous_time = now
+
+        player_input = read_player_input()
+        if ai_scheduler is not None:
+            ai_scheduler.start_frame()
+        steps = 0
+        while accumulator >= TICK_TIME and steps < MAX_CATCHUP_STEPS and not world.game_over:
+            # 推进一个tick：玩家按键控制，敌人由AI控制
+            world.step(player_input)
+            if replay is not None:
+                replay.record(player_input)
+            accumulator -= TICK_TIME
+            steps += 1
+
+        # 补跑次数用完还追不上时，丢弃积压的时间（游戏变慢，但不会卡死）
+        if steps == MAX_CATCHUP_STEPS and accumulator >= TICK_TIME:
+            accumulator = 0.0
+
+        # 渲染：在上一个tick和当前tick之间插值
+        render(accumulator / TICK_TIME)
+
         # 控制帧率
         clock.tick(FPS)
 
-# 敌人AI控制
-def control_enemy():
-    if random.random() < 0.02:  # 2%的几率改变方向
-        enemy.angle = random.randint(0, 360)
-    
-    # 根据当前角度移动
-    rad_angle = pygame.math.Vector2(1, 0).rotate(-enemy.angle)
-    enemy.move(rad_angle.x, rad_angle.y)
-    
-    # 有10%的几率射击
-    if random.random() < 0.1:
-        bullet = enemy.shoot()
-        if bullet:
-            bullets.add(bullet)
-            all_sprites.add(bullet)
-
-# 处理碰撞
-def handle_collisions():
-    global game_over, winner
-    
-    # 坦克与墙壁的碰撞
-    for tank in tanks:
-        # 碰撞后将坦克推回
-        tank_collisions = pygame.sprite.spritecollide(tank, walls, False)
-        if tank_collisions:
-            # 简单的碰撞响应 - 后退
-            if tank == player:
-                player.move(-player_dx * 2, -player_dy * 2)
-            else:
-                # 敌人遇到墙壁后随机改变方向
-                enemy.angle = random.randint(0, 360)
-    
-    # 子弹与坦克的碰撞
-    for bullet in bullets:
-        # 跳过自己发射的子弹
-        hit_tanks = pygame.sprite.spritecollide(bullet, tanks, False)
-        for tank in hit_tanks:
-            if bullet.owner != tank:  # 不会被自己的子弹击中
-                if tank.take_damage(bullet.damage):
-                    # 坦克被摧毁，游戏结束
-                    game_over = True
-                    winner = "玩家" if tank == enemy else "敌人"
-                bullet.hit(tank)
-    
-    # 子弹与墙壁的碰撞
-    for bullet in bullets:
-        hit_walls = pygame.sprite.spritecollide(bullet, walls, False)
-        for wall in hit_walls:
-            wall.hit_by_bullet(bullet)
-            bullet.kill()
-
-# 渲染函数
-def render():
-    # 清屏
-    screen.fill(BLACK)
-    
-    # 绘制所有精灵
-    all_sprites.draw(screen)
-    
+# 读取键盘状态并转换为输入位掩码
+def read_player_input():
+    keys = pygame.key.get_pressed()
+
+    input_mask = 0
+    if keys[pygame.K_w] or keys[pygame.K_UP]:
+        input_mask |= INPUT_UP
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+        input_mask |= INPUT_DOWN
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        input_mask |= INPUT_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        input_mask |= INPUT_RIGHT
+    if keys[pygame.K_SPACE]:
+        input_mask |= INPUT_FIRE
+    return input_mask
+
+# 渲染函数（alpha 为两个tick之间的插值比例）
+def render(alpha=1.0):
+    # 显示坦克血量
+    font = get_sysfont(None, 24)
+    player_health_text = render_text(font, f"玩家血量: {world.player.health}", WHITE)
+    if world.enemy_count == 1 and world.waves == 1:
+        enemy_health_text = render_text(font, f"敌人血量: {world.enemy.health}", WHITE)
+    else:
+        enemy_health_text = render_text(font, f"第{world.wave}/{world.waves}波 剩余敌人: {len(world.enemies)}", WHITE)
+    hud = [(player_health_text, (10, 10)), (enemy_health_text, (WIDTH - 10 - enemy_health_text.get_width(), 10))]
+
+    if dirty_renderer is not None:
+        # 只重绘移动的物体和HUD
+        dirty_renderer.render(world, hud, alpha)
+        return
+
+    # 清屏并绘制墙壁图层、坦克和子弹（有镜头时只画视野内的部分）
+    if camera is not None:
+        camera.follow(world.player, alpha)
+    draw_world(screen, world, alpha, BLACK, camera, fog)
+
     # 显示坦克血量
-    font = pygame.font.SysFont(None, 24)
-    player_health_text = font.render(f"玩家血量: {player.health}", True, WHITE)
-    enemy_health_text = font.render(f"敌人血量: {enemy.health}", True, WHITE)
-    screen.blit(player_health_text, (10, 10))
-    screen.blit(enemy_health_text, (WIDTH - 150, 10))
-    
+    screen.blits(hud)
+
     # 刷新屏幕
     pygame.display.flip()
 
 # 显示游戏结束界面
 def display_game_over():
     screen.fill(BLACK)
-    font = pygame.font.SysFont(None, 48)
-    game_over_text = font.render(f"游戏结束! {winner}胜利!", True, WHITE)
-    restart_text = font.render("按空格键重新开始", True, WHITE)
-    
+    font = get_sysfont(None, 48)
+    game_over_text = render_text(font, f"游戏结束! {WINNER_NAMES[world.winner]}胜利!", WHITE)
+    restart_text = render_text(font, "按空格键重新开始", WHITE)
+
     screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50))
     screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 20))
-    
+
     pygame.display.flip()
 
+    # 结束画面覆盖了整个屏幕，回到游戏时需要整屏重绘
+    if dirty_renderer is not None:
+        dirty_renderer.invalidate()
+
 # 重新开始游戏
 def restart_game():
-    global game_over, winner, player, enemy, all_sprites, bullets, tanks, walls
-    
-    # 重置游戏状态
-    game_over = False
-    winner = None
-    
-    # 清空所有精灵组
-    all_sprites.empty()
-    bullets.empty()
-    tanks.empty()
-    walls.empty()
-    
-    # 重新创建坦克
-    player = Tank(WIDTH // 4, HEIGHT // 2, GREEN)
-    all_sprites.add(player)
-    tanks.add(player)
-    
-    enemy = Tank(WIDTH * 3 // 4, HEIGHT // 2, RED, control_type="enemy")
-    all_sprites.add(enemy)
-    tanks.add(enemy)
-    
-    # 重新创建墙壁
-    create_walls()
+    global world, replay, camera
+
+    # 重新创建整个游戏世界
+    world = World(ARENA_WIDTH, ARENA_HEIGHT, enemy_count=ENEMY_COUNT, waves=WAVES, level=level,
+                  bullet_cancel=BULLET_CANCEL)
+    camera = None
+    if world.width > WIDTH or world.height > HEIGHT:
+        camera = Camera(WIDTH, HEIGHT, world.width, world.height)
+    if ai_scheduler is not None:
+        ai_scheduler.reset()
+        world.ai_scheduler = ai_scheduler
+    if record_path is not None:
+        replay = Replay.from_world(world, level_path)
+    reset_snapshots()
+
+# 记录新一局开始时的快照，并清空快速存档
+def reset_snapshots():
+    global initial_snapshot, quick_save
+
+    initial_snapshot = world.snapshot()
+    quick_save = None
+
+# 恢复到快照（不重新创建世界）；录像也回到快照时录下的输入
+def load_snapshot(snapshot, recorded_inputs):
+    global replay
+
+    world.restore(snapshot)
+    if ai_scheduler is not None:
+        ai_scheduler.reset()
+    if record_path is not None:
+        if replay is None:
+            replay = Replay.from_world(world, level_path)
+        replay.inputs[:] = recorded_inputs
+    if dirty_renderer is not None:
+        dirty_renderer.invalidate()
+
+# 保存当前这局的录像（每局只保存一次，第二局起文件名加上序号）
+def save_replay():
+    global replay, recorded_games
+
+    if replay is None or len(replay) == 0:
+        return
+    recorded_games += 1
+    path = record_path
+    if recorded_games > 1:
+        name, ext = os.path.splitext(record_path)
+        path = f"{name}-{recorded_games}{ext}"
+    replay.winner = world.winner
+    replay.save(path)
+    print(f"录像已保存: {path}")
+    replay = None
+
+# 模拟放到独立进程（--sim-process）：本进程只负责输入和渲染
+def run_sim_process(args):
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulate.py"),
+               "--name", args.sim_process, "--width", str(ARENA_WIDTH), "--height", str(ARENA_HEIGHT),
+               "--enemies", str(ENEMY_COUNT), "--waves", str(WAVES)]
+    if level_path:
+        command += ["--level", level_path]
+    if BULLET_CANCEL:
+        command.append("--bullet-cancel")
+    process = subprocess.Popen(command)
+    shared = None
+    try:
+        shared = attach_when_ready(args.sim_process, process=process)
+        run_viewer(screen, shared, control=True, fps=FPS)
+        shared.send_command(COMMAND_QUIT)
+        process.wait(5)
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            process.wait()
+        if shared is not None:
+            shared.close()
+    pygame.quit()
+    sys.exit()
+
+# 退出游戏
+def quit_game():
+    save_replay()
+    if ai_scheduler is not None:
+        ai_scheduler.close()
+    pygame.quit()
+    sys.exit()
 
 # 启动游戏
 if __name__ == "__main__":
-    game_loop() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="坦克大战")
+    parser.add_argument("--dirty", action="store_true", help="脏矩形渲染模式，适合低配机器")
+    parser.add_argument("--fps", type=int, default=FPS, help="渲染帧率上限（模拟固定为每秒60个tick）")
+    parser.add_argument("--enemies", type=int, default=ENEMY_COUNT, help="每波敌人数量")
+    parser.add_argument("--waves", type=int, default=WAVES, help="波次数量")
+    parser.add_argument("--arena-width", type=int, default=WIDTH, help="场地宽度，比窗口大时镜头跟随玩家")
+    parser.add_argument("--arena-height", type=int, default=HEIGHT, help="场地高度")
+    parser.add_argument("--bullet-cancel", action="store_true", help="不同阵营的子弹相撞时互相抵消")
+    parser.add_argument("--fog", action="store_true", help="战争迷雾：只显示玩家一方看得到的地方")
+    parser.add_argument("--level", help="关卡文件（由 level.py 生成，场地大小由关卡决定）")
+    parser.add_argument("--record", help="把每一局录制到这个文件（用 replay.py 回放）")
+    parser.add_argument("--ai-workers", type=int, default=0, help="敌人AI使用的工作进程数（0为在主循环中计算）")
+    parser.add_argument("--sim-process", nargs="?", const=DEFAULT_MATCH_NAME, metavar="NAME",
+                        help="在独立进程中模拟，状态通过这个名字的共享内存传给本窗口（可以用 spectate.py 观战）")
+    args = parser.parse_args()
+    if args.ai_workers and args.record:
+        # 工作进程的结果什么时候回来取决于机器负载，录像无法重新模拟出同样的过程
+        parser.error("--ai-workers 不能和 --record 一起使用")
+    if args.sim_process and (args.record or args.dirty or args.ai_workers or args.fog):
+        parser.error("--sim-process 不能和 --record、--dirty、--ai-workers、--fog 一起使用")
+    if args.fog and args.dirty:
+        # 迷雾随玩家移动改变整个画面，脏矩形没有意义
+        parser.error("--fog 不能和 --dirty 一起使用")
+
+    FPS = args.fps
+    ENEMY_COUNT = args.enemies
+    WAVES = args.waves
+    ARENA_WIDTH, ARENA_HEIGHT = args.arena_width, args.arena_height
+    BULLET_CANCEL = args.bullet_cancel
+    if args.level:
+        level_path = args.level
+        level = load_level(args.level)
+    record_path = args.record
+    if args.fog:
+        fog = FogOfWar()
+    if args.sim_process:
+        run_sim_process(args)
+    if args.ai_workers:
+        ai_scheduler = AIScheduler(args.ai_workers)
+    if (ENEMY_COUNT != 1 or WAVES != 1 or level is not None or record_path is not None or BULLET_CANCEL
+            or ai_scheduler is not None or (ARENA_WIDTH, ARENA_HEIGHT) != (WIDTH, HEIGHT)):
+        restart_game()
+
+    if args.dirty:
+        if camera is not None:
+            # 镜头移动时整个画面都会变化，脏矩形没有意义
+            parser.error("--dirty 只支持不比窗口大的场地")
+        dirty_renderer = DirtyRenderer(screen, BLACK)
+
+    game_loop()
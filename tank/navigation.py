@@ -0,0 +1,278 @@
+import math
+from collections import OrderedDict, deque
+import numpy as np
+import pygame
+
+# 8个相邻方向 (列偏移, 行偏移)
+NEIGHBORS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# 同时缓存的流场数量（每个目标格子一个）
+MAX_CACHED_FIELDS = 8
+
+# 大地图上流场只在目标周围这么多格的窗口内搜索，每个流场的耗时与地图大小无关；
+# 网格不比窗口大时（例如 800x600 的场地）仍然搜索整个网格
+FIELD_RADIUS = 32
+
+
+class FlowField:
+    """从目标格子出发的广度优先距离场，所有朝同一目标前进的坦克共用"""
+
+    def __init__(self, blocked, goal, radius=None):
+        rows, cols = blocked.shape
+        self.goal = goal
+        self.left = self.top = 0  # 窗口左上角在整个网格中的格子坐标
+
+        goal_col, goal_row = goal
+        if not (0 <= goal_col < cols and 0 <= goal_row < rows):
+            self.dist = np.full((0, 0), -1, dtype=np.int32)
+            self.next_col = self.next_row = None
+            return
+
+        if radius is not None:
+            # 只搜索目标周围的窗口，窗口外的格子视为不可达
+            self.left, self.top = max(0, goal_col - radius), max(0, goal_row - radius)
+            blocked = blocked[self.top:goal_row + radius + 1, self.left:goal_col + radius + 1]
+            goal_col -= self.left
+            goal_row -= self.top
+            rows, cols = blocked.shape
+
+        # 在带一圈边框的一维列表上做广度优先搜索，比逐个访问NumPy元素快得多
+        # 目标格子本身被挡住时（例如玩家贴着墙），仍然从它开始扩散
+        width = cols + 2
+        padded = np.ones((rows + 2, width), dtype=bool)
+        padded[1:-1, 1:-1] = blocked
+        wall = padded.ravel().tolist()
+        dist = [-1] * len(wall)
+        steps = [(dc + dr * width, dc, dr) for dc, dr in NEIGHBORS]
+
+        start = (goal_row + 1) * width + goal_col + 1
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            index = queue.popleft()
+            next_dist = dist[index] + 1
+            for step, dc, dr in steps:
+                neighbor = index + step
+                if dist[neighbor] >= 0 or wall[neighbor]:
+                    continue
+                # 斜向移动不能穿过墙角
+                if dc and dr and (wall[index + dc] or wall[index + dr * width]):
+                    continue
+                dist[neighbor] = next_dist
+                queue.append(neighbor)
+
+        self.dist = np.array(dist, dtype=np.int32).reshape(rows + 2, width)[1:-1, 1:-1].copy()
+        self.build_directions(blocked)
+
+    def build_directions(self, blocked):
+        """对每个格子预先算出下一步要去的相邻格子（向量化）"""
+        rows, cols = self.dist.shape
+        big = np.iinfo(np.int32).max
+        padded = np.full((rows + 2, cols + 2), big, dtype=np.int64)
+        padded[1:-1, 1:-1] = np.where(self.dist >= 0, self.dist, big)
+        padded_blocked = np.ones((rows + 2, cols + 2), dtype=bool)
+        padded_blocked[1:-1, 1:-1] = blocked
+
+        best = np.full((rows, cols), big, dtype=np.int64)
+        best_index = np.full((rows, cols), -1, dtype=np.int8)
+        for index, (dc, dr) in enumerate(NEIGHBORS):
+            candidate = padded[1 + dr:rows + 1 + dr, 1 + dc:cols + 1 + dc].copy()
+            if dc and dr:
+                # 不能斜穿墙角
+                corner = (padded_blocked[1:rows + 1, 1 + dc:cols + 1 + dc] |
+                          padded_blocked[1 + dr:rows + 1 + dr, 1:cols + 1])
+                candidate[corner] = big
+            better = candidate < best
+            best[better] = candidate[better]
+            best_index[better] = index
+
+        offsets = np.array(NEIGHBORS + ((0, 0),), dtype=np.int32)
+        col_grid, row_grid = np.meshgrid(np.arange(self.left, self.left + cols),
+                                         np.arange(self.top, self.top + rows))
+        self.next_col = col_grid + offsets[best_index, 0]
+        self.next_row = row_grid + offsets[best_index, 1]
+        # 没有更近的相邻格子（目标本身或不可达）时原地不动
+        stay = (best_index < 0) | (best >= np.where(self.dist >= 0, self.dist, big))
+        self.next_col[stay] = col_grid[stay]
+        self.next_row[stay] = row_grid[stay]
+
+    def reaches(self, mask):
+        """距离场是否覆盖了 mask（整个网格大小）中任何格子"""
+        rows, cols = self.dist.shape
+        window = mask[self.top:self.top + rows, self.left:self.left + cols]
+        return bool((self.dist[window] >= 0).any())
+
+    def distance(self, col, row):
+        """某个格子到目标的步数，不可达或在窗口外时为 -1"""
+        rows, cols = self.dist.shape
+        col -= self.left
+        row -= self.top
+        if 0 <= col < cols and 0 <= row < rows:
+            return int(self.dist[row, col])
+        return -1
+
+    def contains(self, cols, rows):
+        """批量判断格子是否在搜索窗口内"""
+        height, width = self.dist.shape
+        return ((cols >= self.left) & (cols < self.left + width) &
+                (rows >= self.top) & (rows < self.top + height))
+
+    def sample(self, cols, rows):
+        """批量查询格子（整个网格中的坐标）：返回 (距离数组, 下一步列数组, 下一步行数组)，
+        窗口外的格子距离为 -1、下一步为原地"""
+        height, width = self.dist.shape
+        local_cols = cols - self.left
+        local_rows = rows - self.top
+        inside = (local_cols >= 0) & (local_cols < width) & (local_rows >= 0) & (local_rows < height)
+        local_cols = np.clip(local_cols, 0, max(width - 1, 0))
+        local_rows = np.clip(local_rows, 0, max(height - 1, 0))
+        dist = np.where(inside, self.dist[local_rows, local_cols], -1)
+        next_col = np.where(inside, self.next_col[local_rows, local_cols], cols)
+        next_row = np.where(inside, self.next_row[local_rows, local_cols], rows)
+        return dist, next_col, next_row
+
+
+class NavGrid:
+    """由墙壁布局得到的粗粒度占用网格，格子被挡住表示坦克中心不能停在这里"""
+
+    def __init__(self, width, height, walls, cell_size=20, clearance=22, field_radius=FIELD_RADIUS):
+        self.cell_size = cell_size
+        self.field_radius = field_radius  # 流场搜索窗口的半径（格），None 为整个网格
+        self.clearance = clearance  # 坦克中心到墙壁需要保持的距离
+        self.cols = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+        self.walls = walls
+        if field_radius is not None and max(self.cols, self.rows) <= field_radius * 2 + 1:
+            self.field_radius = None
+        self.blocked = np.zeros((self.rows, self.cols), dtype=bool)
+        self.fields = OrderedDict()  # 目标格子 -> FlowField
+        self.version = 0  # 占用网格变化时加一
+        self.rebuild()
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def cell_center(self, col, row):
+        return (col + 0.5) * self.cell_size, (row + 0.5) * self.cell_size
+
+    def cell_range(self, rect):
+        """返回中心点落在矩形（已按坦克间距扩大）内的格子范围，右下为开区间"""
+        size = self.cell_size
+        inflated = rect.inflate(self.clearance * 2, self.clearance * 2)
+        left = max(0, math.ceil(inflated.left / size - 0.5))
+        top = max(0, math.ceil(inflated.top / size - 0.5))
+        right = min(self.cols, math.ceil(inflated.right / size - 0.5))
+        bottom = min(self.rows, math.ceil(inflated.bottom / size - 0.5))
+        return left, top, right, bottom
+
+    def mark_wall(self, rect):
+        left, top, right, bottom = self.cell_range(rect)
+        if left < right and top < bottom:
+            self.blocked[top:bottom, left:right] = True
+
+    def rebuild(self):
+        """根据全部墙壁重建占用网格，并清空缓存的流场"""
+        self.blocked[:] = False
+        for rect in self.walls.rects():
+            self.mark_wall(rect)
+        self.fields.clear()
+        self.version += 1
+
+    def wall_removed(self, rect):
+        """砖墙瓦片被摧毁后只重算受影响的格子，并只丢弃会受影响的流场"""
+        left, top, right, bottom = self.cell_range(rect)
+        if left >= right or top >= bottom:
+            return
+        old = self.blocked[top:bottom, left:right].copy()
+        self.blocked[top:bottom, left:right] = False
+
+        # 附近其他墙壁可能仍然挡着这些格子
+        size = self.cell_size
+        region = pygame.Rect(left * size, top * size, (right - left) * size, (bottom - top) * size)
+        for rect in self.walls.collide(region.inflate(self.clearance * 2, self.clearance * 2)):
+            self.mark_wall(rect)
+
+        changed = np.zeros_like(self.blocked)
+        changed[top:bottom, left:right] = old != self.blocked[top:bottom, left:right]
+        if not changed.any():
+            return
+        self.version += 1
+
+        # 新打通的格子只会影响能到达其相邻格子的流场
+        touched = changed.copy()
+        touched[1:, :] |= changed[:-1, :]
+        touched[:-1, :] |= changed[1:, :]
+        touched[:, 1:] |= changed[:, :-1]
+        touched[:, :-1] |= changed[:, 1:]
+        for goal in [goal for goal, field in self.fields.items() if field.reaches(touched)]:
+            del self.fields[goal]
+
+    def flow_field(self, goal):
+        """获取朝向目标格子的流场（带缓存）"""
+        field = self.fields.get(goal)
+        if field is None:
+            field = FlowField(self.blocked, goal, self.field_radius)
+            self.fields[goal] = field
+            if len(self.fields) > MAX_CACHED_FIELDS:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(goal)
+        return field
+
+    def steer(self, x, y, target_x, target_y):
+        """返回从 (x, y) 朝目标前进的下一个路点坐标；没有路径时返回 None"""
+        col, row = self.cell_of(x, y)
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return None
+        field = self.flow_field(self.cell_of(target_x, target_y))
+        if field.next_col is None:
+            return None
+
+        if field.distance(col, row) < 0:
+            # 坦克中心贴着墙（所在格子不可达）时，先回到最近的可达相邻格子
+            best = None
+            best_dist = -1
+            for dc, dr in NEIGHBORS:
+                dist = field.distance(col + dc, row + dr)
+                if dist >= 0 and (best is None or dist < best_dist):
+                    best, best_dist = (col + dc, row + dr), dist
+            return None if best is None else self.cell_center(*best)
+
+        next_col = int(field.next_col[row - field.top, col - field.left])
+        next_row = int(field.next_row[row - field.top, col - field.left])
+        if (next_col, next_row) == (col, row):
+            return None
+        return self.cell_center(next_col, next_row)
+
+    def steer_many(self, xs, ys, target_x, target_y):
+        """批量版 steer：返回 (路点x数组, 路点y数组, 是否有路点)，一次处理所有坦克"""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        count = len(xs)
+        waypoint_x = np.zeros(count)
+        waypoint_y = np.zeros(count)
+        valid = np.zeros(count, dtype=bool)
+
+        field = self.flow_field(self.cell_of(target_x, target_y))
+        if field.next_col is None or count == 0:
+            return waypoint_x, waypoint_y, valid
+
+        cols = (xs // self.cell_size).astype(np.intp)
+        rows = (ys // self.cell_size).astype(np.intp)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        cols = np.clip(cols, 0, self.cols - 1)
+        rows = np.clip(rows, 0, self.rows - 1)
+
+        dist, next_col, next_row = field.sample(cols, rows)
+        reachable = inside & (dist >= 0)
+        valid = reachable & ((next_col != cols) | (next_row != rows))
+        waypoint_x = (next_col + 0.5) * self.cell_size
+        waypoint_y = (next_row + 0.5) * self.cell_size
+
+        # 贴着墙（所在格子不可达）的少数坦克逐个处理；搜索窗口外的坦克没有路径
+        for index in np.flatnonzero(inside & ~reachable & field.contains(cols, rows)).tolist():
+            waypoint = self.steer(xs[index], ys[index], target_x, target_y)
+            if waypoint is not None:
+                waypoint_x[index], waypoint_y[index] = waypoint
+                valid[index] = True
+        return waypoint_x, waypoint_y, valid
@@ -0,0 +1,197 @@
+"""联机对战的网络协议：TCP上带长度前缀的二进制消息
+
+每条消息为 4 字节小端长度 + 内容，内容的第一个字节是消息类型。
+客户端 -> 服务器
+    MSG_INPUT     输入序号、输入位掩码（只在按键变化时发送）
+服务器 -> 客户端
+    MSG_WELCOME   新一局开始：分配到的坦克、场地大小，以及压缩后的完整瓦片地图
+    MSG_SNAPSHOT  增量快照：只包含与上次发给这个客户端的状态相比变化的坦克、
+                  新出现和消失的子弹（子弹按直线飞行，客户端自己推算位置）以及变化的瓦片
+"""
+import struct
+import zlib
+import numpy as np
+
+DEFAULT_PORT = 8765
+
+MSG_INPUT = 1
+MSG_WELCOME = 2
+MSG_SNAPSHOT = 3
+
+LENGTH = struct.Struct("<I")
+# 类型、输入序号、输入位掩码
+INPUT = struct.Struct("<BIB")
+# 类型、局数、坦克编号、阵营、tick频率、瓦片大小、场地宽高、列数、行数、压缩后瓦片类型和血量的字节数
+WELCOME = struct.Struct("<BIiBHHIIIIII")
+# 类型、局数、tick、发送时间、已处理的输入序号、变化坦克数、消失坦克数、新子弹数、消失子弹数、变化瓦片数
+SNAPSHOT = struct.Struct("<BIIdIHHIII")
+
+# 坦克位置量化到整像素
+TANK_DTYPE = np.dtype([("id", "<u2"), ("team", "u1"), ("frame", "u1"),
+                       ("x", "<u2"), ("y", "<u2"), ("health", "<i2")])
+# 子弹只在出现时发送一次，之后客户端按速度推算
+BULLET_DTYPE = np.dtype([("serial", "<u4"), ("team", "u1"), ("frame", "u1"),
+                         ("x", "<f4"), ("y", "<f4"), ("dx", "<f4"), ("dy", "<f4")])
+# 瓦片按 行 * 列数 + 列 编号
+TILE_DTYPE = np.dtype([("index", "<u4"), ("type", "u1"), ("health", "<i2")])
+
+# 单条消息的长度上限，防止错误数据让接收方分配巨大的缓冲区
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+def frame(payload):
+    """给消息内容加上长度前缀"""
+    return LENGTH.pack(len(payload)) + payload
+
+
+async def read_message(reader):
+    """从 asyncio 流中读取一条完整消息的内容"""
+    header = await reader.readexactly(LENGTH.size)
+    (length,) = LENGTH.unpack(header)
+    if length == 0 or length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"消息长度不正确: {length}")
+    return await reader.readexactly(length)
+
+
+def encode_input(seq, input_mask):
+    return frame(INPUT.pack(MSG_INPUT, seq, input_mask))
+
+
+def decode_input(payload):
+    """返回 (输入序号, 输入位掩码)"""
+    _, seq, input_mask = INPUT.unpack(payload)
+    return seq, input_mask
+
+
+def encode_welcome(round_id, tank, tick_rate, world):
+    """新一局的完整初始数据；tank 为 None 表示观战"""
+    walls = world.walls
+    types = zlib.compress(np.ascontiguousarray(walls.types).tobytes())
+    health = zlib.compress(walls.health.astype("<i2").tobytes())
+    tank_id, team = (-1, 0) if tank is None else (tank.tank_id, tank.team)
+    header = WELCOME.pack(MSG_WELCOME, round_id, tank_id, team, tick_rate, walls.tile_size,
+                          world.width, world.height, walls.cols, walls.rows, len(types), len(health))
+    return frame(header + types + health)
+
+
+def decode_welcome(payload):
+    """返回包含各字段的字典，瓦片类型和血量已解压为二维数组"""
+    (_, round_id, tank_id, team, tick_rate, tile_size, width, height, cols, rows,
+     types_size, health_size) = WELCOME.unpack_from(payload)
+    offset = WELCOME.size
+    types = np.frombuffer(zlib.decompress(payload[offset:offset + types_size]), dtype=np.uint8)
+    offset += types_size
+    health = np.frombuffer(zlib.decompress(payload[offset:offset + health_size]), dtype="<i2")
+    return {
+        "round": round_id, "tank_id": tank_id, "team": team, "tick_rate": tick_rate,
+        "tile_size": tile_size, "width": width, "height": height,
+        "types": types.reshape(rows, cols), "health": health.reshape(rows, cols),
+    }
+
+
+def tank_records(tanks):
+    """把所有存活坦克打包成按编号排序的记录数组"""
+    records = np.zeros(len(tanks), dtype=TANK_DTYPE)
+    for i, tank in enumerate(tanks):
+        records[i] = (tank.tank_id, tank.team, tank.frame_index,
+                      min(max(int(tank.x), 0), 0xFFFF), min(max(int(tank.y), 0), 0xFFFF),
+                      min(max(tank.health, -0x8000), 0x7FFF))
+    records.sort(order="id")
+    return records
+
+
+def bullet_records(bullets):
+    """把所有存活子弹打包成记录数组"""
+    slots = bullets.live_slots()
+    records = np.zeros(len(slots), dtype=BULLET_DTYPE)
+    records["serial"] = bullets.serial[slots]
+    records["team"] = bullets.team[slots]
+    records["frame"] = bullets.frame[slots]
+    records["x"] = bullets.x[slots]
+    records["y"] = bullets.y[slots]
+    records["dx"] = bullets.dx[slots]
+    records["dy"] = bullets.dy[slots]
+    return records
+
+
+def tile_changes(walls, old_types, old_health):
+    """比较瓦片数组，返回变化瓦片的记录数组"""
+    changed = np.flatnonzero((walls.types.ravel() != old_types.ravel()) |
+                             (walls.health.ravel() != old_health.ravel()))
+    records = np.zeros(len(changed), dtype=TILE_DTYPE)
+    records["index"] = changed
+    records["type"] = walls.types.ravel()[changed]
+    records["health"] = walls.health.ravel()[changed]
+    return records
+
+
+class SnapshotEncoder:
+    """为一个客户端生成增量快照：和上次发给它的坦克、子弹相比，只发送变化的部分。
+    TCP保证按顺序送达，所以不需要客户端确认基准快照"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """新一局开始或重新连接时清空基准，下一个快照会包含全部坦克和子弹"""
+        self.base_tick = None
+        self.tanks = np.zeros(0, dtype=TANK_DTYPE)
+        self.bullets = np.zeros(0, dtype=np.uint32)
+
+    def delta(self, tanks, bullets):
+        """与基准比较，返回 (各部分的数量, 打包好的内容)"""
+        # 坦克：编号已排序，用二分查找在基准中找到同一辆坦克再逐字段比较
+        base = self.tanks
+        if len(base):
+            index = np.minimum(np.searchsorted(base["id"], tanks["id"]), len(base) - 1)
+            same = base[index] == tanks
+        else:
+            same = np.zeros(len(tanks), dtype=bool)
+        changed_tanks = tanks[~same]
+        removed_tanks = np.setdiff1d(base["id"], tanks["id"]).astype("<u2")
+
+        # 子弹：按发射序号判断新出现和已消失的子弹
+        serials = bullets["serial"]
+        new_bullets = bullets[~np.isin(serials, self.bullets)]
+        removed_bullets = self.bullets[~np.isin(self.bullets, serials)].astype("<u4")
+
+        counts = (len(changed_tanks), len(removed_tanks), len(new_bullets), len(removed_bullets))
+        body = b"".join((changed_tanks.tobytes(), removed_tanks.tobytes(),
+                         new_bullets.tobytes(), removed_bullets.tobytes()))
+        return counts, body
+
+    def encode(self, round_id, tick, sent_at, input_seq, tanks, bullets, tiles, shared=None):
+        """生成一条快照消息并把当前状态作为新的基准。
+        shared 为同一tick内所有客户端共用的字典：基准相同的客户端只计算一次增量"""
+        if shared is None:
+            counts, body = self.delta(tanks, bullets)
+        else:
+            cached = shared.get(self.base_tick)
+            if cached is None:
+                cached = shared[self.base_tick] = self.delta(tanks, bullets)
+            counts, body = cached
+
+        self.base_tick = tick
+        self.tanks = tanks
+        self.bullets = bullets["serial"]
+        header = SNAPSHOT.pack(MSG_SNAPSHOT, round_id, tick, sent_at, input_seq, *counts, len(tiles))
+        return frame(b"".join((header, body, tiles.tobytes())))
+
+
+def decode_snapshot(payload):
+    """返回包含各字段的字典，坦克、子弹和瓦片为记录数组"""
+    (_, round_id, tick, sent_at, input_seq, tank_count, removed_tank_count, bullet_count,
+     removed_bullet_count, tile_count) = SNAPSHOT.unpack_from(payload)
+    offset = SNAPSHOT.size
+    sections = []
+    for dtype, count in ((TANK_DTYPE, tank_count), (np.dtype("<u2"), removed_tank_count),
+                         (BULLET_DTYPE, bullet_count), (np.dtype("<u4"), removed_bullet_count),
+                         (TILE_DTYPE, tile_count)):
+        sections.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+        offset += dtype.itemsize * count
+    tanks, removed_tanks, bullets, removed_bullets, tiles = sections
+    return {
+        "round": round_id, "tick": tick, "sent_at": sent_at, "input_seq": input_seq,
+        "tanks": tanks, "removed_tanks": removed_tanks, "bullets": bullets,
+        "removed_bullets": removed_bullets, "tiles": tiles,
+    }
@@ -0,0 +1,145 @@
+import numpy as np
+import pygame
+
+# 脏矩形数量超过这个值时直接整屏刷新，逐块更新反而更慢
+MAX_DIRTY_RECTS = 256
+
+# 战争迷雾中看不到的格子盖上的黑色的不透明度（墙壁仍能隐约看到）
+FOG_ALPHA = 190
+
+
+class FogOfWar:
+    """战争迷雾：玩家一方所有坦克视野的并集之外盖上半透明的黑色，那里的敌人坦克和子弹不画。
+    视野来自 World.visibility，迷雾图层只在视野（即某辆坦克所在的格子）变化时重建"""
+
+    def __init__(self):
+        self.key = None
+        self.overlay = None
+        self.visible = None
+        self.left = self.top = 0
+        self.tile_size = 1
+
+    def update(self, world, view):
+        """计算镜头视野 view（世界坐标的矩形）内可见的格子"""
+        visibility = world.visibility
+        size = visibility.tile_size
+        left, top = view.left // size, view.top // size
+        right, bottom = -(-view.right // size), -(-view.bottom // size)
+        viewers = [tank for tank in [world.player] + world.allies.sprites() if tank.alive()]
+        key = (visibility, left, top, right, bottom, tuple(visibility.view_of(tank) for tank in viewers))
+        if key == self.key:
+            return
+        self.key = key
+        self.left, self.top, self.tile_size = left, top, size
+        self.visible = visibility.visible_tiles(viewers, left, top, right, bottom)
+
+        # 每个格子一个像素的图层，放大到瓦片大小（最近邻，不会模糊）
+        overlay = pygame.Surface((right - left, bottom - top), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, FOG_ALPHA))
+        alpha = pygame.surfarray.pixels_alpha(overlay)
+        alpha[self.visible.T] = 0
+        del alpha
+        self.overlay = pygame.transform.scale(overlay, ((right - left) * size, (bottom - top) * size))
+
+    def covers(self, xs, ys):
+        """批量查询世界坐标的点是否在可见的格子里"""
+        rows, cols = self.visible.shape
+        local_cols = (np.asarray(xs) // self.tile_size).astype(np.intp) - self.left
+        local_rows = (np.asarray(ys) // self.tile_size).astype(np.intp) - self.top
+        inside = (local_cols >= 0) & (local_cols < cols) & (local_rows >= 0) & (local_rows < rows)
+        visible = np.zeros(len(local_cols), dtype=bool)
+        visible[inside] = self.visible[local_rows[inside], local_cols[inside]]
+        return visible
+
+    def draw(self, surface, view):
+        surface.blit(self.overlay, (self.left * self.tile_size - view.x, self.top * self.tile_size - view.y))
+
+
+def draw_world(surface, world, alpha=1.0, background_color=(0, 0, 0), camera=None, fog=None):
+    """整屏绘制墙壁图层、坦克和子弹；alpha 为两个tick之间的插值比例。
+    有镜头时只绘制视野内的墙壁块、坦克和子弹；fog 为 FogOfWar 时只显示玩家一方能看到的部分"""
+    surface.fill(background_color)
+    if camera is None and fog is None:
+        world.walls.draw(surface)
+        surface.blits([(tank.image, tank.draw_position(alpha)) for tank in world.tanks])
+        world.bullets.draw(surface, alpha=alpha)
+        return
+
+    view = camera.rect if camera is not None else surface.get_rect()
+    world.walls.draw(surface, view)
+    if fog is not None:
+        fog.update(world, view)
+    # 坦克矩形向外扩展一个tick的移动距离，插值后仍在视野边缘的坦克也会画出来
+    visible = view.inflate(16, 16)
+    sequence = []
+    for tank in world.tanks:
+        if visible.colliderect(tank.rect):
+            if fog is not None and tank in world.enemies and not fog.covers([tank.x], [tank.y])[0]:
+                continue
+            x, y = tank.draw_position(alpha)
+            sequence.append((tank.image, (x - view.x, y - view.y)))
+    surface.blits(sequence)
+    world.bullets.draw(surface, alpha=alpha, view=view, fog=fog)
+    if fog is not None:
+        fog.draw(surface, view)
+
+
+class DirtyRenderer:
+    """脏矩形渲染：墙壁使用瓦片地图缓存的图层作为背景，每帧只擦除和重绘移动的坦克、子弹和HUD"""
+
+    def __init__(self, screen, background_color=(0, 0, 0)):
+        self.screen = screen
+        self.background_color = background_color
+        self.background = None
+        self.world = None
+        self.walls_version = -1
+        self.previous_rects = []
+        self.full_redraw = True
+
+    def invalidate(self):
+        """下一帧整屏重绘（例如从结束画面返回后）"""
+        self.full_redraw = True
+
+    def bake_walls(self, world):
+        """使用瓦片地图的图层作为背景（图层在砖墙被摧毁时只局部更新）"""
+        self.background = world.walls.layer()
+        world.walls.take_dirty_rects()
+        self.walls_version = world.walls.version
+
+    def render(self, world, hud=(), alpha=1.0):
+        """绘制一帧；hud 是 (文字图像, 位置) 的序列，alpha 为两个tick之间的插值比例"""
+        screen = self.screen
+
+        # 换了新的世界时重新取背景并整屏刷新
+        if world is not self.world:
+            self.world = world
+            self.bake_walls(world)
+            self.full_redraw = True
+        background = self.background
+
+        # 有砖墙被摧毁时，只把变化的瓦片从图层复制到屏幕
+        wall_rects = []
+        if world.walls.version != self.walls_version:
+            self.walls_version = world.walls.version
+            wall_rects = world.walls.take_dirty_rects()
+
+        if self.full_redraw:
+            screen.fill(self.background_color)
+            screen.blit(background, (0, 0))
+        else:
+            # 用背景擦掉上一帧画过的区域
+            for rect in self.previous_rects + wall_rects:
+                screen.blit(background, rect, rect)
+
+        # 绘制坦克、子弹和HUD，并记录这一帧画过的区域
+        current_rects = screen.blits([(tank.image, tank.draw_position(alpha)) for tank in world.tanks]) or []
+        current_rects.extend(world.bullets.draw(screen, True, alpha))
+        for surface, position in hud:
+            current_rects.append(screen.blit(surface, position))
+
+        if self.full_redraw or len(self.previous_rects) + len(wall_rects) + len(current_rects) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.previous_rects + wall_rects + current_rects)
+        self.previous_rects = current_rects
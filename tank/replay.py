@@ -0,0 +1,321 @@
+"""坦克大战录像：只记录随机种子和每个tick的玩家输入位掩码，回放时重新模拟
+
+整局比赛由种子决定，敌人AI也用同一个种子，所以重新模拟能得到完全相同的过程。
+文件布局（小端序）：
+    文件头   魔数 b"TRPL"、版本、种子、场地宽高、每波敌人数量、波次数、tick总数、
+             输入段数、胜利方、关卡文件的CRC32、关卡路径长度、规则标志
+    关卡路径 UTF-8 字符串（没有关卡时为空）
+    输入     按游程编码的 (输入位掩码 uint8, 连续tick数 uint16) 序列
+
+用法：
+    python main.py --record match.rpl            录制
+    python replay.py play match.rpl --start 600  在窗口中回放
+    python replay.py seek match.rpl --tick 5000 --screenshot shot.png
+    python replay.py export match.rpl --start 1200 --end 1500 --out clip
+    python replay.py verify match.rpl
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+import numpy as np
+import pygame
+from camera import Camera
+from level import load_level
+from renderer import draw_world
+from world import World
+
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, render_text
+
+MAGIC = b"TRPL"
+VERSION = 1
+HEADER = struct.Struct("<4sHIIIHHIIBIHB")
+
+# 规则标志：会改变模拟结果的世界规则开关按位记录在文件头里，不认识的标志拒绝载入
+FLAG_BULLET_CANCEL = 1  # 不同阵营的子弹相撞时互相抵消
+KNOWN_FLAGS = FLAG_BULLET_CANCEL
+RUN_DTYPE = np.dtype([("input", "u1"), ("length", "<u2")])
+
+# 回放窗口和导出图片的最大尺寸，场地更大时镜头跟随玩家
+MAX_VIEW_SIZE = (800, 600)
+
+WINNER_CODES = {None: 0, "player": 1, "enemy": 2}
+WINNER_NAMES = {None: "未结束", "player": "玩家", "enemy": "敌人"}
+
+
+def level_checksum(path):
+    with open(path, "rb") as f:
+        return zlib.crc32(f.read())
+
+
+class Replay:
+    """一局比赛的录像：创建世界所需的参数和每个tick的玩家输入"""
+
+    def __init__(self, seed, width=800, height=600, enemy_count=1, waves=1, level_path=None,
+                 inputs=None, winner=None, level_crc=None, bullet_cancel=False):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.enemy_count = enemy_count
+        self.waves = waves
+        self.level_path = level_path
+        self.level_crc = level_crc
+        if level_path and level_crc is None:
+            self.level_crc = level_checksum(level_path)
+        self.inputs = bytearray() if inputs is None else bytearray(inputs)  # 每个tick一个字节
+        self.winner = winner
+        self.bullet_cancel = bullet_cancel
+
+    @classmethod
+    def from_world(cls, world, level_path=None):
+        """为刚创建、还没有推进过的世界开始录像"""
+        return cls(world.seed, world.width, world.height, world.enemy_count, world.waves, level_path,
+                   bullet_cancel=world.bullet_cancel)
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, input_mask):
+        """记录一个tick的玩家输入"""
+        self.inputs.append(input_mask)
+
+    def create_world(self):
+        """按录像的参数重新创建初始世界"""
+        level = None
+        if self.level_path:
+            if self.level_crc is not None and level_checksum(self.level_path) != self.level_crc:
+                raise ValueError(f"关卡文件 {self.level_path} 与录制时不同")
+            level = load_level(self.level_path)
+        return World(self.width, self.height, seed=self.seed, enemy_count=self.enemy_count,
+                     waves=self.waves, level=level, bullet_cancel=self.bullet_cancel)
+
+    def simulate(self, world, tick):
+        """不渲染地把世界推进到指定tick（不能超过录像长度）"""
+        inputs = self.inputs
+        tick = min(tick, len(inputs))
+        while world.tick < tick and not world.game_over:
+            world.step(inputs[world.tick])
+        return world
+
+    def save(self, path):
+        inputs = np.frombuffer(bytes(self.inputs), dtype=np.uint8)
+        runs = encode_runs(inputs)
+        level_path = (self.level_path or "").encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.width, self.height, self.enemy_count,
+                                self.waves, len(inputs), len(runs), WINNER_CODES[self.winner],
+                                self.level_crc or 0, len(level_path),
+                                FLAG_BULLET_CANCEL if self.bullet_cancel else 0))
+            f.write(level_path)
+            f.write(runs.tobytes())
+
+
+def encode_runs(inputs):
+    """把每tick的输入数组编码为游程序列（超过 uint16 的游程拆成多段）"""
+    if len(inputs) == 0:
+        return np.zeros(0, dtype=RUN_DTYPE)
+    starts = np.flatnonzero(np.r_[True, inputs[1:] != inputs[:-1]])
+    lengths = np.diff(np.r_[starts, len(inputs)])
+    runs = []
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        while length > 0:
+            chunk = min(length, 0xFFFF)
+            runs.append((inputs[start], chunk))
+            length -= chunk
+    return np.array(runs, dtype=RUN_DTYPE)
+
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    (magic, version, seed, width, height, enemy_count, waves, tick_count, run_count, winner,
+     level_crc, level_path_size, flags) = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是坦克大战录像文件")
+    if version != VERSION:
+        raise ValueError(f"不支持的录像版本: {version}")
+    if flags & ~KNOWN_FLAGS:
+        raise ValueError(f"不支持的规则标志: {flags:#x}")
+
+    offset = HEADER.size
+    level_path = data[offset:offset + level_path_size].decode("utf-8") or None
+    offset += level_path_size
+    runs = np.frombuffer(data, dtype=RUN_DTYPE, count=run_count, offset=offset)
+    inputs = np.repeat(runs["input"], runs["length"])
+    if len(inputs) != tick_count:
+        raise ValueError(f"录像已损坏: 输入长度 {len(inputs)}，应为 {tick_count}")
+    winner = {code: name for name, code in WINNER_CODES.items()}[winner]
+    return Replay(seed, width, height, enemy_count, waves, level_path, inputs.tobytes(), winner,
+                  level_crc if level_path else None, bool(flags & FLAG_BULLET_CANCEL))
+
+
+def create_view(replay):
+    """返回 (画面大小, 镜头)；场地不比 MAX_VIEW_SIZE 大时不需要镜头"""
+    size = (min(replay.width, MAX_VIEW_SIZE[0]), min(replay.height, MAX_VIEW_SIZE[1]))
+    if size == (replay.width, replay.height):
+        return size, None
+    return size, Camera(size[0], size[1], replay.width, replay.height)
+
+
+def draw_view(surface, world, camera, alpha=1.0):
+    if camera is not None:
+        camera.follow(world.player, alpha)
+    draw_world(surface, world, alpha, camera=camera)
+
+
+def init_headless():
+    """不打开窗口的命令使用虚拟显示驱动"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+
+
+def seek(replay, tick):
+    """从头重新模拟到指定tick，返回 (世界, 耗时秒数)"""
+    start = time.perf_counter()
+    world = replay.simulate(replay.create_world(), tick)
+    return world, time.perf_counter() - start
+
+
+def play(replay, start_tick=0, speed=1.0, tick_rate=60):
+    """在窗口中回放：空格暂停，左右方向键后退/前进10秒，上下方向键调整速度，ESC退出"""
+    pygame.init()
+    size, camera = create_view(replay)
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("坦克大战 - 回放")
+    clock = pygame.time.Clock()
+    font = get_sysfont(None, 24)
+    tick_time = 1.0 / tick_rate
+
+    world, _ = seek(replay, start_tick)
+    accumulator = 0.0
+    previous_time = time.perf_counter()
+    paused = False
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    replay.simulate(world, world.tick + tick_rate * 10)
+                elif event.key == pygame.K_LEFT:
+                    # 往回跳只能从头重新模拟
+                    world, _ = seek(replay, max(0, world.tick - tick_rate * 10))
+                elif event.key == pygame.K_UP:
+                    speed = min(speed * 2, 64)
+                elif event.key == pygame.K_DOWN:
+                    speed = max(speed / 2, 0.125)
+
+        now = time.perf_counter()
+        if not paused:
+            accumulator += (now - previous_time) * speed
+        previous_time = now
+        while accumulator >= tick_time:
+            replay.simulate(world, world.tick + 1)
+            accumulator -= tick_time
+        if world.game_over or world.tick >= len(replay):
+            accumulator = 0.0
+
+        draw_view(screen, world, camera, min(accumulator / tick_time, 1.0))
+        status = f"tick {world.tick}/{len(replay)}  {world.tick / tick_rate:.1f}s  x{speed:g}"
+        if paused:
+            status += "  暂停"
+        if world.game_over:
+            status += f"  {WINNER_NAMES[world.winner]}胜利"
+        screen.blit(render_text(font, status, (255, 255, 255)), (10, 10))
+        pygame.display.flip()
+        clock.tick(60)
+
+
+def export_frames(replay, start_tick, end_tick, out_dir, every=1):
+    """把一段录像逐tick渲染成PNG图片，返回写出的图片数量"""
+    os.makedirs(out_dir, exist_ok=True)
+    world, _ = seek(replay, start_tick)
+    size, camera = create_view(replay)
+    surface = pygame.Surface(size)
+    count = 0
+    while world.tick <= min(end_tick, len(replay)):
+        if (world.tick - start_tick) % every == 0:
+            draw_view(surface, world, camera)
+            pygame.image.save(surface, os.path.join(out_dir, f"frame_{world.tick:06d}.png"))
+            count += 1
+        if world.game_over or world.tick >= len(replay):
+            break
+        replay.simulate(world, world.tick + 1)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战录像工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="显示录像信息")
+    info.add_argument("path")
+
+    play_parser = commands.add_parser("play", help="在窗口中回放")
+    play_parser.add_argument("path")
+    play_parser.add_argument("--start", type=int, default=0, help="从第几个tick开始")
+    play_parser.add_argument("--speed", type=float, default=1.0, help="播放速度倍数")
+
+    seek_parser = commands.add_parser("seek", help="不渲染地模拟到指定tick")
+    seek_parser.add_argument("path")
+    seek_parser.add_argument("--tick", type=int, required=True)
+    seek_parser.add_argument("--screenshot", help="把这个tick的画面保存为图片")
+
+    export = commands.add_parser("export", help="把一段录像导出为PNG图片序列")
+    export.add_argument("path")
+    export.add_argument("--start", type=int, required=True)
+    export.add_argument("--end", type=int, required=True)
+    export.add_argument("--out", required=True, help="输出目录")
+    export.add_argument("--every", type=int, default=1, help="每隔几个tick导出一张")
+
+    verify = commands.add_parser("verify", help="重新模拟整局，检查结果与录制时相同")
+    verify.add_argument("path")
+
+    args = parser.parse_args()
+    replay = load_replay(args.path)
+
+    if args.command == "info":
+        print(f"{args.path}: 种子 {replay.seed}  场地 {replay.width}x{replay.height}  "
+              f"每波敌人 {replay.enemy_count}  波次 {replay.waves}")
+        print(f"  长度: {len(replay)} tick ({len(replay) / 60:.1f}s)  结果: {WINNER_NAMES[replay.winner]}")
+        if replay.level_path:
+            print(f"  关卡: {replay.level_path}")
+        if replay.bullet_cancel:
+            print("  规则: 子弹互相抵消")
+    elif args.command == "play":
+        play(replay, args.start, args.speed)
+    elif args.command == "seek":
+        init_headless()
+        world, elapsed = seek(replay, args.tick)
+        print(f"模拟到 tick {world.tick} 用时 {elapsed:.2f}s ({world.tick / max(elapsed, 1e-9) / 60:.0f} 倍速)")
+        print(f"  玩家血量: {world.player.health}  剩余敌人: {len(world.enemies)}  子弹: {len(world.bullets)}")
+        if args.screenshot:
+            size, camera = create_view(replay)
+            surface = pygame.Surface(size)
+            draw_view(surface, world, camera)
+            pygame.image.save(surface, args.screenshot)
+    elif args.command == "export":
+        init_headless()
+        count = export_frames(replay, args.start, args.end, args.out, max(1, args.every))
+        print(f"已导出 {count} 张图片到 {args.out}")
+    else:
+        init_headless()
+        world, elapsed = seek(replay, len(replay))
+        ok = world.tick == len(replay) and world.winner == replay.winner
+        print(f"重新模拟 {world.tick} tick 用时 {elapsed:.2f}s，结果: {WINNER_NAMES[world.winner]}"
+              f"（录制时: {WINNER_NAMES[replay.winner]}）")
+        print("一致" if ok else "不一致！")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import pygame
+
+# 预渲染的旋转角度步数（72步，即每5度一帧）
+ROTATION_STEPS = 72
+
+# 所有旋转缓存，按键共享（例如 ("tank", 颜色)、("bullet",)）
+_caches = {}
+
+# 全部置位的碰撞遮罩，按尺寸共享（用来检测精灵与墙壁矩形的像素级重叠）
+_filled_masks = {}
+
+
+class RotationCache:
+    """把一张原始图像按量化角度预先旋转好，所有同类精灵共享同一组图像"""
+
+    def __init__(self, image, steps=ROTATION_STEPS):
+        self.image = image
+        self.steps = steps
+        self.step_angle = 360 / steps
+
+        # 每一帧保存旋转后的图像以及相对中心点的左上角偏移
+        self.frames = []
+        for i in range(steps):
+            rotated = pygame.transform.rotate(image, i * self.step_angle)
+            width, height = rotated.get_size()
+            self.frames.append((rotated, (-(width // 2), -(height // 2))))
+
+        # 每一帧对应的碰撞遮罩，只在这里生成一次，碰撞检测时直接取用
+        self.masks = [pygame.mask.from_surface(rotated) for rotated, _ in self.frames]
+
+    def index(self, angle):
+        """把任意角度量化为帧序号"""
+        return int(round(angle / self.step_angle)) % self.steps
+
+    def get(self, angle):
+        """返回 (图像, 中心偏移)"""
+        return self.frames[self.index(angle)]
+
+
+def get_rotation_cache(key, factory, steps=ROTATION_STEPS):
+    """获取共享的旋转缓存，不存在时用 factory() 生成原始图像并预渲染"""
+    cache = _caches.get(key)
+    if cache is None:
+        cache = RotationCache(factory(), steps)
+        _caches[key] = cache
+    return cache
+
+
+def get_filled_mask(size):
+    """获取一个指定尺寸、所有像素都置位的遮罩"""
+    mask = _filled_masks.get(size)
+    if mask is None:
+        mask = pygame.mask.Mask(size, fill=True)
+        _filled_masks[size] = mask
+    return mask
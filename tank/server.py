@@ -0,0 +1,241 @@
+"""坦克大战联机服务器：服务器运行权威的 World 模拟，客户端只发送输入位掩码
+
+每个tick应用所有客户端最新的输入，再给每个客户端发送一个增量快照（见 protocol.py）。
+前两个连接的客户端分别操作玩家坦克和第一辆敌人，之后的客户端加入人数较少的一方，
+断开连接的客户端的坦克交给AI控制。一局结束后自动开始下一局。
+
+用法：python server.py --port 8765 --enemies 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import protocol
+from level import load_level
+from world import World
+
+TICK_RATE = 60
+MAX_CATCHUP_TICKS = 5  # 服务器落后超过这么多tick时放弃追赶
+RESTART_DELAY = 180  # 一局结束后等待的tick数
+MAX_PENDING_BYTES = 256 * 1024  # 客户端未发出的数据超过这个字节数时跳过给它的快照
+WALL_HISTORY_TICKS = 600  # 保留的瓦片变化记录，落后更多的客户端重新发送完整地图
+
+# 胜利方的显示名称
+WINNER_NAMES = {"player": "玩家", "enemy": "敌人"}
+
+
+class ClientConnection:
+    """一个已连接的客户端：最新输入、操作的坦克和流量统计"""
+
+    def __init__(self, client_id, writer):
+        self.client_id = client_id
+        self.writer = writer
+        self.input_mask = 0
+        self.input_seq = 0
+        self.tank = None
+        self.encoder = protocol.SnapshotEncoder()
+        self.wall_tick = 0  # 已经发给这个客户端的瓦片变化的tick
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.snapshots_skipped = 0
+
+    def send(self, data):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+    def congested(self):
+        return self.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES
+
+
+class GameServer:
+    def __init__(self, width=800, height=600, enemy_count=1, waves=1, seed=None, level=None,
+                 tick_rate=TICK_RATE, send_every=1):
+        self.width = width
+        self.height = height
+        self.enemy_count = enemy_count
+        self.waves = waves
+        self.seed = seed
+        self.level = level
+        self.tick_rate = tick_rate
+        self.send_every = send_every  # 每隔几个tick发送一次快照
+        self.clients = {}
+        self.next_client_id = 0
+        self.round = 0
+        self.world = None
+        self.restart_countdown = None
+
+        # 每tick的耗时（毫秒），定期汇报后清空
+        self.tick_times = []
+        self.new_round()
+
+    def new_round(self):
+        """创建新的世界，重新给所有客户端分配坦克并发送完整地图"""
+        self.round += 1
+        seed = None if self.seed is None else self.seed + self.round
+        self.world = World(self.width, self.height, seed=seed, enemy_count=self.enemy_count,
+                           waves=self.waves, level=self.level)
+        self.restart_countdown = None
+        self.wall_types = self.world.walls.types.copy()
+        self.wall_health = self.world.walls.health.copy()
+        self.wall_history = []  # [(tick, 瓦片变化记录), ...]
+        for client in self.clients.values():
+            client.tank = None
+        for client in self.clients.values():
+            self.join(client)
+
+    def join(self, client):
+        """给客户端分配坦克并发送新一局的完整数据"""
+        client.tank = self.assign_tank()
+        client.encoder.reset()
+        client.wall_tick = self.world.tick
+        client.send(protocol.encode_welcome(self.round, client.tank, self.tick_rate, self.world))
+
+    def assign_tank(self):
+        """先分配还没有人操作的玩家坦克和第一辆敌人，再往人数较少的一方加坦克"""
+        world = self.world
+        taken = {client.tank for client in self.clients.values() if client.tank is not None}
+        for tank in (world.player, world.enemy):
+            if tank.alive() and tank not in taken:
+                return tank
+        humans = [0, 0]
+        for tank in taken:
+            humans[min(tank.team, 1)] += 1
+        return world.add_player_tank(0 if humans[0] <= humans[1] else 1)
+
+    async def handle_client(self, reader, writer):
+        client = ClientConnection(self.next_client_id, writer)
+        self.next_client_id += 1
+        self.clients[client.client_id] = client
+        self.join(client)
+        try:
+            while True:
+                payload = await protocol.read_message(reader)
+                if payload[0] == protocol.MSG_INPUT:
+                    client.input_seq, client.input_mask = protocol.decode_input(payload)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            # 断开后坦克交给AI控制
+            del self.clients[client.client_id]
+            writer.close()
+
+    def step(self):
+        """推进一个tick并发送快照"""
+        world = self.world
+        start = time.perf_counter()
+        inputs = {client.tank.tank_id: client.input_mask
+                  for client in self.clients.values() if client.tank is not None}
+        world.step(inputs=inputs)
+
+        # 记录这个tick变化的瓦片，所有客户端共用
+        tiles = protocol.tile_changes(world.walls, self.wall_types, self.wall_health)
+        if len(tiles):
+            self.wall_types[:] = world.walls.types
+            self.wall_health[:] = world.walls.health
+            self.wall_history.append((world.tick, tiles))
+        while self.wall_history and self.wall_history[0][0] <= world.tick - WALL_HISTORY_TICKS:
+            self.wall_history.pop(0)
+
+        if world.tick % self.send_every == 0:
+            self.broadcast()
+        self.tick_times.append((time.perf_counter() - start) * 1000)
+
+        # 一局结束后稍等片刻开始下一局
+        if world.game_over:
+            if self.restart_countdown is None:
+                self.restart_countdown = RESTART_DELAY
+                print(f"第{self.round}局结束: {WINNER_NAMES[world.winner]}胜利")
+            self.restart_countdown -= 1
+            if self.restart_countdown <= 0:
+                self.new_round()
+
+    def broadcast(self):
+        world = self.world
+        tanks = protocol.tank_records(world.tanks)
+        bullets = protocol.bullet_records(world.bullets)
+        sent_at = time.time()
+        empty_tiles = np.zeros(0, dtype=protocol.TILE_DTYPE)
+        # 基准相同的客户端（通常是全部）共用同一份增量和瓦片变化
+        deltas = {}
+        tile_sets = {}
+        for client in list(self.clients.values()):
+            if client.congested():
+                # 客户端收得太慢：这次不发，基准不变，下一个快照会包含累积的变化
+                client.snapshots_skipped += 1
+                continue
+            if client.wall_tick < world.tick - WALL_HISTORY_TICKS:
+                # 落后太多，瓦片变化记录已经丢弃，重新发送完整地图
+                self.join(client)
+                continue
+            tiles = tile_sets.get(client.wall_tick)
+            if tiles is None:
+                changes = [tiles for tick, tiles in self.wall_history if tick > client.wall_tick]
+                tiles = tile_sets[client.wall_tick] = np.concatenate(changes) if changes else empty_tiles
+            client.wall_tick = world.tick
+            client.send(client.encoder.encode(self.round, world.tick, sent_at, client.input_seq,
+                                              tanks, bullets, tiles, deltas))
+            client.snapshots_sent += 1
+
+    def report(self, elapsed):
+        """打印最近一段时间的tick耗时和每个客户端的流量"""
+        tick_times = np.array(self.tick_times or [0.0])
+        self.tick_times = []
+        rates = []
+        for client in self.clients.values():
+            rates.append(client.bytes_sent / elapsed / 1024)
+            client.bytes_sent = 0
+        rate = f"{np.mean(rates):.1f}" if rates else "-"
+        print(f"客户端: {len(self.clients):>3}  tick: 平均 {tick_times.mean():.2f}ms 最大 {tick_times.max():.2f}ms  "
+              f"每客户端流量: {rate} KB/s")
+
+    async def run(self, host="127.0.0.1", port=protocol.DEFAULT_PORT, report_interval=5.0):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"服务器已启动: {host}:{port}")
+        loop = asyncio.get_running_loop()
+        tick_time = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        last_report = next_tick
+        async with server:
+            while True:
+                self.step()
+                next_tick += tick_time
+                now = loop.time()
+                if now - next_tick > tick_time * MAX_CATCHUP_TICKS:
+                    next_tick = now
+                if report_interval and now - last_report >= report_interval:
+                    self.report(now - last_report)
+                    last_report = now
+                await asyncio.sleep(max(0.0, next_tick - now))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战联机服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（局域网对战用 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT, help="端口")
+    parser.add_argument("--width", type=int, default=800, help="场地宽度")
+    parser.add_argument("--height", type=int, default=600, help="场地高度")
+    parser.add_argument("--enemies", type=int, default=1, help="每波敌人数量")
+    parser.add_argument("--waves", type=int, default=1, help="波次数量")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--level", help="关卡文件")
+    parser.add_argument("--send-every", type=int, default=1, help="每隔几个tick发送一次快照，用来降低流量")
+    parser.add_argument("--report", type=float, default=5.0, help="统计信息的打印间隔（秒），0为不打印")
+    args = parser.parse_args()
+
+    level = load_level(args.level) if args.level else None
+    server = GameServer(args.width, args.height, args.enemies, args.waves, args.seed, level,
+                        send_every=max(1, args.send_every))
+    try:
+        asyncio.run(server.run(args.host, args.port, args.report))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""模拟进程和渲染进程之间的共享内存世界状态
+
+模拟进程（simulate.py）每个tick把坦克、子弹和墙壁状态写进一块
+multiprocessing.shared_memory，渲染进程（main.py --sim-process 或 spectate.py）
+直接在这块内存上建立NumPy视图来绘制，不复制数据。
+
+布局：
+    全局头部  场地大小、容量、最新的序号、控制方写入的输入位掩码和命令
+    两个槽位  槽位头部（序号、tick、数量、胜负）、坦克数组、子弹数组、瓦片类型数组
+
+写入第 n 个状态时使用第 n % 2 个槽位（双缓冲）：先把槽位序号设为 2n-1（奇数表示正在写），
+写完后设为 2n，最后把全局头部的最新序号改为 n。读取方取最新序号对应的槽位，
+用完后再检查槽位序号没有变化（顺序锁），变了说明这一帧读到了被覆盖的数据，重新读取即可。
+因为是双缓冲，读取方拿到的槽位要再过一个tick才会被覆盖。
+"""
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from world import SIDE_PLAYER, SIDE_ENEMY, SIDE_ALLY
+
+MAGIC = 0x544B5357  # "TKSW"
+
+# 默认的共享内存名字，观战时用同一个名字连接
+DEFAULT_NAME = "tank_match"
+
+# 每个槽位最多保存的坦克和子弹数量，超过的部分不发布
+MAX_TANKS = 2048
+MAX_BULLETS = 8192
+
+# 控制方写入的命令
+COMMAND_NONE = 0
+COMMAND_RESTART = 1
+COMMAND_QUIT = 2
+
+WINNER_CODES = {None: 0, "player": 1, "enemy": 2}
+WINNER_NAMES = {code: name for name, code in WINNER_CODES.items()}
+
+HEADER_DTYPE = np.dtype([("magic", "<u4"), ("width", "<u4"), ("height", "<u4"), ("tile_size", "<u4"),
+                         ("cols", "<u4"), ("rows", "<u4"), ("max_tanks", "<u4"), ("max_bullets", "<u4"),
+                         ("tick_rate", "<u4"), ("input_mask", "<u4"), ("command", "<u4"),
+                         ("closed", "<u4"), ("latest", "<u8")])
+SLOT_DTYPE = np.dtype([("seq", "<u8"), ("time", "<f8"), ("tick", "<u4"), ("tank_count", "<u4"),
+                       ("bullet_count", "<u4"), ("walls_version", "<u4"), ("game_over", "u1"), ("winner", "u1"),
+                       ("wave", "<u2"), ("waves", "<u2"), ("pad", "<u2")])
+TANK_DTYPE = np.dtype([("id", "<u4"), ("side", "u1"), ("frame", "u1"), ("pad", "<u2"), ("health", "<i4"),
+                       ("x", "<f4"), ("y", "<f4"), ("prev_x", "<f4"), ("prev_y", "<f4")])
+BULLET_DTYPE = np.dtype([("frame", "<u4"), ("x", "<f4"), ("y", "<f4"), ("prev_x", "<f4"), ("prev_y", "<f4")])
+
+
+def align(size, alignment=8):
+    return -(-size // alignment) * alignment
+
+
+def slot_size(max_tanks, max_bullets, cols, rows):
+    return (align(SLOT_DTYPE.itemsize) + align(TANK_DTYPE.itemsize * max_tanks) +
+            align(BULLET_DTYPE.itemsize * max_bullets) + align(cols * rows))
+
+
+class Slot:
+    """一个槽位里各数组在共享内存上的视图"""
+
+    def __init__(self, buffer, offset, max_tanks, max_bullets, cols, rows):
+        self.header = np.ndarray(1, SLOT_DTYPE, buffer, offset)
+        offset += align(SLOT_DTYPE.itemsize)
+        self.tanks = np.ndarray(max_tanks, TANK_DTYPE, buffer, offset)
+        offset += align(TANK_DTYPE.itemsize * max_tanks)
+        self.bullets = np.ndarray(max_bullets, BULLET_DTYPE, buffer, offset)
+        offset += align(BULLET_DTYPE.itemsize * max_bullets)
+        self.wall_types = np.ndarray((rows, cols), np.uint8, buffer, offset)
+
+
+class SharedState:
+    """某个槽位上最新状态的只读视图（不复制数据）。用完后调用 consistent() 确认没有被覆盖"""
+
+    def __init__(self, slot, seq):
+        self.slot = slot
+        self.seq = seq
+        header = slot.header[0]
+        self.time = float(header["time"])  # 发布时的 time.time()，用来推算插值比例
+        self.tick = int(header["tick"])
+        self.game_over = bool(header["game_over"])
+        self.winner = WINNER_NAMES.get(int(header["winner"]))
+        self.wave = int(header["wave"])
+        self.waves = int(header["waves"])
+        self.walls_version = int(header["walls_version"])  # 瓦片每次变化（包括换了新的一局）都会加一
+        self.tanks = slot.tanks[:int(header["tank_count"])]
+        self.bullets = slot.bullets[:int(header["bullet_count"])]
+        self.wall_types = slot.wall_types
+
+    def consistent(self):
+        """读取期间模拟进程没有改写这个槽位"""
+        return int(self.slot.header[0]["seq"]) == self.seq * 2
+
+    def player(self):
+        """玩家坦克的记录，已被摧毁时返回 None"""
+        players = self.tanks[self.tanks["side"] == SIDE_PLAYER]
+        return players[0] if len(players) else None
+
+    def enemies_left(self):
+        return int(np.count_nonzero(self.tanks["side"] == SIDE_ENEMY))
+
+
+class SharedWorld:
+    """共享内存中的世界状态。模拟进程用 create() 创建并发布，渲染进程用 attach() 连接"""
+
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.owner = owner
+        buffer = memory.buf
+        self.header = np.ndarray(1, HEADER_DTYPE, buffer, 0)
+        header = self.header[0]
+        if int(header["magic"]) != MAGIC:
+            raise ValueError(f"共享内存 {memory.name} 不是坦克大战的世界状态")
+        self.width = int(header["width"])
+        self.height = int(header["height"])
+        self.tile_size = int(header["tile_size"])
+        self.cols = int(header["cols"])
+        self.rows = int(header["rows"])
+        self.tick_rate = int(header["tick_rate"])
+        max_tanks = int(header["max_tanks"])
+        max_bullets = int(header["max_bullets"])
+        size = slot_size(max_tanks, max_bullets, self.cols, self.rows)
+        offset = align(HEADER_DTYPE.itemsize)
+        self.slots = [Slot(buffer, offset + size * i, max_tanks, max_bullets, self.cols, self.rows)
+                      for i in range(2)]
+        # 墙壁每次变化（包括换了新的世界）时加一的发布版本，和每个槽位里瓦片数组对应的版本
+        self.walls_key = None
+        self.walls_version = 0
+        self.published_walls = [-1, -1]
+
+    @classmethod
+    def create(cls, world, name=DEFAULT_NAME, tick_rate=60, max_tanks=MAX_TANKS, max_bullets=MAX_BULLETS):
+        """为一个世界创建共享内存（同名的旧内存会被替换）"""
+        walls = world.walls
+        size = align(HEADER_DTYPE.itemsize) + 2 * slot_size(max_tanks, max_bullets, walls.cols, walls.rows)
+        try:
+            # 上一次异常退出时遗留的同名内存
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        memory = shared_memory.SharedMemory(name, create=True, size=size)
+        header = np.ndarray(1, HEADER_DTYPE, memory.buf, 0)
+        header[0] = (MAGIC, world.width, world.height, walls.tile_size, walls.cols, walls.rows,
+                     max_tanks, max_bullets, tick_rate, 0, COMMAND_NONE, 0, 0)
+        del header
+        return cls(memory, True)
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        """连接到正在运行的模拟进程创建的共享内存"""
+        memory = shared_memory.SharedMemory(name)
+        # Python 3.13 之前连接方也会被资源跟踪器登记，退出时会把别人的共享内存删掉
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(memory, False)
+
+    def publish(self, world):
+        """把世界的当前状态写进下一个槽位"""
+        header = self.header[0]
+        seq = int(header["latest"]) + 1
+        index = seq % 2
+        slot = self.slots[index]
+        slot_header = slot.header[0]
+        slot_header["seq"] = seq * 2 - 1
+
+        tanks = world.tanks.sprites()[:len(slot.tanks)]
+        records = slot.tanks
+        for i, tank in enumerate(tanks):
+            if tank is world.player:
+                side = SIDE_PLAYER
+            elif tank in world.allies:
+                side = SIDE_ALLY
+            else:
+                side = SIDE_ENEMY
+            records[i] = (tank.tank_id, side, tank.frame_index, 0, tank.health,
+                          tank.x, tank.y, tank.prev_x, tank.prev_y)
+
+        bullets = world.bullets
+        live_slots = bullets.live_slots()[:len(slot.bullets)]
+        count = len(live_slots)
+        records = slot.bullets
+        records["frame"][:count] = bullets.frame[live_slots]
+        records["x"][:count] = bullets.x[live_slots]
+        records["y"][:count] = bullets.y[live_slots]
+        records["prev_x"][:count] = bullets.prev_x[live_slots]
+        records["prev_y"][:count] = bullets.prev_y[live_slots]
+
+        # 瓦片只在墙壁变化后才复制（每个槽位各自记录自己的版本）
+        walls = world.walls
+        if self.walls_key != (id(walls), walls.version):
+            self.walls_key = (id(walls), walls.version)
+            self.walls_version += 1
+        if self.published_walls[index] != self.walls_version:
+            np.copyto(slot.wall_types, walls.types)
+            self.published_walls[index] = self.walls_version
+
+        slot_header["time"] = time.time()
+        slot_header["tick"] = world.tick
+        slot_header["tank_count"] = len(tanks)
+        slot_header["bullet_count"] = count
+        slot_header["walls_version"] = self.walls_version
+        slot_header["game_over"] = world.game_over
+        slot_header["winner"] = WINNER_CODES[world.winner]
+        slot_header["wave"] = world.wave
+        slot_header["waves"] = world.waves
+        slot_header["seq"] = seq * 2
+        header["latest"] = seq
+
+    def latest(self):
+        """返回最新状态的视图；还没有发布过任何状态时返回 None"""
+        for _ in range(3):
+            seq = int(self.header[0]["latest"])
+            if seq == 0:
+                return None
+            slot = self.slots[seq % 2]
+            if int(slot.header[0]["seq"]) == seq * 2:
+                return SharedState(slot, seq)
+        return None
+
+    # 控制方（main.py --sim-process）写入输入和命令，模拟进程读取
+    def set_input(self, input_mask):
+        self.header[0]["input_mask"] = input_mask
+
+    def input_mask(self):
+        return int(self.header[0]["input_mask"])
+
+    def send_command(self, command):
+        self.header[0]["command"] = command
+
+    def take_command(self):
+        header = self.header[0]
+        command = int(header["command"])
+        if command != COMMAND_NONE:
+            header["command"] = COMMAND_NONE
+        return command
+
+    def mark_closed(self):
+        """模拟进程退出前调用，观战方据此结束"""
+        self.header[0]["closed"] = 1
+
+    def closed(self):
+        return bool(self.header[0]["closed"])
+
+    def close(self):
+        # 先释放所有指向共享内存的视图，否则无法关闭
+        self.header = None
+        self.slots = []
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -0,0 +1,96 @@
+"""独立的模拟进程：以固定的每秒60个tick推进世界，并把状态发布到共享内存
+
+main.py --sim-process 会自动启动它；也可以单独运行，然后用 spectate.py 观战。
+玩家坦克按控制方（main.py --sim-process 或 spectate.py --control）写入共享内存的输入移动，
+没有控制方时玩家坦克原地不动。
+
+用法：python simulate.py --name tank_match --enemies 10 --waves 3
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+# 模拟进程不需要窗口和声音
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from level import load_level
+from shared_world import SharedWorld, DEFAULT_NAME, COMMAND_RESTART, COMMAND_QUIT
+from world import World
+
+TICK_RATE = 60
+MAX_CATCHUP_STEPS = 5  # 落后太多时最多补跑的tick数，之后丢弃积压的时间
+
+
+def run(name, width=800, height=600, seed=None, enemy_count=1, waves=1, level_path=None,
+        bullet_cancel=False, restart_delay=None):
+    """运行模拟直到控制方发出退出命令；restart_delay 为秒数时，一局结束后自动开始新的一局"""
+    level = load_level(level_path) if level_path else None
+
+    def new_world():
+        return World(width, height, seed=seed, enemy_count=enemy_count, waves=waves, level=level,
+                     bullet_cancel=bullet_cancel)
+
+    world = new_world()
+    shared = SharedWorld.create(world, name, TICK_RATE)
+    tick_time = 1.0 / TICK_RATE
+    next_time = time.perf_counter()
+    game_over_time = None
+    try:
+        shared.publish(world)
+        while True:
+            command = shared.take_command()
+            if command == COMMAND_QUIT:
+                break
+            if command == COMMAND_RESTART or (
+                    game_over_time is not None and restart_delay is not None
+                    and time.perf_counter() - game_over_time >= restart_delay):
+                # 新的一局场地大小不变，共享内存可以继续使用
+                world = new_world()
+                game_over_time = None
+
+            now = time.perf_counter()
+            steps = 0
+            while next_time <= now and steps < MAX_CATCHUP_STEPS:
+                if not world.game_over:
+                    world.step(shared.input_mask())
+                next_time += tick_time
+                steps += 1
+            if steps == MAX_CATCHUP_STEPS and next_time <= now:
+                next_time = now
+            if steps:
+                shared.publish(world)
+            if world.game_over and game_over_time is None:
+                game_over_time = time.perf_counter()
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+    finally:
+        shared.mark_closed()
+        shared.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战模拟进程（状态发布到共享内存）")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="共享内存的名字")
+    parser.add_argument("--width", type=int, default=800, help="场地宽度")
+    parser.add_argument("--height", type=int, default=600, help="场地高度")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--enemies", type=int, default=1, help="每波敌人数量")
+    parser.add_argument("--waves", type=int, default=1, help="波次数量")
+    parser.add_argument("--level", help="关卡文件")
+    parser.add_argument("--bullet-cancel", action="store_true", help="不同阵营的子弹相撞时互相抵消")
+    parser.add_argument("--restart-delay", type=float, help="一局结束后过几秒自动开始新的一局")
+    args = parser.parse_args()
+    # 被 terminate() 结束时也要清理共享内存
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        run(args.name, args.width, args.height, args.seed, args.enemies, args.waves, args.level,
+            args.bullet_cancel, args.restart_delay)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
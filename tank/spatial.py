@@ -0,0 +1,66 @@
+class SpatialGrid:
+    """均匀网格空间索引，按格子分桶保存矩形物体，查询时只检查相关格子"""
+
+    def __init__(self, cell_size=40):
+        self.cell_size = cell_size
+        self.cells = {}  # (列, 行) -> 物体列表
+        self.item_cells = {}  # 物体 -> 所在格子列表
+        self.item_rects = {}  # 物体 -> 插入时的矩形
+
+    def __len__(self):
+        return len(self.item_rects)
+
+    def __contains__(self, item):
+        return item in self.item_rects
+
+    def cell_range(self, rect):
+        """返回矩形覆盖的格子范围 (左, 上, 右, 下)，右下为闭区间"""
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def insert(self, item, rect):
+        if item in self.item_rects:
+            self.remove(item)
+        left, top, right, bottom = self.cell_range(rect)
+        keys = []
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                self.cells.setdefault((cx, cy), []).append(item)
+                keys.append((cx, cy))
+        self.item_cells[item] = keys
+        self.item_rects[item] = rect.copy()
+
+    def remove(self, item):
+        keys = self.item_cells.pop(item, None)
+        if keys is None:
+            return
+        del self.item_rects[item]
+        for key in keys:
+            bucket = self.cells[key]
+            bucket.remove(item)
+            if not bucket:
+                del self.cells[key]
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+        self.item_rects.clear()
+
+    def query(self, rect):
+        """返回与矩形相交的所有物体"""
+        left, top, right, bottom = self.cell_range(rect)
+        cells = self.cells
+        found = []
+        seen = set()
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for item in bucket:
+                    if item not in seen:
+                        seen.add(item)
+                        if rect.colliderect(self.item_rects[item]):
+                            found.append(item)
+        return found
@@ -0,0 +1,196 @@
+"""共享内存渲染端：连接模拟进程（simulate.py）发布的世界状态并绘制
+
+默认只观战；加 --control 时同时把键盘输入写回共享内存，操作玩家坦克（main.py --sim-process 就是这样做的）。
+可以同时打开任意多个观战窗口，它们只读取共享内存，不会影响比赛。
+
+用法：python spectate.py --name tank_match [--control]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pygame
+from bullet import create_bullet_image
+from camera import Camera
+from client import read_player_input
+from rotation_cache import get_rotation_cache
+from shared_world import SharedWorld, DEFAULT_NAME, COMMAND_RESTART, COMMAND_QUIT
+from tank import create_tank_image
+from wall import TileMap, EMPTY
+from world import GREEN, RED, SIDE_PLAYER, SIDE_ENEMY, SIDE_ALLY
+
+# 把仓库根目录加入模块搜索路径，以便使用共用的文字缓存
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.text_cache import get_sysfont, render_text
+
+# 窗口的最大尺寸，场地更大时镜头跟随玩家
+MAX_VIEW_SIZE = (800, 600)
+
+WHITE = (255, 255, 255)
+WINNER_NAMES = {"player": "玩家", "enemy": "敌人"}
+
+
+class SharedRenderer:
+    """从共享内存的状态视图直接绘制画面；墙壁在本地保存一份瓦片地图，只在墙壁变化时同步"""
+
+    def __init__(self, shared, view_size):
+        self.shared = shared
+        self.walls = TileMap(shared.cols, shared.rows, shared.tile_size)
+        self.walls_version = -1
+        self.camera = None
+        if view_size != (shared.width, shared.height):
+            self.camera = Camera(view_size[0], view_size[1], shared.width, shared.height)
+        # 坦克按阵营着色，与本地游戏共用旋转缓存
+        self.tank_frames = {
+            side: get_rotation_cache(("tank", color), lambda color=color: create_tank_image(color)).frames
+            for side, color in ((SIDE_PLAYER, GREEN), (SIDE_ENEMY, RED), (SIDE_ALLY, GREEN))
+        }
+        self.bullet_frames = get_rotation_cache(("bullet",), create_bullet_image).frames
+
+    def sync_walls(self, state):
+        """只有砖块被摧毁时逐个清除瓦片，否则（新的一局）整块重新载入"""
+        if state.walls_version == self.walls_version:
+            return
+        self.walls_version = state.walls_version
+        walls = self.walls
+        types = state.wall_types
+        changed = np.flatnonzero(walls.types.ravel() != types.ravel())
+        if len(changed) and (types.ravel()[changed] == EMPTY).all() and len(changed) < 64:
+            for index in changed.tolist():
+                row, col = divmod(index, walls.cols)
+                walls.remove_tile(col, row)
+        elif len(changed):
+            walls.load_tiles(types)
+
+    def draw(self, surface, state, alpha):
+        self.sync_walls(state)
+        surface.fill((0, 0, 0))
+        tanks = state.tanks
+        bullets = state.bullets
+
+        view = surface.get_rect()
+        camera = self.camera
+        if camera is not None:
+            player = state.player()
+            if player is not None:
+                camera.center_on(player["prev_x"] + (player["x"] - player["prev_x"]) * alpha,
+                                 player["prev_y"] + (player["y"] - player["prev_y"]) * alpha)
+            view = camera.rect
+        self.walls.draw(surface, view)
+
+        # 坦克和子弹都按插值位置整批筛选出视野内的部分，再一次 blits
+        sequence = []
+        xs = tanks["prev_x"] + (tanks["x"] - tanks["prev_x"]) * alpha - view.x
+        ys = tanks["prev_y"] + (tanks["y"] - tanks["prev_y"]) * alpha - view.y
+        inside = (xs > -40) & (xs < view.width + 40) & (ys > -40) & (ys < view.height + 40)
+        for side, frame, x, y in zip(tanks["side"][inside].tolist(), tanks["frame"][inside].tolist(),
+                                     xs[inside].astype(np.int32).tolist(), ys[inside].astype(np.int32).tolist()):
+            image, (offset_x, offset_y) = self.tank_frames[side][frame]
+            sequence.append((image, (x + offset_x, y + offset_y)))
+
+        xs = bullets["prev_x"] + (bullets["x"] - bullets["prev_x"]) * alpha - view.x
+        ys = bullets["prev_y"] + (bullets["y"] - bullets["prev_y"]) * alpha - view.y
+        inside = (xs > -8) & (xs < view.width + 8) & (ys > -8) & (ys < view.height + 8)
+        frames = self.bullet_frames
+        for frame, x, y in zip(bullets["frame"][inside].tolist(), xs[inside].astype(np.int32).tolist(),
+                               ys[inside].astype(np.int32).tolist()):
+            image, (offset_x, offset_y) = frames[frame]
+            sequence.append((image, (x + offset_x, y + offset_y)))
+        surface.blits(sequence, False)
+
+
+def draw_hud(screen, state, control):
+    font = get_sysfont(None, 24)
+    player = state.player()
+    status = f"玩家血量: {player['health'] if player is not None else 0}"
+    if not control:
+        status = f"观战中  tick {state.tick}  " + status
+    screen.blit(render_text(font, status, WHITE), (10, 10))
+    enemy_text = render_text(font, f"第{state.wave}/{state.waves}波 剩余敌人: {state.enemies_left()}", WHITE)
+    screen.blit(enemy_text, (screen.get_width() - 10 - enemy_text.get_width(), 10))
+
+    if state.game_over:
+        font = get_sysfont(None, 48)
+        lines = [f"游戏结束! {WINNER_NAMES.get(state.winner, '')}胜利!"]
+        lines.append("按空格键重新开始" if control else "等待下一局")
+        for i, line in enumerate(lines):
+            text = render_text(font, line, WHITE)
+            screen.blit(text, (screen.get_width() // 2 - text.get_width() // 2,
+                               screen.get_height() // 2 - 50 + i * 70))
+
+
+def attach_when_ready(name, timeout=30.0, process=None):
+    """等待模拟进程创建共享内存并发布第一个状态；process 提前退出时报错"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            shared = SharedWorld.attach(name)
+            if shared.latest() is not None:
+                return shared
+            shared.close()
+        except (FileNotFoundError, ValueError):
+            pass
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("模拟进程已经退出")
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"等待共享内存 {name} 超时")
+        time.sleep(0.05)
+
+
+def run_viewer(screen, shared, control=False, fps=60):
+    """绘制循环：读取最新状态并绘制，读取期间状态被覆盖时重新读取。
+    control 为 True 时把键盘输入写回共享内存，关闭窗口时让模拟进程退出"""
+    clock = pygame.time.Clock()
+    renderer = SharedRenderer(shared, screen.get_size())
+    while not shared.closed():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                if control:
+                    shared.send_command(COMMAND_QUIT)
+                return
+            if control and event.type == pygame.KEYDOWN and event.key in (pygame.K_SPACE, pygame.K_r):
+                state = shared.latest()
+                if event.key == pygame.K_r or (state is not None and state.game_over):
+                    shared.send_command(COMMAND_RESTART)
+                state = None
+
+        if control:
+            shared.set_input(read_player_input())
+
+        # 最多重读几次；正常情况下模拟进程要再过一个tick才会覆盖这个槽位
+        for _ in range(3):
+            state = shared.latest()
+            if state is None:
+                break
+            alpha = min(max((time.time() - state.time) * shared.tick_rate, 0.0), 1.0)
+            renderer.draw(screen, state, alpha)
+            draw_hud(screen, state, control)
+            consistent = state.consistent()
+            state = None  # 不持有共享内存的视图，关闭时才能释放
+            if consistent:
+                break
+        pygame.display.flip()
+        clock.tick(fps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战共享内存观战")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="共享内存的名字")
+    parser.add_argument("--control", action="store_true", help="用键盘操作玩家坦克")
+    parser.add_argument("--fps", type=int, default=60, help="渲染帧率上限")
+    args = parser.parse_args()
+
+    shared = attach_when_ready(args.name)
+    pygame.init()
+    screen = pygame.display.set_mode((min(shared.width, MAX_VIEW_SIZE[0]), min(shared.height, MAX_VIEW_SIZE[1])))
+    pygame.display.set_caption("坦克大战 - 观战" if not args.control else "坦克大战")
+    try:
+        run_viewer(screen, shared, args.control, args.fps)
+    finally:
+        shared.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""敌人数量压力测试：分别用10、100、1000辆敌人跑一段时间，报告每帧耗时
+
+每帧包括一次模拟tick和一次离屏渲染。玩家由AI控制并且不会被打死，保证测试跑满指定帧数。
+加 --ai-workers 时敌人AI交给工作进程计算（结果在下一个tick应用），可以对比主循环里的耗时。
+用法：python stress.py --ticks 300 [--ai-workers 4]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+from ai_scheduler import AIScheduler
+from camera import Camera
+from renderer import draw_world
+from world import World
+
+ENEMY_COUNTS = (10, 100, 1000)
+
+# 离屏渲染的画面大小（与 main.py 的窗口相同），场地更大时镜头跟随玩家
+VIEW_SIZE = (800, 600)
+
+
+def render_offscreen(surface, world, camera=None):
+    """与 main.py 的整屏渲染相同的绘制步骤，只是画到离屏图像上"""
+    if camera is not None:
+        camera.follow(world.player)
+    draw_world(surface, world, camera=camera)
+
+
+def run_scenario(enemy_count, ticks, width=800, height=600, seed=0, ai_scheduler=None, bullet_cancel=False):
+    """返回 (模拟耗时列表, 渲染耗时列表)，单位毫秒"""
+    world = World(width, height, seed=seed, enemy_count=enemy_count, bullet_cancel=bullet_cancel)
+    world.player.health = 10 ** 9
+    if ai_scheduler is not None:
+        ai_scheduler.reset()
+        world.ai_scheduler = ai_scheduler
+    view_width, view_height = min(width, VIEW_SIZE[0]), min(height, VIEW_SIZE[1])
+    surface = pygame.Surface((view_width, view_height))
+    camera = None
+    if (view_width, view_height) != (width, height):
+        camera = Camera(view_width, view_height, width, height)
+
+    step_times = []
+    render_times = []
+    for _ in range(ticks):
+        if world.game_over:
+            break
+        if ai_scheduler is not None:
+            ai_scheduler.start_frame()
+        start = time.perf_counter()
+        world.step()
+        middle = time.perf_counter()
+        render_offscreen(surface, world, camera)
+        end = time.perf_counter()
+        step_times.append((middle - start) * 1000)
+        render_times.append((end - middle) * 1000)
+    return step_times, render_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坦克大战敌人数量压力测试")
+    parser.add_argument("--ticks", type=int, default=300, help="每个场景运行的帧数")
+    parser.add_argument("--width", type=int, default=800, help="场地宽度")
+    parser.add_argument("--height", type=int, default=600, help="场地高度")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--enemies", type=int, nargs="*", default=list(ENEMY_COUNTS), help="要测试的敌人数量")
+    parser.add_argument("--bullet-cancel", action="store_true", help="不同阵营的子弹相撞时互相抵消")
+    parser.add_argument("--ai-workers", type=int, default=0, help="敌人AI使用的工作进程数（0为在主循环中计算）")
+    args = parser.parse_args()
+
+    ai_scheduler = AIScheduler(args.ai_workers) if args.ai_workers else None
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print(f"{'敌人数':>6} {'帧数':>6} {'模拟ms':>8} {'渲染ms':>8} {'平均帧ms':>9} {'p95帧ms':>8} {'FPS':>7}")
+    for enemy_count in args.enemies:
+        if ai_scheduler is not None:
+            ai_scheduler.stats.clear()
+        step_times, render_times = run_scenario(enemy_count, args.ticks, args.width, args.height, args.seed,
+                                                ai_scheduler, args.bullet_cancel)
+        frame_times = np.add(step_times, render_times)
+        mean = frame_times.mean()
+        print(f"{enemy_count:>6} {len(frame_times):>6} {np.mean(step_times):>8.2f} {np.mean(render_times):>8.2f} "
+              f"{mean:>9.2f} {np.percentile(frame_times, 95):>8.2f} {1000 / mean:>7.1f}")
+        if ai_scheduler is not None:
+            stats = ai_scheduler.stats
+            print(f"{'':>6} AI决策: 应用 {stats['applied']}  兜底 {stats['fallback']}  "
+                  f"迟到 {stats['late']}  跳过提交 {stats['skipped']}")
+    if ai_scheduler is not None:
+        ai_scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,44 @@
 import pygame
 import math
+import itertools
+from rotation_cache import get_rotation_cache, get_filled_mask
+
+
+def create_tank_image(color):
+    """绘制未旋转的坦克原始图像"""
+    image = pygame.Surface((40, 30), pygame.SRCALPHA)
+    pygame.draw.rect(image, color, (0, 0, 40, 30))
+    pygame.draw.rect(image, (50, 50, 50), (10, 0, 20, 10))  # 炮塔
+    return image
+
+
+# 坦克编号生成器，子弹用编号记录发射者
+_tank_ids = itertools.count()
+
 
 class Tank(pygame.sprite.Sprite):
-    def __init__(self, x, y, color, control_type="player", speed=3):
+    def __init__(self, x, y, color, control_type="player", speed=3, bounds=(800, 600), tank_id=None,
+                 team=None):
         super().__init__()
         # 坦克基础属性
+        self.tank_id = next(_tank_ids) if tank_id is None else tank_id
+        # 阵营：默认玩家为0，敌人为1，同阵营的子弹互不伤害
+        self.team = (0 if control_type == "player" else 1) if team is None else team
+        self.bounds = bounds  # 场地大小，坦克不能开出这个范围
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y  # 上一个tick的位置，渲染时在两者之间插值
         self.color = color
         self.speed = speed
         self.angle = 0
         self.control_type = control_type
+        self.last_dx, self.last_dy = 0, 0  # 最近一次移动的方向，撞墙时用来后退
         
-        # 创建坦克表面
-        self.original_image = pygame.Surface((40, 30), pygame.SRCALPHA)
-        pygame.draw.rect(self.original_image, color, (0, 0, 40, 30))
-        pygame.draw.rect(self.original_image, (50, 50, 50), (10, 0, 20, 10))  # 炮塔
-        self.image = self.original_image.copy()
-        self.rect = self.image.get_rect(center=(x, y))
+        # 同色坦克共享一组预旋转图像
+        self.rotations = get_rotation_cache(("tank", tuple(color)), lambda: create_tank_image(color))
+        self.original_image = self.rotations.image
+        self.frame_index = -1
+        self.update_image()
         
         # 坦克状态
         self.health = 100
@@ -35,11 +56,12 @@ class Tank(pygame.sprite.Sprite):
             self.angle = math.degrees(math.atan2(-dy, dx))
         
         # 更新坦克位置
+        self.last_dx, self.last_dy = dx, dy
         self.x += dx * self.speed
         self.y += dy * self.speed
         
         # 边界检查
-        screen_width, screen_height = pygame.display.get_surface().get_size()
+        screen_width, screen_height = self.bounds
         
         if self.x < 20:
             self.x = 20
@@ -51,11 +73,38 @@ class Tank(pygame.sprite.Sprite):
         elif self.y > screen_height - 15:
             self.y = screen_height - 15
         
-        # 旋转坦克
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect(center=(self.x, self.y))
+        # 旋转坦克（只在量化角度变化时换图）
+        self.update_image()
     
-    def shoot(self):
+    def save_position(self):
+        """在每个tick开始时记录位置，供插值渲染使用"""
+        self.prev_x, self.prev_y = self.x, self.y
+    
+    def draw_position(self, alpha=1.0):
+        """返回在上一个tick和当前tick之间插值后的图像左上角"""
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return int(x) + self.image_offset[0], int(y) + self.image_offset[1]
+    
+    def update_image(self):
+        frame_index = self.rotations.index(self.angle)
+        if frame_index != self.frame_index:
+            self.frame_index = frame_index
+            self.image, self.image_offset = self.rotations.frames[frame_index]
+            self.mask = self.rotations.masks[frame_index]
+            self.rect = self.image.get_rect()
+        self.rect.topleft = (int(self.x) + self.image_offset[0], int(self.y) + self.image_offset[1])
+    
+    def overlaps_rect(self, rect):
+        """像素级检测矩形是否碰到坦克的实际形状（先做便宜的矩形检测）"""
+        clip = self.rect.clip(rect)
+        if clip.width == 0 or clip.height == 0:
+            return False
+        offset = (clip.x - self.rect.x, clip.y - self.rect.y)
+        return self.mask.overlap(get_filled_mask(clip.size), offset) is not None
+    
+    def shoot(self, bullets):
+        """向子弹场发射一颗子弹，冷却中返回 False"""
         if self.reload_time <= 0:
             self.reload_time = self.reload_max
             # 计算子弹的起始位置（炮管前端）
@@ -63,9 +112,9 @@ class Tank(pygame.sprite.Sprite):
             bullet_x = self.x + math.cos(rad_angle) * 25
             bullet_y = self.y - math.sin(rad_angle) * 25
             
-            from bullet import Bullet
-            return Bullet(bullet_x, bullet_y, self.angle, self)
-        return None
+            bullets.spawn(bullet_x, bullet_y, self.angle, self.tank_id, team=self.team)
+            return True
+        return False
     
     def take_damage(self, damage=10):
         self.health -= damage
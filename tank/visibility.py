@@ -0,0 +1,164 @@
+"""瓦片网格上的视线和战争迷雾
+
+每个格子的视野用对称阴影投射（symmetric shadowcasting）计算：从格子中心出发，
+逐行扫描四个象限，被砖墙或钢墙挡住的部分整段跳过（水不挡视线），视野半径内
+每个格子只访问一次。对称的意思是 A 能看到 B 当且仅当 B 能看到 A，所以问
+"这些坦克能不能看到目标"只需要计算目标所在格子的一个视野。
+
+视野按格子缓存：坦克跨过格子边界时才换一个视野（回到去过的格子直接命中缓存），
+砖墙被摧毁时只丢弃窗口包含这个瓦片的视野。查询就是在视野的布尔数组里取值。
+"""
+from collections import OrderedDict
+import numpy as np
+from wall import BRICK, STEEL
+
+# 视野半径（瓦片）
+SIGHT_RADIUS = 24
+
+# 同时缓存的视野数量（每个格子一个）
+MAX_CACHED_VIEWS = 64
+
+# 四个象限：(深度对应的列偏移, 横向对应的列偏移, 深度对应的行偏移, 横向对应的行偏移)
+QUADRANTS = ((0, 1, -1, 0), (0, 1, 1, 0), (1, 0, 0, 1), (-1, 0, 0, 1))
+
+
+def shadowcast(opaque, cols, rows, origin_col, origin_row, radius):
+    """从格子 (origin_col, origin_row) 出发的对称阴影投射，opaque 是按行展开的挡视线标记。
+    返回 (radius*2+1) 见方的可见标记（按行展开的 bytearray），窗口中心就是出发的格子。
+    斜率都是 (2*列-1)/(2*深度) 形式的分数，用整数分子分母表示，避免浮点误差破坏对称性"""
+    size = radius * 2 + 1
+    seen = bytearray(size * size)
+    seen[radius * size + radius] = 1
+    limit = radius * radius + radius  # 圆形视野
+    for depth_x, side_x, depth_y, side_y in QUADRANTS:
+        # (深度, 起始斜率分子, 分母, 结束斜率分子, 分母)
+        stack = [(1, -1, 1, 1, 1)]
+        while stack:
+            depth, start_num, start_den, end_num, end_den = stack.pop()
+            if depth > radius:
+                continue
+            # 起始列向上取整、结束列向下取整（0.5 的情况分别偏向内侧）
+            min_side = (2 * depth * start_num + start_den) // (2 * start_den)
+            max_side = -((end_den - 2 * depth * end_num) // (2 * end_den))
+            previous = None  # 上一个格子：None 没有，True 墙，False 空地
+            for side in range(min_side, max_side + 1):
+                dx = depth * depth_x + side * side_x
+                dy = depth * depth_y + side * side_y
+                col = origin_col + dx
+                row = origin_row + dy
+                wall = not (0 <= col < cols and 0 <= row < rows) or opaque[row * cols + col] == 1
+                # 墙总是可见；空地只有中心落在扫描范围内才可见（保证对称）
+                if (wall or (side * start_den >= depth * start_num and side * end_den <= depth * end_num)) \
+                        and dx * dx + dy * dy <= limit:
+                    seen[(dy + radius) * size + dx + radius] = 1
+                if previous is True and not wall:
+                    start_num, start_den = 2 * side - 1, 2 * depth
+                elif previous is False and wall:
+                    stack.append((depth + 1, start_num, start_den, 2 * side - 1, 2 * depth))
+                previous = wall
+            if previous is False:
+                stack.append((depth + 1, start_num, start_den, end_num, end_den))
+    return seen
+
+
+class FieldOfView:
+    """某个格子的视野：以它为中心的方形窗口里每个格子是否可见"""
+
+    def __init__(self, opaque, cols, rows, origin, radius):
+        self.origin = origin
+        self.radius = radius
+        self.left = origin[0] - radius  # 窗口左上角在整个网格中的格子坐标
+        self.top = origin[1] - radius
+        size = radius * 2 + 1
+        seen = shadowcast(opaque, cols, rows, origin[0], origin[1], radius)
+        self.mask = np.frombuffer(bytes(seen), dtype=bool).reshape(size, size)
+
+    def covers(self, col, row):
+        """窗口是否包含这个格子"""
+        size = self.radius * 2 + 1
+        return 0 <= col - self.left < size and 0 <= row - self.top < size
+
+    def sees(self, col, row):
+        return self.covers(col, row) and bool(self.mask[row - self.top, col - self.left])
+
+    def sees_many(self, cols, rows):
+        """批量查询格子是否可见"""
+        size = self.radius * 2 + 1
+        local_cols = cols - self.left
+        local_rows = rows - self.top
+        inside = (local_cols >= 0) & (local_cols < size) & (local_rows >= 0) & (local_rows < size)
+        visible = np.zeros(len(cols), dtype=bool)
+        visible[inside] = self.mask[local_rows[inside], local_cols[inside]]
+        return visible
+
+
+class Visibility:
+    """整个地图的视线查询，视野按格子缓存，随砖墙被摧毁局部失效"""
+
+    def __init__(self, walls, radius=SIGHT_RADIUS):
+        self.walls = walls
+        self.radius = radius
+        self.tile_size = walls.tile_size
+        self.cols = walls.cols
+        self.rows = walls.rows
+        self.views = OrderedDict()  # 格子 -> FieldOfView
+        self.rebuild()
+
+    def rebuild(self):
+        """根据全部瓦片重建挡视线的标记，并清空缓存的视野"""
+        types = self.walls.types
+        self.opaque = bytearray(((types == BRICK) | (types == STEEL)).astype(np.uint8).tobytes())
+        self.views.clear()
+
+    def wall_removed(self, rect):
+        """砖墙瓦片被摧毁后更新挡视线的标记，只丢弃窗口包含它的视野"""
+        size = self.tile_size
+        col, row = rect.x // size, rect.y // size
+        if not self.opaque[row * self.cols + col]:
+            return
+        self.opaque[row * self.cols + col] = 0
+        for cell in [cell for cell, view in self.views.items() if view.covers(col, row)]:
+            del self.views[cell]
+
+    def cell_of(self, x, y):
+        return int(x // self.tile_size), int(y // self.tile_size)
+
+    def view_at(self, cell):
+        """获取某个格子的视野（带缓存）"""
+        view = self.views.get(cell)
+        if view is None:
+            view = FieldOfView(self.opaque, self.cols, self.rows, cell, self.radius)
+            self.views[cell] = view
+            if len(self.views) > MAX_CACHED_VIEWS:
+                self.views.popitem(last=False)
+        else:
+            self.views.move_to_end(cell)
+        return view
+
+    def view_of(self, tank):
+        """坦克当前所在格子的视野；坦克跨过格子边界前一直命中缓存"""
+        return self.view_at(self.cell_of(tank.x, tank.y))
+
+    def sees(self, tank, x, y):
+        """坦克和 (x, y) 之间是否有视线（视线是对称的）"""
+        return self.view_of(tank).sees(*self.cell_of(x, y))
+
+    def sees_many(self, tank, xs, ys):
+        """批量查询坦克和每个点之间是否有视线，只用到坦克所在格子的一个视野"""
+        cols = (xs // self.tile_size).astype(np.intp)
+        rows = (ys // self.tile_size).astype(np.intp)
+        return self.view_of(tank).sees_many(cols, rows)
+
+    def visible_tiles(self, tanks, left, top, right, bottom):
+        """一组坦克（例如玩家一方）在瓦片区域 [left, right) x [top, bottom) 内能看到的格子（并集）"""
+        visible = np.zeros((bottom - top, right - left), dtype=bool)
+        for tank in tanks:
+            view = self.view_of(tank)
+            size = view.radius * 2 + 1
+            # 视野窗口和区域的交集
+            l, t = max(left, view.left), max(top, view.top)
+            r, b = min(right, view.left + size), min(bottom, view.top + size)
+            if l < r and t < b:
+                visible[t - top:b - top, l - left:r - left] |= view.mask[t - view.top:b - view.top,
+                                                                         l - view.left:r - view.left]
+        return visible
@@ -1,50 +1,285 @@
+from collections import OrderedDict
+import numpy as np
 import pygame
+from spatial import SpatialGrid
 
-class Wall(pygame.sprite.Sprite):
-    def __init__(self, x, y, width, height, wall_type="brick"):
-        super().__init__()
-        self.rect = pygame.Rect(x, y, width, height)
-        
-        # 不同类型的墙壁
-        self.wall_type = wall_type
-        
-        # 创建墙壁图像
-        self.image = pygame.Surface((width, height))
-        
-        if wall_type == "brick":
-            # 砖墙 - 可以被击毁
-            self.image.fill((165, 42, 42))  # 砖红色
-            self.health = 30
-            self.destructible = True
-        elif wall_type == "steel":
-            # 钢墙 - 不可摧毁
-            self.image.fill((128, 128, 128))  # 灰色
-            self.health = 100
-            self.destructible = False
-        elif wall_type == "water":
-            # 水 - 无法通过但可以射击
-            self.image.fill((0, 0, 255))  # 蓝色
-            self.health = float('inf')
-            self.destructible = False
+# 每个瓦片的像素大小
+TILE_SIZE = 20
+
+# 瓦片类型
+EMPTY = 0
+BRICK = 1  # 砖墙 - 可以被击毁
+STEEL = 2  # 钢墙 - 不可摧毁
+WATER = 3  # 水 - 无法通过但可以射击
+
+WALL_TYPES = {"brick": BRICK, "steel": STEEL, "water": WATER}
+
+# 砖墙每个瓦片的血量
+BRICK_HEALTH = 30
+
+# 渲染时把地图切成 CHUNK_TILES x CHUNK_TILES 个瓦片的块，靠近视野时才画出来
+CHUNK_TILES = 16
+# 最多缓存的图层块数量，离开视野最久的块先被丢弃
+MAX_CACHED_CHUNKS = 48
+
+
+def create_tile_image(tile_type, tile_size=TILE_SIZE):
+    """绘制一种瓦片的图像"""
+    image = pygame.Surface((tile_size, tile_size))
+    if tile_type == BRICK:
+        image.fill((165, 42, 42))  # 砖红色
+        # 添加砖块纹理
+        for i in range(0, tile_size, 10):
+            for j in range(0, tile_size, 5):
+                if (i // 10 + j // 5) % 2 == 0:
+                    pygame.draw.rect(image, (190, 60, 60), (i, j, 10, 5))
+    elif tile_type == STEEL:
+        image.fill((128, 128, 128))  # 灰色
+    elif tile_type == WATER:
+        image.fill((0, 0, 255))  # 蓝色
+    return image
+
+
+def find_runs(row):
+    """返回一行布尔值中连续 True 段的 (起点, 终点) 列表，终点为开区间"""
+    padded = np.zeros(len(row) + 2, dtype=np.int8)
+    padded[1:-1] = row
+    edges = np.diff(padded)
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+class TileMap:
+    """用二维数组保存墙壁：每个瓦片的类型和血量。
+    坦克碰撞使用把连续实心瓦片合并后的矩形，子弹直接按坐标查瓦片，渲染使用缓存的瓦片图层"""
+
+    def __init__(self, cols, rows, tile_size=TILE_SIZE):
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        self.types = np.zeros((rows, cols), dtype=np.uint8)
+        self.health = np.zeros((rows, cols), dtype=np.int16)
+
+        # 合并后的碰撞矩形：编号 -> 像素矩形，另有空间网格索引和瓦片到矩形编号的映射
+        self.colliders = {}
+        self.collider_grid = SpatialGrid(tile_size * 4)
+        self.collider_of = np.full((rows, cols), -1, dtype=np.int32)
+        self.next_collider_id = 0
+
+        self.version = 0  # 瓦片变化时加一
+        self.dirty_rects = []  # 图层上变化过的区域，渲染器取走后清空
+        self.tile_images = {}
+        self.cached_layer = None  # 整张地图的图层（脏矩形渲染用，只适合不比屏幕大的地图）
+        self.chunks = OrderedDict()  # (块列, 块行) -> 画好的图层块
+        self.chunk_size = tile_size * CHUNK_TILES
+
+    def fill(self, col, row, width, height, tile_type):
+        """把一块瓦片区域设为某种墙壁（超出地图的部分忽略）；之后需要调用 build_colliders"""
+        left, top = max(0, col), max(0, row)
+        right, bottom = min(self.cols, col + width), min(self.rows, row + height)
+        if left >= right or top >= bottom:
+            return
+        self.types[top:bottom, left:right] = tile_type
+        self.health[top:bottom, left:right] = BRICK_HEALTH if tile_type == BRICK else 0
+
+    def fill_rect(self, rect, tile_type):
+        """按像素矩形填充它覆盖的瓦片"""
+        size = self.tile_size
+        left, top = rect.left // size, rect.top // size
+        right, bottom = -(-rect.right // size), -(-rect.bottom // size)
+        self.fill(left, top, right - left, bottom - top, tile_type)
+
+    def build_colliders(self, colliders=None):
+        """重建全部碰撞矩形；colliders 为预先算好的 (列, 行, 宽, 高) 数组时直接使用"""
+        self.colliders.clear()
+        self.collider_grid.clear()
+        self.collider_of[:] = -1
+        if colliders is None:
+            self.merge_region(0, 0, self.cols, self.rows)
+        else:
+            for col, row, width, height in colliders.tolist():
+                self.add_collider(col, row, width, height)
+        self.version += 1
+        self.chunks.clear()
+        if self.cached_layer is not None:
+            # 已经有图层时在原图层上重画，渲染器持有的图层引用仍然有效
+            self.paint_layer(self.cached_layer)
+            self.dirty_rects = [self.cached_layer.get_rect()]
+
+    def load_tiles(self, types, colliders=None):
+        """整块载入瓦片类型数组（例如从关卡文件映射来的），血量按类型向量化生成"""
+        self.types[:] = types
+        self.health[:] = np.where(self.types == BRICK, BRICK_HEALTH, 0)
+        self.build_colliders(colliders)
+
+    def restore(self, types, health):
+        """恢复保存的瓦片类型和血量；布局没变时只复制血量，变了才重建碰撞矩形和图层。
+        返回布局是否改变"""
+        if np.array_equal(types, self.types):
+            np.copyto(self.health, health)
+            return False
+        np.copyto(self.types, types)
+        np.copyto(self.health, health)
+        self.build_colliders()
+        return True
+
+    def collider_array(self):
+        """以 (列, 行, 宽, 高) 数组的形式导出当前的碰撞矩形"""
+        size = self.tile_size
+        return np.array([(rect.x // size, rect.y // size, rect.w // size, rect.h // size)
+                         for rect in self.colliders.values()], dtype=np.uint16).reshape(-1, 4)
+
+    def merge_region(self, left, top, right, bottom):
+        """把区域内还没有碰撞矩形的实心瓦片合并成矩形：
+        先找出每行连续的实心段，上下相邻且起止相同的段合并为一个矩形"""
+        solid = (self.types[top:bottom, left:right] != EMPTY) & (self.collider_of[top:bottom, left:right] < 0)
+        open_runs = {}  # (起点, 终点) -> [列, 行, 宽, 高]
+        for offset, row in enumerate(solid):
+            runs = {}
+            for start, end in find_runs(row):
+                rect = open_runs.pop((start, end), None)
+                if rect is None:
+                    rect = [left + start, top + offset, end - start, 0]
+                rect[3] += 1
+                runs[(start, end)] = rect
+            for rect in open_runs.values():
+                self.add_collider(*rect)
+            open_runs = runs
+        for rect in open_runs.values():
+            self.add_collider(*rect)
+
+    def add_collider(self, col, row, width, height):
+        size = self.tile_size
+        collider_id = self.next_collider_id
+        self.next_collider_id += 1
+        rect = pygame.Rect(col * size, row * size, width * size, height * size)
+        self.colliders[collider_id] = rect
+        self.collider_grid.insert(collider_id, rect)
+        self.collider_of[row:row + height, col:col + width] = collider_id
+
+    def remove_tile(self, col, row):
+        """清除一个瓦片：只拆开包含它的碰撞矩形，并把剩余瓦片重新合并"""
+        self.types[row, col] = EMPTY
+        self.health[row, col] = 0
+        collider_id = int(self.collider_of[row, col])
+        if collider_id >= 0:
+            rect = self.colliders.pop(collider_id)
+            self.collider_grid.remove(collider_id)
+            size = self.tile_size
+            left, top = rect.left // size, rect.top // size
+            right, bottom = rect.right // size, rect.bottom // size
+            self.collider_of[top:bottom, left:right] = -1
+            self.merge_region(left, top, right, bottom)
+
+        tile_rect = pygame.Rect(col * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+        if self.cached_layer is not None:
+            self.cached_layer.fill((0, 0, 0), tile_rect)
+        chunk = self.chunks.get((col // CHUNK_TILES, row // CHUNK_TILES))
+        if chunk is not None:
+            chunk.fill((0, 0, 0), tile_rect.move(-(col // CHUNK_TILES) * self.chunk_size,
+                                                 -(row // CHUNK_TILES) * self.chunk_size))
+        self.dirty_rects.append(tile_rect)
+        self.version += 1
+        return tile_rect
+
+    def rects(self):
+        """所有碰撞矩形"""
+        return list(self.colliders.values())
+
+    def collide(self, rect):
+        """返回与矩形相交的碰撞矩形，只检查矩形所在格子"""
+        colliders = self.colliders
+        return [colliders[collider_id] for collider_id in self.collider_grid.query(rect)]
+
+    def solid_at(self, xs, ys):
+        """批量查询点所在瓦片，返回 (是否为墙, 列数组, 行数组)"""
+        cols = np.floor_divide(xs, self.tile_size).astype(np.intp)
+        rows = np.floor_divide(ys, self.tile_size).astype(np.intp)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        hit = np.zeros(len(cols), dtype=bool)
+        hit[inside] = self.types[rows[inside], cols[inside]] != EMPTY
+        return hit, cols, rows
+
+    def damage_tiles(self, cols, rows, damage):
+        """对一批瓦片造成伤害（只有砖墙会掉血），返回被摧毁瓦片的像素矩形列表"""
+        brick = self.types[rows, cols] == BRICK
+        if not brick.any():
+            return []
+        cols, rows = cols[brick], rows[brick]
+        np.subtract.at(self.health, (rows, cols), np.asarray(damage)[brick].astype(np.int16))
+        destroyed = self.health[rows, cols] <= 0
+        tiles = set(zip(cols[destroyed].tolist(), rows[destroyed].tolist()))
+        return [self.remove_tile(col, row) for col, row in sorted(tiles)]
+
+    def take_dirty_rects(self):
+        rects = self.dirty_rects
+        self.dirty_rects = []
+        return rects
+
+    def paint_tiles(self, surface, left, top, right, bottom):
+        """把一块瓦片区域画到图像上，区域左上角的瓦片画在图像的 (0, 0)"""
+        size = self.tile_size
+        surface.fill((0, 0, 0))
+        region = self.types[top:bottom, left:right]
+        for tile_type in (BRICK, STEEL, WATER):
+            if tile_type not in self.tile_images:
+                self.tile_images[tile_type] = create_tile_image(tile_type, size)
+            image = self.tile_images[tile_type]
+            rows, cols = np.nonzero(region == tile_type)
+            surface.blits([(image, (col * size, row * size)) for row, col in zip(rows.tolist(), cols.tolist())],
+                          False)
+
+    def paint_layer(self, layer):
+        """把所有瓦片画到图层上"""
+        self.paint_tiles(layer, 0, 0, self.cols, self.rows)
+
+    def layer(self):
+        """返回画好所有墙壁的图层（第一次调用时生成，之后只局部更新）"""
+        if self.cached_layer is None:
+            size = self.tile_size
+            layer = pygame.Surface((self.cols * size, self.rows * size))
+            self.paint_layer(layer)
+            self.cached_layer = layer
+            self.dirty_rects = []
+        return self.cached_layer
+
+    def chunk(self, chunk_col, chunk_row):
+        """返回一个图层块（没有缓存时现画），并把它标记为最近使用"""
+        key = (chunk_col, chunk_row)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = pygame.Surface((self.chunk_size, self.chunk_size))
+            left, top = chunk_col * CHUNK_TILES, chunk_row * CHUNK_TILES
+            self.paint_tiles(surface, left, top, left + CHUNK_TILES, top + CHUNK_TILES)
+            self.chunks[key] = surface
+            if len(self.chunks) > MAX_CACHED_CHUNKS:
+                self.chunks.popitem(last=False)
         else:
-            # 默认墙壁
-            self.image.fill((0, 0, 0))
-            self.health = 10
-            self.destructible = True
-        
-        # 为墙壁添加纹理
-        if wall_type == "brick":
-            # 添加砖块纹理
-            for i in range(0, width, 10):
-                for j in range(0, height, 5):
-                    if (i // 10 + j // 5) % 2 == 0:
-                        pygame.draw.rect(self.image, (190, 60, 60), (i, j, 10, 5))
-    
-    def hit_by_bullet(self, bullet):
-        """当墙壁被子弹击中时调用"""
-        if self.destructible:
-            self.health -= bullet.damage
-            if self.health <= 0:
-                self.kill()
-                return True
-        return False 
\ No newline at end of file
+            self.chunks.move_to_end(key)
+        return surface
+
+    def chunk_range(self, view):
+        """返回与视野矩形相交的块范围 (左, 上, 右, 下)，右下为开区间，已限制在地图内"""
+        size = self.chunk_size
+        return (max(0, view.left // size), max(0, view.top // size),
+                min(-(-self.cols // CHUNK_TILES), -(-view.right // size)),
+                min(-(-self.rows // CHUNK_TILES), -(-view.bottom // size)))
+
+    def draw(self, surface, view=None, prefetch=1):
+        """只绘制与视野（世界坐标的矩形，默认为从原点开始的整个 surface）相交的图层块。
+        prefetch 为这一帧最多提前画好的视野外一圈的块数，镜头移动过去时不用再现画"""
+        if view is None:
+            view = surface.get_rect()
+        size = self.chunk_size
+        left, top, right, bottom = self.chunk_range(view)
+        surface.blits([(self.chunk(chunk_col, chunk_row), (chunk_col * size - view.x, chunk_row * size - view.y))
+                       for chunk_row in range(top, bottom) for chunk_col in range(left, right)], False)
+
+        if prefetch:
+            left, top, right, bottom = self.chunk_range(view.inflate(size * 2, size * 2))
+            for chunk_row in range(top, bottom):
+                for chunk_col in range(left, right):
+                    if (chunk_col, chunk_row) not in self.chunks:
+                        self.chunk(chunk_col, chunk_row)
+                        prefetch -= 1
+                        if prefetch == 0:
+                            return
@@ -0,0 +1,489 @@
+import random
+import zlib
+import numpy as np
+import pygame
+from tank import Tank
+from bullet import BulletField, BULLET_RADIUS
+from broadphase import Broadphase
+from wall import TileMap, TILE_SIZE, WALL_TYPES, STEEL
+from navigation import NavGrid
+from visibility import Visibility
+from level import TEAM_PLAYER, TEAM_ENEMY
+
+# 定义颜色
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+
+# 输入位掩码（一个tick内某辆坦克的操作）
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_FIRE = 16
+
+# 看到目标时，距离超过这个值才转向目标射击（炮口在坦克中心前方25像素，更近时后退拉开距离）
+AIM_MIN_DISTANCE = 40
+# 与看到的目标保持的距离：进入这个距离后停下射击，不再沿流场靠近
+STANDOFF_DISTANCE = 150
+# 瞄准的随机误差（±度）：不会每发必中，对射的两辆坦克也不会总在同一个tick同归于尽
+AIM_SPREAD = 8
+
+
+# 快照中坦克所属的一方
+SIDE_PLAYER = 0
+SIDE_ENEMY = 1
+SIDE_ALLY = 2
+
+# 快照中每辆坦克的状态
+TANK_STATE_DTYPE = np.dtype([("id", "<i4"), ("side", "u1"), ("x", "<f8"), ("y", "<f8"),
+                             ("prev_x", "<f8"), ("prev_y", "<f8"), ("angle", "<f8"),
+                             ("last_dx", "<f8"), ("last_dy", "<f8"), ("health", "<i8"),
+                             ("reload_time", "<i4")])
+
+
+class WorldSnapshot:
+    """某一时刻完整的世界状态：都是数组或简单值，可以随意复制和保存"""
+
+    def __init__(self, tick, game_over, winner, wave, next_tank_id, tanks, bullets, wall_types,
+                 wall_health, rng_state, np_rng_state):
+        self.tick = tick
+        self.game_over = game_over
+        self.winner = winner
+        self.wave = wave
+        self.next_tank_id = next_tank_id
+        self.tanks = tanks  # TANK_STATE_DTYPE 记录数组
+        self.bullets = bullets  # BulletField.snapshot() 的结果
+        self.wall_types = wall_types
+        self.wall_health = wall_health
+        self.rng_state = rng_state
+        self.np_rng_state = np_rng_state
+
+    def checksum(self):
+        """状态的校验和，用来比较两边的模拟是否一致"""
+        arrays, _, _, _ = self.bullets
+        alive = arrays["alive"]
+        crc = zlib.crc32(self.tanks.tobytes())
+        for name in ("x", "y", "dx", "dy", "lifetime", "team"):
+            crc = zlib.crc32(arrays[name][alive].tobytes(), crc)
+        crc = zlib.crc32(self.wall_health.tobytes(), crc)
+        return zlib.crc32(f"{self.tick} {self.wave} {self.winner}".encode(), crc)
+
+
+def input_direction(input_mask):
+    """把输入位掩码转换为移动方向 (dx, dy)"""
+    dx, dy = 0, 0
+    if input_mask & INPUT_UP:
+        dy = -1
+    if input_mask & INPUT_DOWN:
+        dy = 1
+    if input_mask & INPUT_LEFT:
+        dx = -1
+    if input_mask & INPUT_RIGHT:
+        dx = 1
+    return dx, dy
+
+
+class World:
+    """不依赖显示窗口的坦克大战模拟：坦克、子弹、墙壁、敌人AI和碰撞处理"""
+
+    def __init__(self, width=800, height=600, seed=None, enemy_count=1, waves=1, level=None, bullet_cancel=False):
+        # 使用关卡文件时，场地大小由关卡决定
+        if level is not None:
+            width, height = level.width, level.height
+        self.level = level
+        self.width = width
+        self.height = height
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        # 所有随机数都来自这个生成器，同一个种子得到同一局比赛
+        self.rng = random.Random(seed)
+        # 批量AI决策使用的NumPy随机数生成器（同样由种子决定）
+        self.np_rng = np.random.default_rng(seed)
+
+        self.tanks = pygame.sprite.Group()
+        self.tank_registry = {}  # 坦克编号 -> 坦克（包括已被摧毁的），恢复快照时复用
+        if level is not None:
+            self.walls = level.build_tilemap()
+        else:
+            self.walls = TileMap(-(-width // TILE_SIZE), -(-height // TILE_SIZE))
+        self.bullets = BulletField((width, height))
+        # 子弹互相抵消模式：不同阵营的子弹相撞时一起消失
+        self.bullet_cancel = bullet_cancel
+
+        # 波次模式：每波 enemy_count 辆敌人，全部消灭后出现下一波
+        self.enemy_count = enemy_count
+        self.waves = waves
+        self.wave = 1
+        self.next_tank_id = 0
+
+        # 创建玩家坦克和第一辆敌人坦克（其余敌人在墙壁生成后放到空地上）
+        player_spawns = level.spawn_points(TEAM_PLAYER) if level is not None else []
+        self.enemy_spawns = level.spawn_points(TEAM_ENEMY) if level is not None else []
+        player_x, player_y = player_spawns[0] if player_spawns else (width // 4, height // 2)
+        enemy_x, enemy_y = self.enemy_spawns[0] if self.enemy_spawns else (width * 3 // 4, height // 2)
+        self.player = self.add_tank(player_x, player_y, GREEN, "player")
+        self.enemy = self.add_tank(enemy_x, enemy_y, RED, "enemy")
+        self.enemies = pygame.sprite.Group(self.enemy)
+        # 联机时加入的玩家一方坦克（队友）
+        self.allies = pygame.sprite.Group()
+
+        # 关卡文件已经带有墙壁和碰撞数据，否则随机生成
+        if level is None:
+            self.create_walls()
+
+        # 由墙壁布局生成的导航网格，所有AI坦克共用寻路结果
+        self.nav = NavGrid(width, height, self.walls)
+        # 视线和战争迷雾：每个格子的视野按需计算并缓存
+        self.visibility = Visibility(self.walls)
+        self.spawn_enemies(enemy_count - 1)
+
+        self.tick = 0
+        self.game_over = False
+        self.winner = None  # "player" 或 "enemy"
+        # 可选的AI调度器（ai_scheduler.AIScheduler）：设置后敌人AI交给工作池计算
+        self.ai_scheduler = None
+
+    def add_tank(self, x, y, color, control_type):
+        tank = Tank(x, y, color, control_type=control_type, bounds=(self.width, self.height),
+                    tank_id=self.next_tank_id)
+        self.next_tank_id += 1
+        self.tanks.add(tank)
+        self.tank_registry[tank.tank_id] = tank
+        return tank
+
+    def spawn_enemies(self, count):
+        """放置敌人坦克：先用关卡的敌人出生点，不够时在远离玩家的空地上随机放置"""
+        if count <= 0:
+            return
+        spawns = self.enemy_spawns[1:] if self.wave == 1 else self.enemy_spawns
+        for x, y in spawns[:count]:
+            self.enemies.add(self.add_tank(x, y, RED, "enemy"))
+        count -= min(count, len(spawns))
+        for x, y in self.random_spawn_points(count):
+            self.enemies.add(self.add_tank(x, y, RED, "enemy"))
+
+    def random_spawn_points(self, count):
+        """在远离玩家的空地上随机选取 count 个位置"""
+        if count <= 0:
+            return []
+        nav = self.nav
+        rows, cols = np.nonzero(~nav.blocked)
+        centers_x = (cols + 0.5) * nav.cell_size
+        centers_y = (rows + 0.5) * nav.cell_size
+        far = np.hypot(centers_x - self.player.x, centers_y - self.player.y) > 150
+        if far.any():
+            centers_x, centers_y = centers_x[far], centers_y[far]
+        if len(centers_x) == 0:
+            return []
+        indices = self.np_rng.integers(0, len(centers_x), count)
+        return list(zip(centers_x[indices].tolist(), centers_y[indices].tolist()))
+
+    def add_player_tank(self, team):
+        """加入一辆由玩家操作的坦克（联机时使用）：阵营0成为玩家的队友，阵营1算作敌人。
+        放不下时返回 None"""
+        spawns = self.random_spawn_points(1)
+        if not spawns:
+            return None
+        x, y = spawns[0]
+        if team == 0:
+            tank = self.add_tank(x, y, GREEN, "player")
+            self.allies.add(tank)
+        else:
+            tank = self.add_tank(x, y, RED, "enemy")
+            self.enemies.add(tank)
+        return tank
+
+    def create_walls(self):
+        width, height = self.width, self.height
+        rng = self.rng
+        walls = self.walls
+
+        # 创建边界墙（一圈钢墙瓦片）
+        walls.fill(0, 0, walls.cols, 1, STEEL)
+        walls.fill(0, (height - TILE_SIZE) // TILE_SIZE, walls.cols, 1, STEEL)
+        walls.fill(0, 0, 1, walls.rows, STEEL)
+        walls.fill((width - TILE_SIZE) // TILE_SIZE, 0, 1, walls.rows, STEEL)
+
+        # 创建随机的内部墙壁（对齐到瓦片）
+        wall_thickness = TILE_SIZE
+        player_rect = pygame.Rect(self.player.x - 60, self.player.y - 60, 120, 120)
+        enemy_rect = pygame.Rect(self.enemy.x - 60, self.enemy.y - 60, 120, 120)
+        # 墙壁数量按场地面积缩放，800x600 的场地上有20块
+        wall_count = max(20, round(20 * width * height / (800 * 600)))
+        for _ in range(wall_count):
+            x = rng.randint(wall_thickness * 2, width - wall_thickness * 3) // TILE_SIZE * TILE_SIZE
+            y = rng.randint(wall_thickness * 2, height - wall_thickness * 3) // TILE_SIZE * TILE_SIZE
+            wall_width = rng.choice([20, 40, 60])
+            wall_height = rng.choice([20, 40, 60])
+            wall_type = rng.choice(["brick", "brick", "steel", "water"])  # 砖墙较多
+
+            # 确保墙壁不会直接挡住坦克
+            wall_rect = pygame.Rect(x, y, wall_width, wall_height)
+            if not wall_rect.colliderect(player_rect) and not wall_rect.colliderect(enemy_rect):
+                walls.fill_rect(wall_rect, WALL_TYPES[wall_type])
+
+        # 把连续的实心瓦片合并成碰撞矩形
+        walls.build_colliders()
+
+    def snapshot(self):
+        """保存完整的世界状态：坦克、子弹、瓦片血量、射击冷却和随机数生成器状态"""
+        tanks = np.zeros(len(self.tanks), dtype=TANK_STATE_DTYPE)
+        for i, tank in enumerate(self.tanks):
+            if tank is self.player:
+                side = SIDE_PLAYER
+            elif tank in self.allies:
+                side = SIDE_ALLY
+            else:
+                side = SIDE_ENEMY
+            tanks[i] = (tank.tank_id, side, tank.x, tank.y, tank.prev_x, tank.prev_y, tank.angle,
+                        tank.last_dx, tank.last_dy, tank.health, tank.reload_time)
+        return WorldSnapshot(self.tick, self.game_over, self.winner, self.wave, self.next_tank_id, tanks,
+                             self.bullets.snapshot(), self.walls.types.copy(), self.walls.health.copy(),
+                             self.rng.getstate(), self.np_rng.bit_generator.state)
+
+    def restore(self, snapshot):
+        """恢复到快照时的状态。坦克对象会被复用，瓦片布局变化时才重建碰撞矩形和导航网格"""
+        self.tick = snapshot.tick
+        self.game_over = snapshot.game_over
+        self.winner = snapshot.winner
+        self.wave = snapshot.wave
+        self.next_tank_id = snapshot.next_tank_id
+        self.rng.setstate(snapshot.rng_state)
+        self.np_rng.bit_generator.state = snapshot.np_rng_state
+        self.bullets.restore(snapshot.bullets)
+        if self.walls.restore(snapshot.wall_types, snapshot.wall_health):
+            self.nav.rebuild()
+            self.visibility.rebuild()
+
+        self.tanks.empty()
+        self.enemies.empty()
+        self.allies.empty()
+        for record in snapshot.tanks.tolist():
+            (tank_id, side, x, y, prev_x, prev_y, angle, last_dx, last_dy, health, reload_time) = record
+            tank = self.tank_registry.get(tank_id)
+            team = 1 if side == SIDE_ENEMY else 0
+            if tank is None or tank.team != team:
+                # 编号已经被别的坦克占用（恢复到更早的快照后又生成过新坦克）时重新创建
+                color, control_type = (RED, "enemy") if side == SIDE_ENEMY else (GREEN, "player")
+                tank = Tank(x, y, color, control_type=control_type, bounds=(self.width, self.height),
+                            tank_id=tank_id)
+                self.tank_registry[tank_id] = tank
+            tank.x, tank.y, tank.prev_x, tank.prev_y = x, y, prev_x, prev_y
+            tank.angle, tank.last_dx, tank.last_dy = angle, last_dx, last_dy
+            tank.health, tank.reload_time = health, reload_time
+            tank.update_image()
+            self.tanks.add(tank)
+            if side == SIDE_ENEMY:
+                self.enemies.add(tank)
+            elif side == SIDE_ALLY:
+                self.allies.add(tank)
+
+    def step(self, player_input=None, enemy_input=None, inputs=None):
+        """推进一个模拟tick；没有输入的坦克由AI控制。
+        inputs 为 {坦克编号: 输入位掩码}，player_input / enemy_input 分别是玩家和第一辆敌人的简写"""
+        if self.game_over:
+            return
+
+        inputs = dict(inputs) if inputs else {}
+        if player_input is not None:
+            inputs[self.player.tank_id] = player_input
+        if enemy_input is not None:
+            inputs[self.enemy.tank_id] = enemy_input
+
+        for tank in self.tanks:
+            tank.save_position()
+
+        # 玩家一方：有输入时按输入操作，否则由AI追击最近的敌人
+        ai_tanks = set()
+        for tank in [self.player] + self.allies.sprites():
+            if not tank.alive():
+                continue
+            if tank.tank_id in inputs:
+                self.apply_input(tank, inputs[tank.tank_id])
+            else:
+                target = self.nearest_enemy(tank)
+                if target is not None:
+                    self.control_ai([tank], target)
+                ai_tanks.add(tank)
+
+        # 敌人：有输入的按输入操作，其余全部由批量AI控制
+        ai_enemies = []
+        for tank in self.enemies:
+            if tank.tank_id in inputs:
+                self.apply_input(tank, inputs[tank.tank_id])
+            else:
+                ai_enemies.append(tank)
+        target = self.player
+        if not target.alive() and self.allies:
+            # 玩家被摧毁后追击剩下的队友
+            target = self.allies.sprites()[0]
+        if self.ai_scheduler is not None:
+            self.ai_scheduler.control(self, ai_enemies, target)
+        else:
+            self.control_ai(ai_enemies, target)
+        ai_tanks.update(ai_enemies)
+
+        # 更新坦克和子弹
+        self.tanks.update()
+        self.bullets.update()
+
+        # 检测碰撞
+        self.handle_collisions(ai_tanks)
+        self.tick += 1
+
+    def apply_input(self, tank, input_mask):
+        """按输入位掩码移动坦克并射击"""
+        if input_mask & INPUT_FIRE:
+            tank.shoot(self.bullets)
+        dx, dy = input_direction(input_mask)
+        tank.move(dx, dy)
+
+    def nearest_enemy(self, tank):
+        best, best_dist = None, None
+        for enemy in self.enemies:
+            dist = (enemy.x - tank.x) ** 2 + (enemy.y - tank.y) ** 2
+            if best is None or dist < best_dist:
+                best, best_dist = enemy, dist
+        return best
+
+    def control_ai(self, tanks, target):
+        """批量AI：所有坦克的决策在一次数组运算中完成。
+        沿导航网格的流场追向目标，找不到路时随机游走（撞墙时随机转向）。
+        能看到目标时：距离超过 AIM_MIN_DISTANCE 就转向目标射击，进入 STANDOFF_DISTANCE 后停下，
+        比 AIM_MIN_DISTANCE 更近时背离目标后退，所以两辆坦克不会开到同一个位置"""
+        count = len(tanks)
+        if count == 0:
+            return
+        rng = self.np_rng
+
+        xs = np.fromiter((tank.x for tank in tanks), dtype=np.float64, count=count)
+        ys = np.fromiter((tank.y for tank in tanks), dtype=np.float64, count=count)
+        angles = np.fromiter((tank.angle for tank in tanks), dtype=np.float64, count=count)
+
+        # 朝下一个路点转向
+        if target.alive():
+            waypoint_x, waypoint_y, has_path = self.nav.steer_many(xs, ys, target.x, target.y)
+        else:
+            waypoint_x = waypoint_y = np.zeros(count)
+            has_path = np.zeros(count, dtype=bool)
+        angles = np.where(has_path, np.degrees(np.arctan2(ys - waypoint_y, waypoint_x - xs)), angles)
+
+        # 没有路径时，2%的几率随机改变方向
+        wander = ~has_path & (rng.random(count) < 0.02)
+        angles = np.where(wander, rng.integers(0, 361, count), angles)
+
+        aim_angles = angles
+        if target.alive():
+            # 视线是对称的，只需要目标所在格子的一个视野
+            visible = self.visibility.sees_many(target, xs, ys)
+            distance = np.hypot(target.x - xs, target.y - ys)
+            aim_angles = np.degrees(np.arctan2(ys - target.y, target.x - xs))
+            spread = rng.uniform(-AIM_SPREAD, AIM_SPREAD, count)
+            fire = visible & (distance > AIM_MIN_DISTANCE)
+            too_close = visible & ~fire & (distance > 0)
+            angles = np.where(too_close, aim_angles + 180, angles)
+            speed = np.where(fire & (distance <= STANDOFF_DISTANCE), 0.0, 1.0)
+            aim_angles = aim_angles + spread
+        else:
+            fire = np.zeros(count, dtype=bool)
+            speed = np.ones(count)
+
+        # 根据当前角度移动，看到目标的坦克移动后转向目标射击
+        radians = np.radians(angles)
+        move_x = np.cos(radians) * speed
+        move_y = -np.sin(radians) * speed
+
+        bullets = self.bullets
+        for tank, angle, dx, dy, aim, shoot in zip(tanks, angles.tolist(), move_x.tolist(), move_y.tolist(),
+                                                   aim_angles.tolist(), fire.tolist()):
+            tank.angle = angle
+            tank.move(dx, dy)
+            if shoot:
+                tank.angle = aim
+                tank.update_image()
+                tank.shoot(bullets)
+
+    def handle_collisions(self, ai_tanks=()):
+        bullets = self.bullets
+        walls = self.walls
+
+        # 坦克与墙壁的碰撞（矩形相交后再用旋转后的遮罩做像素级检测）
+        for tank in self.tanks:
+            if any(tank.overlaps_rect(rect) for rect in walls.collide(tank.rect)):
+                if tank in ai_tanks:
+                    # AI坦克遇到墙壁后随机改变方向
+                    tank.angle = self.rng.randint(0, 360)
+                else:
+                    # 简单的碰撞响应 - 后退
+                    tank.move(-tank.last_dx * 2, -tank.last_dy * 2)
+
+        # 宽相位：按子弹所在格子排序，一次找出候选的子弹-子弹对和子弹-坦克对
+        live_slots = bullets.live_slots()
+        tanks = self.tanks.sprites()
+        if len(live_slots):
+            phase = Broadphase(bullets.x[live_slots], bullets.y[live_slots])
+            if self.bullet_cancel:
+                first, second = phase.point_pairs()
+                bullets.kill(bullets.colliding_pairs(live_slots[first], live_slots[second]))
+            if tanks:
+                self.handle_bullet_hits(tanks, phase, live_slots)
+
+        # 玩家（和队友）全部被摧毁则敌人胜利；一波敌人全部被消灭后进入下一波，打完所有波次玩家胜利
+        if not self.player.alive() and not self.allies:
+            self.game_over = True
+            self.winner = "enemy"
+        elif not self.enemies:
+            if self.wave < self.waves:
+                self.wave += 1
+                self.spawn_enemies(self.enemy_count)
+            else:
+                self.game_over = True
+                self.winner = "player"
+
+        # 子弹与墙壁的碰撞（直接按子弹坐标查瓦片）
+        live_slots = bullets.live_slots()
+        if len(live_slots):
+            hit, cols, rows = walls.solid_at(bullets.x[live_slots], bullets.y[live_slots])
+            hit_slots = live_slots[hit]
+            if len(hit_slots):
+                # 砖墙瓦片被摧毁时，只更新附近的导航格子
+                for rect in walls.damage_tiles(cols[hit], rows[hit], bullets.damage[hit_slots]):
+                    self.nav.wall_removed(rect)
+                    self.visibility.wall_removed(rect)
+                bullets.kill(hit_slots)
+
+
+    def handle_bullet_hits(self, tanks, phase, live_slots):
+        """子弹与坦克的碰撞：宽相位给出的候选先做矩形检测，再用遮罩确认确实打中了坦克"""
+        bullets = self.bullets
+        rects = np.array([tuple(tank.rect) for tank in tanks], dtype=np.int64).reshape(-1, 4)
+        lefts = rects[:, 0] - BULLET_RADIUS
+        tops = rects[:, 1] - BULLET_RADIUS
+        rights = rects[:, 0] + rects[:, 2] + BULLET_RADIUS
+        bottoms = rects[:, 1] + rects[:, 3] + BULLET_RADIUS
+        tank_index, bullet_index = phase.rect_pairs(lefts, tops, rights, bottoms)
+
+        # 精确的矩形检测，并跳过自己和队友发射的子弹
+        slots = live_slots[bullet_index]
+        x = bullets.x[slots]
+        y = bullets.y[slots]
+        teams = np.fromiter((tank.team for tank in tanks), dtype=np.int64, count=len(tanks))
+        inside = ((x >= lefts[tank_index]) & (x < rights[tank_index]) &
+                  (y >= tops[tank_index]) & (y < bottoms[tank_index]) &
+                  (bullets.team[slots] != teams[tank_index]))
+        tank_index, slots = tank_index[inside], slots[inside]
+        if len(slots) == 0:
+            return
+
+        # 按坦克分组，依次结算（前面的坦克已经挡下的子弹不会再打中后面的坦克）
+        boundaries = np.flatnonzero(np.diff(tank_index)) + 1
+        for index, hit_slots in zip(tank_index[np.r_[0, boundaries]].tolist(), np.split(slots, boundaries)):
+            tank = tanks[index]
+            hit_slots = hit_slots[bullets.alive[hit_slots]]
+            if len(hit_slots):
+                hit_slots = bullets.overlapping_mask(hit_slots, tank.mask, tank.rect.topleft)
+            for damage in bullets.damage[hit_slots].tolist():
+                if tank.take_damage(damage):
+                    break
+            bullets.kill(hit_slots)
\ No newline at end of file